@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 import json
+import sys
 from elasticsearch import Elasticsearch
 
+from metadata_store import METADATA_DB, MetadataStore
+from ndjson_output import OUTPUT_FORMAT, OUTPUT_PATH, NDJSONWriter
+from template_resolver import TemplateResolver
+
 # === Configuration ===
 SOURCE_ES = "http://source-es-url:9200"
 AUTH = {"user": "user", "pass": "pass"}
@@ -30,57 +35,168 @@ def list_indices(pattern="*"):
     )
     return [i["index"] for i in raw if not i["index"].startswith(".")]
 
-def get_index_settings(es, index):
+def load_index_metadata(es, pattern="*"):
+    """
+    Fetch settings, mappings, aliases and ILM policies for every non-system index matching
+    `pattern` in a handful of wildcard requests, instead of several round trips per index.
+    Returns {index: {"settings", "mappings", "aliases", "ilm_policy"}}; pass it as `metadata`
+    to the per-index helpers below.
+    """
+    settings = es.indices.get_settings(index=pattern, expand_wildcards="all")
+    mappings = es.indices.get_mapping(index=pattern, expand_wildcards="all")
+    aliases = es.indices.get_alias(index=pattern, expand_wildcards="all")
+
+    metadata = {}
+    for index, body in settings.items():
+        if index.startswith("."):
+            continue
+        metadata[index] = {
+            "settings": body["settings"]["index"],
+            "mappings": mappings.get(index, {}).get("mappings", {}),
+            "aliases": list(aliases.get(index, {}).get("aliases", {})),
+            "ilm_policy": {},
+        }
+
+    # One call for all policies, only if any index actually has one
+    policy_names = {m["settings"].get("lifecycle", {}).get("name") for m in metadata.values()} - {None}
+    if policy_names:
+        policies = es.ilm.get_lifecycle()
+        for entry in metadata.values():
+            name = entry["settings"].get("lifecycle", {}).get("name")
+            if name:
+                entry["ilm_policy"] = policies.get(name, {})
+    return metadata
+
+def get_index_settings(es, index, metadata=None):
+    if metadata and index in metadata:
+        return metadata[index]["settings"]
     return es.indices.get_settings(index=index, expand_wildcards="all")[index]["settings"]["index"]
 
-def get_index_mapping(es, index):
+def get_index_mapping(es, index, metadata=None):
+    if metadata and index in metadata:
+        return metadata[index]["mappings"]
     return es.indices.get_mapping(index=index, expand_wildcards="all")[index]["mappings"]
 
-def get_index_aliases(es, index):
+def get_index_aliases(es, index, metadata=None):
+    if metadata and index in metadata:
+        return metadata[index]["aliases"]
     aliases = es.indices.get_alias(index=index, expand_wildcards="all")[index].get("aliases", {})
     return list(aliases.keys())
 
-def get_ilm_policy_for_index(es, index):
+def get_ilm_policy_for_index(es, index, metadata=None):
+    if metadata and index in metadata:
+        return metadata[index]["ilm_policy"]
     settings = get_index_settings(es, index)
-    policy = settings.get("index.lifecycle.name")
+    # Settings come back nested (index.lifecycle.name -> {"lifecycle": {"name": ...}})
+    policy = settings.get("lifecycle", {}).get("name")
     if not policy:
         return {}
     return es.ilm.get_lifecycle(name=policy).get(policy, {})
 
-import fnmatch
-def list_index_templates_for_index(es, index):
-    all_tpls = es.indices.get_index_template().get("index_templates", [])
-    return [tpl for tpl in all_tpls
-            if any(fnmatch.fnmatch(index, pat)
-                   for pat in tpl["index_template"]["index_patterns"])]
-
-def list_component_templates_for_index(es, index):
-    # find index-templates that match
-    itpls = list_index_templates_for_index(es, index)
-    used = {ct for tpl in itpls for ct in tpl["index_template"].get("composed_of", [])}
-    all_ct = {c["name"]: c["component_template"]
-              for c in es.cluster.get_component_template().get("component_templates", [])}
-    return [{ "name": name, "body": all_ct[name] } for name in used if name in all_ct]
-
-def list_all_ingest_pipelines(es):
-    return es.ingest.get_pipeline()
-
-def list_snapshot_repositories(es):
-    return es.snapshot.get_repository()
-
-def list_transforms_for_index(es, index):
-    return [t for t in es.transform.get_transform().get("transforms", [])
-            if index in t["config"]["source"]["index"]]
-
-def list_rollup_jobs_for_index(es, index):
-    return [j for j in es.rollup.get_jobs().get("jobs", [])
-            if j["config"]["index_pattern"] == index]
-
-def list_watcher_watches(es):
-    return es.watcher.get_watch()
+class RunCache:
+    """
+    Memoizes cluster-wide API results (templates, pipelines, repositories, ...) for one
+    inspection run, so each is fetched once no matter how many indices are inspected.
+    Call invalidate() after changing the cluster, or start a new RunCache per run.
+    """
 
-def list_enrich_policies(es):
-    return es.enrich.get_policy().get("policies", [])
+    # Cached values built from other cached values, dropped along with them
+    DEPENDENTS = {
+        "index_templates": ("template_resolver",),
+        "component_templates": ("template_resolver",),
+    }
+
+    def __init__(self):
+        self._values = {}
+
+    def get(self, es, name, fetch):
+        key = (id(es), name)
+        if key not in self._values:
+            self._values[key] = fetch()
+        return self._values[key]
+
+    def invalidate(self, name=None):
+        """Drop one cached API result (all clusters), or everything when `name` is None."""
+        if name is None:
+            self._values.clear()
+        else:
+            names = {name, *self.DEPENDENTS.get(name, ())}
+            for key in [k for k in self._values if k[1] in names]:
+                del self._values[key]
+
+def _cached(cache, es, name, fetch):
+    return fetch() if cache is None else cache.get(es, name, fetch)
+
+def list_all_index_templates(es, cache=None):
+    return _cached(cache, es, "index_templates",
+                   lambda: es.indices.get_index_template().get("index_templates", []))
+
+def list_all_component_templates(es, cache=None):
+    return _cached(cache, es, "component_templates",
+                   lambda: {c["name"]: c["component_template"]
+                            for c in es.cluster.get_component_template().get("component_templates", [])})
+
+def get_template_resolver(es, cache=None):
+    """TemplateResolver over the cluster's index/component templates, compiled once per run."""
+    return _cached(cache, es, "template_resolver",
+                   lambda: TemplateResolver(list_all_index_templates(es, cache),
+                                            list_all_component_templates(es, cache)))
+
+def list_index_templates_for_index(es, index, cache=None):
+    # Every matching template, highest priority (the one Elasticsearch applies) first
+    return get_template_resolver(es, cache).matching(index)
+
+def list_component_templates_for_index(es, index, cache=None):
+    # Only the winning template's composed_of components are actually applied
+    resolver = get_template_resolver(es, cache)
+    template = resolver.resolve(index)
+    return resolver.components(template) if template else []
+
+def list_all_ingest_pipelines(es, cache=None):
+    return _cached(cache, es, "ingest_pipelines", lambda: es.ingest.get_pipeline())
+
+def list_snapshot_repositories(es, cache=None):
+    return _cached(cache, es, "snapshot_repositories", lambda: es.snapshot.get_repository())
+
+def list_transforms_for_index(es, index, cache=None):
+    transforms = _cached(cache, es, "transforms",
+                         lambda: es.transform.get_transform().get("transforms", []))
+    return [t for t in transforms if index in t["config"]["source"]["index"]]
+
+def list_rollup_jobs_for_index(es, index, cache=None):
+    jobs = _cached(cache, es, "rollup_jobs", lambda: es.rollup.get_jobs().get("jobs", []))
+    return [j for j in jobs if j["config"]["index_pattern"] == index]
+
+def list_watcher_watches(es, cache=None):
+    return _cached(cache, es, "watcher_watches", lambda: es.watcher.get_watch())
+
+def list_enrich_policies(es, cache=None):
+    return _cached(cache, es, "enrich_policies", lambda: es.enrich.get_policy().get("policies", []))
+
+def index_record(es, index, metadata=None, cache=None):
+    """Everything known about one index as a single JSON-ready dict (one NDJSON line)."""
+    return {
+        "type": "index",
+        "index": index,
+        "settings": get_index_settings(es, index, metadata),
+        "mappings": get_index_mapping(es, index, metadata),
+        "aliases": get_index_aliases(es, index, metadata),
+        "ilm_policy": get_ilm_policy_for_index(es, index, metadata),
+        "index_templates": list_index_templates_for_index(es, index, cache),
+        "component_templates": list_component_templates_for_index(es, index, cache),
+        "transforms": list_transforms_for_index(es, index, cache),
+        "rollup_jobs": list_rollup_jobs_for_index(es, index, cache),
+    }
+
+def cluster_record(es, cache=None):
+    """The cluster-wide objects, written once ahead of the per-index records."""
+    return {
+        "type": "cluster",
+        "ingest_pipelines": list_all_ingest_pipelines(es, cache),
+        "snapshot_repositories": list_snapshot_repositories(es, cache),
+        "watcher_watches": list_watcher_watches(es, cache),
+        "enrich_policies": list_enrich_policies(es, cache),
+    }
 
 # === Main: inspect all *test* indices ===
 
@@ -103,47 +219,67 @@ if __name__ == "__main__":
 
     pattern = "*test*"
     indices = list_indices(pattern)
-    print(f"Found {len(indices)} indices matching '{pattern}': {indices}\n")
-
-    for idx in indices:
-        print(f"\n=== INDEX: {idx} ===\n")
-
-        print("• Settings:")
-        print(json.dumps(get_index_settings(es, idx), indent=2))
-
-        print("\n• Mappings:")
-        print(json.dumps(get_index_mapping(es, idx), indent=2))
-
-        print("\n• Aliases:", get_index_aliases(es, idx))
-
-        print("\n• ILM Policy:")
-        ilm = get_ilm_policy_for_index(es, idx)
-        print(json.dumps(ilm, indent=2) if ilm else "  (none)")
-
-        print("\n• Matching Index Templates:")
-        its = list_index_templates_for_index(es, idx)
-        print(json.dumps(its, indent=2) if its else "  (none)")
-
-        print("\n• Component Templates Used:")
-        cts = list_component_templates_for_index(es, idx)
-        print(json.dumps(cts, indent=2) if cts else "  (none)")
-
-        print("\n• Ingest Pipelines (all):")
-        print(json.dumps(list_all_ingest_pipelines(es), indent=2))
-
-        print("\n• Snapshot Repositories:")
-        print(json.dumps(list_snapshot_repositories(es), indent=2))
-
-        print("\n• Transforms on this index:")
-        print(json.dumps(list_transforms_for_index(es, idx), indent=2) or "  (none)")
-
-        print("\n• Rollup Jobs on this index:")
-        print(json.dumps(list_rollup_jobs_for_index(es, idx), indent=2) or "  (none)")
-
-        print("\n• Watcher Watches (all):")
-        print(json.dumps(list_watcher_watches(es), indent=2))
-
-        print("\n• Enrich Policies (all):")
-        print(json.dumps(list_enrich_policies(es), indent=2))
-
-        print("\n" + "="*60 + "\n")
+    if OUTPUT_FORMAT != "ndjson":  # Keep stdout pure NDJSON when that's what it carries
+        print(f"Found {len(indices)} indices matching '{pattern}': {indices}\n")
+
+    # Settings/mappings/aliases/ILM for all of them up front: from the on-disk snapshot,
+    # refetching only indices that changed since the last run, or in a few wildcard requests
+    if METADATA_DB:
+        store = MetadataStore(METADATA_DB)
+        metadata = store.refresh(es, pattern)
+        store.close()
+        print(f"Metadata snapshot {METADATA_DB}: {store.last_refresh}", file=sys.stderr)
+    else:
+        metadata = load_index_metadata(es, pattern)
+    # Cluster-wide objects are fetched on first use and reused for every index
+    cache = RunCache()
+
+    if OUTPUT_FORMAT == "ndjson":
+        # One compact record per line, streamed as each index is inspected
+        with NDJSONWriter(OUTPUT_PATH) as out:
+            out.write(cluster_record(es, cache))
+            for idx in indices:
+                out.write(index_record(es, idx, metadata, cache))
+    else:
+        for idx in indices:
+            print(f"\n=== INDEX: {idx} ===\n")
+
+            print("• Settings:")
+            print(json.dumps(get_index_settings(es, idx, metadata), indent=2))
+
+            print("\n• Mappings:")
+            print(json.dumps(get_index_mapping(es, idx, metadata), indent=2))
+
+            print("\n• Aliases:", get_index_aliases(es, idx, metadata))
+
+            print("\n• ILM Policy:")
+            ilm = get_ilm_policy_for_index(es, idx, metadata)
+            print(json.dumps(ilm, indent=2) if ilm else "  (none)")
+
+            print("\n• Matching Index Templates:")
+            its = list_index_templates_for_index(es, idx, cache)
+            print(json.dumps(its, indent=2) if its else "  (none)")
+
+            print("\n• Component Templates Used:")
+            cts = list_component_templates_for_index(es, idx, cache)
+            print(json.dumps(cts, indent=2) if cts else "  (none)")
+
+            print("\n• Ingest Pipelines (all):")
+            print(json.dumps(list_all_ingest_pipelines(es, cache), indent=2))
+
+            print("\n• Snapshot Repositories:")
+            print(json.dumps(list_snapshot_repositories(es, cache), indent=2))
+
+            print("\n• Transforms on this index:")
+            print(json.dumps(list_transforms_for_index(es, idx, cache), indent=2) or "  (none)")
+
+            print("\n• Rollup Jobs on this index:")
+            print(json.dumps(list_rollup_jobs_for_index(es, idx, cache), indent=2) or "  (none)")
+
+            print("\n• Watcher Watches (all):")
+            print(json.dumps(list_watcher_watches(es, cache), indent=2))
+
+            print("\n• Enrich Policies (all):")
+            print(json.dumps(list_enrich_policies(es, cache), indent=2))
+
+            print("\n" + "="*60 + "\n")
@@ -2,8 +2,13 @@
 #!/usr/bin/env python3
 import re
 import json
+import sys
 from elasticsearch import Elasticsearch
 
+from metadata_store import METADATA_DB, MetadataStore
+from sampling import MSEARCH_BATCH, sample_indices
+from ndjson_output import OUTPUT_FORMAT, OUTPUT_PATH, NDJSONWriter
+
 # === CONFIGURATION ===
 # Change these to point at your cluster and credentials:
 SOURCE_ES = "http://localhost:9200"
@@ -20,6 +25,10 @@ REGEX_PATTERN = None
 
 # How many sample docs to show per index
 SAMPLE_SIZE = 3
+# "random" (random_score), "shards" (spread over primary shards) or "first" (plain match_all)
+SAMPLE_MODE = "random"
+# Only these _source fields in the samples (wildcards allowed); None = whole documents
+SAMPLE_FIELDS = None
 
 # === CLIENT ===
 es = Elasticsearch(
@@ -30,80 +39,124 @@ es = Elasticsearch(
 # ————————————————————————————————————————————————
 # 1) Listing helpers
 # ————————————————————————————————————————————————
-def list_indices_by_wildcard(es: Elasticsearch, pattern: str) -> list:
+# Both return {index: primary shard count} in listing order; the `pri` column is what
+# SAMPLE_MODE "shards" spreads the sample over, with or without a metadata snapshot
+def list_indices_by_wildcard(es: Elasticsearch, pattern: str) -> dict:
     raw = es.cat.indices(
         index=pattern,
         format="json",
+        h="index,pri",
         expand_wildcards="all"
     )
-    return [idx["index"] for idx in raw if not idx["index"].startswith(".")]
+    return {idx["index"]: int(idx.get("pri") or 1) for idx in raw if not idx["index"].startswith(".")}
 
-def list_indices_by_regex(es: Elasticsearch, regex: str) -> list:
-    raw = es.cat.indices(format="json", expand_wildcards="all")
+def list_indices_by_regex(es: Elasticsearch, regex: str) -> dict:
+    raw = es.cat.indices(format="json", h="index,pri", expand_wildcards="all")
     pat = re.compile(regex)
-    return [
-        idx["index"] for idx in raw
+    return {
+        idx["index"]: int(idx.get("pri") or 1) for idx in raw
         if not idx["index"].startswith(".") and pat.search(idx["index"])
-    ]
+    }
 
 # ————————————————————————————————————————————————
 # 2) Quick‑print overview helper
 # ————————————————————————————————————————————————
-def print_index_info(es: Elasticsearch, index: str, sample_size: int = 3):
+def get_index_info(es: Elasticsearch, index: str, sample_size: int = 3, metadata: dict = None,
+                   samples: list = None) -> dict:
+    """
+    Settings, mappings, aliases, ILM policy name and sample docs for one index. With a
+    `metadata` snapshot (MetadataStore.refresh) and pre-fetched `samples`
+    (sampling.sample_indices) nothing hits the cluster.
+    """
+    if metadata and index in metadata:
+        settings = metadata[index]["settings"]
+        mapping = metadata[index]["mappings"]
+        aliases = dict.fromkeys(metadata[index]["aliases"])
+    else:
+        settings = es.indices.get_settings(
+            index=index, expand_wildcards="all"
+        )[index]["settings"]["index"]
+        mapping = es.indices.get_mapping(
+            index=index, expand_wildcards="all"
+        )[index]["mappings"]
+        aliases = es.indices.get_alias(
+            index=index, expand_wildcards="all"
+        )[index].get("aliases", {})
+    if samples is None:
+        samples = sample_indices(es, [index], sample_size, SAMPLE_MODE, SAMPLE_FIELDS,
+                                 shard_counts={index: settings.get("number_of_shards", 1)})[index]
+    return {
+        "index": index,
+        "settings": settings,
+        "mappings": mapping,
+        "aliases": list(aliases.keys()),
+        # Settings come back nested: index.lifecycle.name -> {"lifecycle": {"name": ...}}
+        "ilm_policy": settings.get("lifecycle", {}).get("name"),
+        "samples": samples,
+    }
+
+def print_index_info(es: Elasticsearch, index: str, sample_size: int = 3, metadata: dict = None,
+                     samples: list = None):
+    info = get_index_info(es, index, sample_size, metadata, samples)
     print(f"\n=== INDEX: {index} ===")
 
-    # Settings
-    settings = es.indices.get_settings(
-        index=index, expand_wildcards="all"
-    )[index]["settings"]["index"]
     print("\n• Settings:")
-    print(json.dumps(settings, indent=2))
+    print(json.dumps(info["settings"], indent=2))
 
-    # Mappings
-    mapping = es.indices.get_mapping(
-        index=index, expand_wildcards="all"
-    )[index]["mappings"]
     print("\n• Mappings:")
-    print(json.dumps(mapping, indent=2))
+    print(json.dumps(info["mappings"], indent=2))
 
-    # Aliases
-    aliases = es.indices.get_alias(
-        index=index, expand_wildcards="all"
-    )[index].get("aliases", {})
-    print("\n• Aliases:", list(aliases.keys()))
+    print("\n• Aliases:", info["aliases"])
 
-    # ILM policy name
-    ilm_name = settings.get("index.lifecycle.name")
-    print("\n• ILM Policy:", ilm_name or "(none)")
+    print("\n• ILM Policy:", info["ilm_policy"] or "(none)")
 
-    # Sample documents
     print(f"\n• Sample {sample_size} docs:")
-    resp = es.search(
-        index=index,
-        size=sample_size,
-        body={"query": {"match_all": {}}},
-        _source_includes=["*"],
-    )
-    for doc in resp["hits"]["hits"]:
-        print(json.dumps(doc["_source"], indent=2))
+    if isinstance(info["samples"], dict):  # The sample search failed (e.g. closed index)
+        print("  (unavailable)", json.dumps(info["samples"]["error"]))
+        return
+    for doc in info["samples"]:
+        print(json.dumps(doc, indent=2))
 
 # ————————————————————————————————————————————————
 # 3) Main entrypoint
 # ————————————————————————————————————————————————
 def main():
+    # In NDJSON mode stdout carries only records; status lines go to stderr
+    log = sys.stderr if OUTPUT_FORMAT == "ndjson" else sys.stdout
     if REGEX_PATTERN:
-        indices = list_indices_by_regex(es, REGEX_PATTERN)
-        print(f"🔍 Found {len(indices)} indices matching regex '{REGEX_PATTERN}'")
+        shards = list_indices_by_regex(es, REGEX_PATTERN)
+        print(f"🔍 Found {len(shards)} indices matching regex '{REGEX_PATTERN}'", file=log)
     else:
-        indices = list_indices_by_wildcard(es, WILDCARD_PATTERN)
-        print(f"🔍 Found {len(indices)} indices matching wildcard '{WILDCARD_PATTERN}'")
+        shards = list_indices_by_wildcard(es, WILDCARD_PATTERN)
+        print(f"🔍 Found {len(shards)} indices matching wildcard '{WILDCARD_PATTERN}'", file=log)
+    indices = list(shards)
 
     if not indices:
-        print("⚠️  No indices matched your pattern.")
+        print("⚠️  No indices matched your pattern.", file=log)
         return
 
-    for idx in indices:
-        print_index_info(es, idx, SAMPLE_SIZE)
+    # Settings/mappings/aliases from the on-disk snapshot, refetching only changed indices
+    metadata = None
+    if METADATA_DB:
+        store = MetadataStore(METADATA_DB)
+        # A regex has no index expression of its own: refresh just the names it selected
+        metadata = store.refresh_indices(es, indices) if REGEX_PATTERN else store.refresh(es, WILDCARD_PATTERN)
+        store.close()
+        print(f"🗄️  Metadata snapshot {METADATA_DB}: {store.last_refresh}", file=log)
+
+    out = NDJSONWriter(OUTPUT_PATH) if OUTPUT_FORMAT == "ndjson" else None
+    # Samples for a batch of indices per _msearch round trip, printed as each batch lands
+    for start in range(0, len(indices), MSEARCH_BATCH):
+        batch = indices[start:start + MSEARCH_BATCH]
+        samples = sample_indices(es, batch, SAMPLE_SIZE, SAMPLE_MODE, SAMPLE_FIELDS,
+                                 shard_counts={idx: shards[idx] for idx in batch})
+        for idx in batch:
+            if out:
+                out.write(get_index_info(es, idx, SAMPLE_SIZE, metadata, samples[idx]))
+            else:
+                print_index_info(es, idx, SAMPLE_SIZE, metadata, samples[idx])
+    if out:
+        out.close()
 
 if __name__ == "__main__":
     main()
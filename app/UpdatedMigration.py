@@ -1,19 +1,34 @@
 #!/usr/bin/env python3
+import sys
 import time
 import logging
-import fnmatch
 import json
 from elasticsearch import Elasticsearch, exceptions
 
+from ndjson_output import NDJSONWriter
+from reindex_throttle import TARGET_WRITE_LOAD, ThrottleController
+from template_resolver import TemplateResolver
+
 # === Configuration ===
 SOURCE_ES = "http://source-es-url:9200"
 TARGET_ES = "http://target-es-url:9200"
 AUTH = {"user": "user", "pass": "pass"}
 PREFIX = "migrated-"
-SLICE_COUNT = 4
+# Slices per reindex task. Only takes effect when SOURCE_ES and TARGET_ES are the same
+# cluster: Elasticsearch rejects slicing a reindex from remote, so with a remote source
+# every index is copied by a single unsliced task. "auto" is this script's own choice per
+# index (choose_slices: shards, docs, target data nodes), sent as a number; it is not
+# Elasticsearch's slices=auto. Or a fixed number.
+SLICE_COUNT = "auto"
+MIN_DOCS_PER_SLICE = 100000 # Fewer docs per slice than this and the extra slices cost more than they save
+SLICES_PER_DATA_NODE = 2    # At most this many slices per target data node for one task
 BATCH_SIZE = 1000
 REQUEST_TIMEOUT = 600
-THROTTLE_DOCS_PER_SEC = -1  # -1 = no throttle
+THROTTLE_DOCS_PER_SEC = -1  # -1 = no throttle (used when ADAPTIVE_THROTTLE is off)
+ADAPTIVE_THROTTLE = True    # Rethrottle running tasks to hold the target write load near TARGET_WRITE_LOAD
+MAX_PARALLEL_REINDEX = 4    # Reindex tasks in flight at once (never more than target data nodes)
+POLL_INTERVAL = 30          # Seconds between task status checks
+MIGRATION_REPORT = "migration_report.ndjson"  # Slices and docs/s per index, one JSON line each; "" = log only
 
 # === Logging Setup ===
 logging.basicConfig(
@@ -42,31 +57,32 @@ def list_indices():
     raw = es_source.cat.indices(format="json", expand_wildcards="all")
     return [idx["index"] for idx in raw if not idx["index"].startswith(".")]
 
-def create_index_if_no_template(es_source, es_target, index_name, new_index_name):
+def create_index_if_no_template(es_source, es_target, index_name, new_index_name, resolver=None):
     """
     Ensure `new_index_name` exists on target with same settings/mappings/aliases as
     `index_name` on source—either via an index template or by copying directly.
+    Pass a TemplateResolver built once per run to avoid re-fetching the templates per index.
     """
     try:
-        # 1) Try to find a matching index-template on source
-        templates = es_source.indices.get_index_template().get("index_templates", [])
-        for tpl in templates:
-            patterns = tpl["index_template"]["index_patterns"]
-            if any(fnmatch.fnmatch(index_name, pat) for pat in patterns):
-                logger.info("🧩 Using template '%s' for index '%s'", tpl["name"], index_name)
-                tmpl = tpl["index_template"]["template"]
-                # filter out version/uuid/provided_name
-                settings = {
-                    k: v for k, v in tmpl["settings"].get("index", {}).items()
-                    if not k.startswith(("version","uuid","provided_name"))
-                }
-                body = {
-                    "settings": settings,
-                    "mappings": tmpl.get("mappings", {}),
-                    "aliases": tmpl.get("aliases", {})
-                }
-                es_target.indices.create(index=new_index_name, body=body)
-                return
+        # 1) Find the index-template Elasticsearch would apply on source (highest priority,
+        #    merged with its component templates)
+        if resolver is None:
+            resolver = TemplateResolver.from_cluster(es_source)
+        tmpl = resolver.effective_template(index_name)
+        if tmpl is not None:
+            logger.info("🧩 Using template '%s' for index '%s'", tmpl["name"], index_name)
+            # filter out version/uuid/provided_name
+            settings = {
+                k: v for k, v in tmpl["settings"].items()
+                if not k.startswith(("version","uuid","provided_name"))
+            }
+            body = {
+                "settings": settings,
+                "mappings": tmpl["mappings"],
+                "aliases": tmpl["aliases"]
+            }
+            es_target.indices.create(index=new_index_name, body=body)
+            return
         # 2) No template → copy settings & mappings directly
         logger.info("⚙️  No template match for '%s'; copying settings/mappings manually", index_name)
         src_settings = es_source.indices.get_settings(index=index_name)[index_name]["settings"]["index"]
@@ -82,7 +98,7 @@ def create_index_if_no_template(es_source, es_target, index_name, new_index_name
         for alias in aliases:
             es_target.indices.put_alias(index=new_index_name, name=alias)
         logger.info("✅ Created '%s' manually with aliases %s", new_index_name, list(aliases))
-    except exceptions.ElasticsearchException as e:
+    except exceptions.ApiError as e:
         logger.error("Error creating index '%s': %s", new_index_name, e)
 
 def swap_aliases(es_client, old_index, new_index, aliases):
@@ -91,7 +107,7 @@ def swap_aliases(es_client, old_index, new_index, aliases):
         {"add": {"index": new_index, "alias": alias}}
         for alias in aliases
     ]
-    es.indices.update_aliases(body={"actions": actions})
+    es_client.indices.update_aliases(body={"actions": actions})
 
 
 # === Cluster‑level Migrations ===
@@ -216,72 +232,191 @@ def migrate_enrich_policies():
 
 # === Data Migration ===
 
-def migrate_index(es_source, es_target, index_name):
+def remote_source():
+    """Whether the data comes from another cluster (reindex from remote) or the target itself."""
+    return SOURCE_ES != TARGET_ES
+
+def choose_slices(item, data_nodes, slice_count=SLICE_COUNT, remote=True):
+    """
+    Slices for the reindex task of `item` (a dict from list_indices_by_size). Reindex from
+    remote can't be sliced, so that is always 1. Otherwise "auto" takes one slice per
+    source primary shard, no more than one per MIN_DOCS_PER_SLICE docs and no more than
+    SLICES_PER_DATA_NODE per target data node; a number is used as given. Either way
+    Elasticsearch gets a concrete number, never its own slices=auto.
+    """
+    if remote:
+        return 1
+    if slice_count != "auto":
+        return int(slice_count)
+    return max(1, min(item["shards"], item["docs"] // MIN_DOCS_PER_SLICE, data_nodes * SLICES_PER_DATA_NODE))
+
+def start_reindex(es_source, es_target, index_name, resolver=None,
+                  requests_per_second=THROTTLE_DOCS_PER_SEC, slices=1):
+    """Create the target index and launch its reindex task; returns (task id, new index)."""
     new_index = f"{PREFIX}{index_name}"
     # 1) create target index if needed
-    create_index_if_no_template(es_source, es_target, index_name, new_index)
-
-    # 2) kick off remote, sliced reindex
+    create_index_if_no_template(es_source, es_target, index_name, new_index, resolver)
+
+    # 2) kick off the reindex, from remote unless source and target are the same cluster
+    source = {"index": index_name, "size": BATCH_SIZE}
+    if remote_source():
+        source["remote"] = {
+            "host":     SOURCE_ES,
+            "username": AUTH["user"],
+            "password": AUTH["pass"]
+        }
     body = {
-        "source": {
-            "remote": {
-                "host":     SOURCE_ES,
-                "username": AUTH["user"],
-                "password": AUTH["pass"]
-            },
-            "index": index_name,
-            "size":  BATCH_SIZE
-        },
-        "dest": {"index": new_index},
-        "slices": SLICE_COUNT,
-        "requests_per_second": THROTTLE_DOCS_PER_SEC
+        "source": source,
+        "dest": {"index": new_index}
     }
-
-    try:
-        resp = es_target.reindex(
-            body=body,
-            wait_for_completion=False,
-            request_timeout=REQUEST_TIMEOUT
+    # slices and requests_per_second are URL parameters, not part of the body
+    resp = es_target.reindex(
+        body=body,
+        slices=slices,
+        requests_per_second=requests_per_second,
+        wait_for_completion=False,
+        request_timeout=REQUEST_TIMEOUT
+    )
+    task_id = resp["task"]
+    logger.info("🚀 Started reindex task %s for %s → %s (%s slices)", task_id, index_name, new_index, slices)
+    return task_id, new_index
+
+def finish_reindex(es_source, es_target, index_name, new_index, status):
+    """
+    Report a completed reindex task and point the source's aliases at the new index.
+    Returns {"docs", "seconds", "docs_per_sec", "failures"} for the task.
+    """
+    # 3) check failures
+    result = status.get("response") or status["task"]["status"]
+    failures = result.get("failures", [])
+    docs = result.get("created", 0) + result.get("updated", 0)
+    seconds = result.get("took", 0) / 1000
+    docs_per_sec = docs / seconds if seconds else 0.0
+    if failures:
+        logger.warning(
+            "❗ Reindex of '%s' completed with %d failures",
+            index_name, len(failures)
         )
-        task_id = resp["task"]
-        logger.info("🚀 Started reindex task %s for %s → %s", task_id, index_name, new_index)
-
-        # 3) poll until complete
-        while True:
-            status = es_target.tasks.get(task_id=task_id)
-            if status.get("completed"):
-                break
-            stats = status["task"]["status"]
-            logger.info(
-                "   Progress: %d/%d docs",
-                stats["created"], stats["total"]
-            )
-            time.sleep(30)
-
-        # 4) check failures
-        failures = status["task"]["status"].get("failures", [])
-        if failures:
-            logger.warning(
-                "❗ Reindex of '%s' completed with %d failures",
-                index_name, len(failures)
-            )
-        else:
-            logger.info(
-                "✅ Reindex of '%s' complete (%d docs)",
-                index_name, status["task"]["status"]["created"]
-            )
-
-        # 5) swap aliases
-        src_aliases = list(
-            es_source.indices.get_alias(index=index_name)[index_name]["aliases"].keys()
+    else:
+        logger.info(
+            "✅ Reindex of '%s' complete (%d docs, %.0f docs/s)",
+            index_name, docs, docs_per_sec
         )
-        if src_aliases:
-            swap_aliases(es_target, index_name, new_index, src_aliases)
 
-    except exceptions.TransportError as e:
-        logger.error("TransportError during reindex of '%s': %s", index_name, e.info)
+    # 4) swap aliases
+    src_aliases = list(
+        es_source.indices.get_alias(index=index_name)[index_name]["aliases"].keys()
+    )
+    if src_aliases:
+        swap_aliases(es_target, index_name, new_index, src_aliases)
+    return {"docs": docs, "seconds": round(seconds, 3), "docs_per_sec": round(docs_per_sec, 1),
+            "failures": len(failures)}
+
+# === Parallel Scheduling ===
+
+def list_indices_by_size(es_source):
+    """Non-system source indices as dicts with index, bytes and docs, largest first."""
+    raw = es_source.cat.indices(format="json", bytes="b", h="index,store.size,docs.count,pri",
+                                expand_wildcards="all")
+    indices = [
+        {"index": i["index"], "bytes": int(i.get("store.size") or 0),
+         "docs": int(i.get("docs.count") or 0), "shards": int(i.get("pri") or 1)}
+        for i in raw if not i["index"].startswith(".")
+    ]
+    # Largest first: with tasks handed out as slots free up, the big ones start at once and
+    # the small ones fill in around them, so the total approaches the biggest index's time
+    indices.sort(key=lambda i: (i["bytes"], i["docs"]), reverse=True)
+    return indices
+
+def target_data_nodes(es_target):
+    """Number of target nodes holding any data role (data, content, hot, warm, cold)."""
+    nodes = es_target.cat.nodes(format="json", h="node.role")
+    return sum(1 for n in nodes if set(n.get("node.role", "")) & set("dshwc")) or 1
+
+def migration_slots(data_nodes, max_parallel=MAX_PARALLEL_REINDEX):
+    """Concurrent reindex tasks: the configured maximum, capped at one per target data node."""
+    return max(1, min(max_parallel, data_nodes))
+
+def admit_rate(es_target, throttle, running):
+    """
+    requests_per_second for the next task. With a controller, the running tasks give up
+    their share of the budget first; with none running there is nothing to rebalance. If
+    rethrottling fails, the new task starts at the running tasks' current rate and the next
+    adjustment sorts the budget out, rather than the error stopping the scheduler.
+    """
+    if not throttle:
+        return THROTTLE_DOCS_PER_SEC
+    if not running:
+        return throttle.task_rate(1)
+    try:
+        return throttle.admit(es_target, list(running))
     except Exception as e:
-        logger.error("Unexpected error during reindex of '%s': %s", index_name, e)
+        logger.warning("Could not make room in the reindex throttle budget: %s", e)
+        return throttle.task_rate(len(running))
+
+def run_migration_scheduler(es_source, es_target, indices, slots, resolver=None, throttle=None,
+                            data_nodes=1, report=None):
+    """
+    Keep up to `slots` reindex tasks running at once over `indices` (dicts from
+    list_indices_by_size, in the order given), each with choose_slices() slices. One
+    tasks.get per running task per poll. With a ThrottleController as `throttle`, the running
+    tasks are rethrottled to make room before each new task starts at its share, and again
+    after every poll.
+
+    Returns {index name: record}; a record has the index, "status" ("done" or "failed"),
+    "slices" and, once done, finish_reindex()'s docs/seconds/docs_per_sec/failures. Each
+    record is also written to `report` (an NDJSONWriter) as its index finishes.
+    """
+    queue = list(indices)
+    running = {}  # task id -> (index dict, new index name, slices)
+    outcome = {}
+    remote = remote_source()
+
+    def record(item, slices, status, stats=None):
+        outcome[item["index"]] = dict({"index": item["index"], "status": status, "slices": slices}, **(stats or {}))
+        if report is not None:
+            report.write(outcome[item["index"]])
+
+    while queue or running:
+        while queue and len(running) < slots:
+            item = queue.pop(0)
+            slices = choose_slices(item, data_nodes, SLICE_COUNT, remote)
+            try:
+                rate = admit_rate(es_target, throttle, running)
+                task_id, new_index = start_reindex(es_source, es_target, item["index"], resolver, rate, slices)
+                running[task_id] = (item, new_index, slices)
+                if throttle:
+                    throttle.register(task_id, rate)
+            except Exception as e:
+                logger.error("Could not start reindex of '%s': %s", item["index"], e)
+                record(item, slices, "failed")
+
+        time.sleep(POLL_INTERVAL)
+        for task_id, (item, new_index, slices) in list(running.items()):
+            try:
+                status = es_target.tasks.get(task_id=task_id)
+            except Exception as e:
+                logger.error("Lost track of reindex task %s for '%s': %s", task_id, item["index"], e)
+                record(item, slices, "failed")
+                del running[task_id]
+                continue
+            if not status.get("completed"):
+                stats = status["task"]["status"]
+                logger.info("   %s: %d/%d docs", item["index"], stats["created"], stats["total"])
+                continue
+            del running[task_id]
+            try:
+                record(item, slices, "done", finish_reindex(es_source, es_target, item["index"], new_index, status))
+            except Exception as e:
+                logger.error("Error finishing reindex of '%s': %s", item["index"], e)
+                record(item, slices, "failed")
+        if throttle and running:
+            try:
+                throttle.adjust(es_target, list(running))
+            except Exception as e:
+                logger.warning("Could not adjust reindex throttling: %s", e)
+        logger.info("📋 %d running, %d queued, %d finished", len(running), len(queue), len(outcome))
+    return outcome
 
 # === Main Orchestration ===
 def main():
@@ -300,15 +435,33 @@ def main():
     migrate_watchers()
     migrate_enrich_policies()
 
-    # Data
-    indices = es_source.cat.indices(format="json")
-    for idx in indices:
-        name = idx["index"]
-        if name.startswith("."):
-            continue
-        migrate_index(es_source, es_target, name)
+    # Data: several reindex tasks at once, biggest indices first
+    resolver = TemplateResolver.from_cluster(es_source)  # Templates compiled once for all indices
+    indices = list_indices_by_size(es_source)
+    data_nodes = target_data_nodes(es_target)
+    slots = migration_slots(data_nodes)
+    logger.info("📦 Migrating %d indices, %d at a time", len(indices), slots)
+    if remote_source() and SLICE_COUNT != 1:
+        logger.warning("⚠️  Reindex from remote can't be sliced; SLICE_COUNT=%s is ignored and "
+                       "each index is copied by one unsliced task", SLICE_COUNT)
+    throttle = ThrottleController(TARGET_WRITE_LOAD) if ADAPTIVE_THROTTLE else None
+    report = NDJSONWriter(MIGRATION_REPORT) if MIGRATION_REPORT else None
+    try:
+        outcome = run_migration_scheduler(es_source, es_target, indices, slots, resolver, throttle,
+                                          data_nodes, report)
+    finally:
+        if report is not None:
+            report.close()
+    # A task that completed with document failures didn't migrate its index either
+    failed = sorted(i for i, result in outcome.items()
+                    if result["status"] == "failed" or result.get("failures"))
+    if failed:
+        logger.error("❌ Migration finished with %d of %d indices failed: %s",
+                     len(failed), len(outcome), failed)
+        return 1
 
     logger.info("🎉 Migration completed successfully")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import boto3
+
+ROLE_SESSION_NAME = "ec2-inventory"
+SESSION_DURATION_SECONDS = 3600
+REFRESH_MARGIN = timedelta(minutes=5)  # Re-assume this long before credentials expire
+
+
+class AssumedRoleSessions:
+    """
+    Per-account boto3 sessions from sts:AssumeRole, cached until shortly before the
+    credentials expire, plus a pool of clients built from each session.
+
+    Safe to share across threads; each account has its own lock so one slow
+    AssumeRole doesn't hold up the others. Keep one instance at module level so
+    warm Lambda invocations reuse the credentials and clients.
+    """
+
+    def __init__(self, role_name, sts=None, partition="aws", refresh_margin=REFRESH_MARGIN):
+        self.role_name = role_name
+        self.partition = partition
+        self.refresh_margin = refresh_margin
+        self._sts = sts
+        self._lock = threading.Lock()
+        self._account_locks = {}
+        self._sessions = {}  # account_id -> (boto3.Session, credential expiration)
+        self._clients = {}   # account_id -> {(service, region): client}
+
+    def _account_lock(self, account_id):
+        with self._lock:
+            if self._sts is None:
+                self._sts = boto3.client("sts")
+            return self._account_locks.setdefault(account_id, threading.Lock())
+
+    def _session(self, account_id):
+        # Caller holds the account lock
+        cached = self._sessions.get(account_id)
+        if cached and cached[1] - self.refresh_margin > datetime.now(timezone.utc):
+            return cached[0]
+
+        creds = self._sts.assume_role(
+            RoleArn=f"arn:{self.partition}:iam::{account_id}:role/{self.role_name}",
+            RoleSessionName=ROLE_SESSION_NAME,
+            DurationSeconds=SESSION_DURATION_SECONDS,
+        )["Credentials"]
+        session = boto3.session.Session(
+            aws_access_key_id=creds["AccessKeyId"],
+            aws_secret_access_key=creds["SecretAccessKey"],
+            aws_session_token=creds["SessionToken"],
+        )
+        self._sessions[account_id] = (session, creds["Expiration"])
+        self._clients[account_id] = {}  # Clients hold the old credentials; drop them with the session
+        return session
+
+    def client(self, account_id, service, region=None):
+        """Return a pooled `service` client for `account_id`, re-assuming the role if needed."""
+        with self._account_lock(account_id):
+            session = self._session(account_id)
+            clients = self._clients[account_id]
+            client = clients.get((service, region))
+            if client is None:
+                client = session.client(service, region_name=region)
+                clients[(service, region)] = client
+            return client
+
+    def invalidate(self, account_id=None):
+        """Forget cached credentials and clients for one account, or for all of them."""
+        accounts = list(self._sessions) if account_id is None else [account_id]
+        for acct in accounts:
+            with self._account_lock(acct):
+                self._sessions.pop(acct, None)
+                self._clients.pop(acct, None)
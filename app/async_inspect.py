@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Concurrent cluster inspection over AsyncElasticsearch.
+
+Fetches settings, mappings, aliases, ILM policy and sample docs for many indices at once,
+with at most MAX_CONCURRENCY requests in flight, and still prints the indices in the
+order they were listed. On a remote cluster this turns N x round-trip-latency into
+roughly N / MAX_CONCURRENCY x latency.
+"""
+import asyncio
+import json
+import re
+import sys
+from collections import deque
+
+from elasticsearch import ApiError, AsyncElasticsearch
+
+from ndjson_output import OUTPUT_FORMAT, OUTPUT_PATH, NDJSONWriter
+from sampling import SAMPLE_MODE, sample_indices_async
+
+# === CONFIGURATION ===
+SOURCE_ES = "http://localhost:9200"
+USER      = "user"
+PASS      = "pass"
+
+WILDCARD_PATTERN = "*test*"
+REGEX_PATTERN = None      # Takes precedence over the wildcard when set
+SAMPLE_SIZE = 3
+SAMPLE_FIELDS = None      # Only these _source fields in the samples (wildcards allowed); None = whole documents
+MAX_CONCURRENCY = 16      # Requests in flight against the cluster at any time
+
+
+# ————————————————————————————————————————————————
+# 1) Listing
+# ————————————————————————————————————————————————
+async def list_indices(es, pattern="*", regex=None):
+    raw = await es.cat.indices(index=pattern, format="json", expand_wildcards="all")
+    pat = re.compile(regex) if regex else None
+    return [
+        idx["index"] for idx in raw
+        if not idx["index"].startswith(".") and (pat is None or pat.search(idx["index"]))
+    ]
+
+# ————————————————————————————————————————————————
+# 2) Per-index fetch
+# ————————————————————————————————————————————————
+class Inspector:
+    """Runs the per-index requests through one shared concurrency limit."""
+
+    def __init__(self, es, max_concurrency=MAX_CONCURRENCY, sample_size=SAMPLE_SIZE,
+                 sample_mode=SAMPLE_MODE, sample_fields=SAMPLE_FIELDS):
+        self.es = es
+        self.sample_size = sample_size
+        self.sample_mode = sample_mode
+        self.sample_fields = sample_fields
+        self.max_concurrency = max_concurrency
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._ilm_policies = None  # name -> policy, fetched once on first use
+        self._ilm_lock = asyncio.Lock()
+        self.ilm_error = None      # Why the policies couldn't be read, if they couldn't
+
+    async def _call(self, fn, **kwargs):
+        async with self._limit:
+            return await fn(**kwargs)
+
+    async def _ilm_policy(self, name):
+        async with self._ilm_lock:
+            if self._ilm_policies is None:
+                try:
+                    self._ilm_policies = await self._call(self.es.ilm.get_lifecycle)
+                except ApiError as e:
+                    # Typically a 403 without ILM privileges: say so once and keep just the names
+                    self._ilm_policies, self.ilm_error = {}, e.message
+                    print(f"ILM policies unavailable ({e.meta.status}); showing policy names only",
+                          file=sys.stderr)
+        if self.ilm_error is not None:
+            return {"name": name}
+        return self._ilm_policies.get(name, {})
+
+    async def _samples(self, index, shards=1):
+        """Sample docs for one index the way ReadOnly does (sampling.sample_indices)."""
+        samples = await self._call(sample_indices_async, es=self.es, indices=[index],
+                                   sample_size=self.sample_size, mode=self.sample_mode,
+                                   fields=self.sample_fields, shard_counts={index: shards})
+        return samples[index]
+
+    async def inspect_index(self, index):
+        """
+        Return {"index", "settings", "mappings", "aliases", "ilm_policy", "samples"} for one
+        index, or {"index", "error"} when a request for it fails (e.g. it was deleted after
+        the listing, or the user may not read it), so one index can't sink the whole run.
+        """
+        es = self.es
+        requests = [
+            self._call(es.indices.get_settings, index=index, expand_wildcards="all"),
+            self._call(es.indices.get_mapping, index=index, expand_wildcards="all"),
+            self._call(es.indices.get_alias, index=index, expand_wildcards="all"),
+        ]
+        if self.sample_mode != "shards":  # Spreading over shards needs number_of_shards first
+            requests.append(self._samples(index))
+        try:
+            settings, mapping, aliases, *samples = await asyncio.gather(*requests)
+            settings = settings[index]["settings"]["index"]
+            if not samples:
+                samples = [await self._samples(index, settings.get("number_of_shards", 1))]
+            policy_name = settings.get("lifecycle", {}).get("name")
+            policy = await self._ilm_policy(policy_name) if policy_name else {}
+        except ApiError as e:
+            error = e.body.get("error", e.message) if isinstance(e.body, dict) else e.message
+            return {"index": index, "error": error}
+        return {
+            "index": index,
+            "settings": settings,
+            "mappings": mapping[index]["mappings"],
+            "aliases": list(aliases[index].get("aliases", {})),
+            "ilm_policy": policy,
+            "samples": samples[0],
+        }
+
+    async def inspect(self, indices):
+        """
+        Yield inspect_index() results in the order of `indices`. A sliding window of
+        in-flight indices keeps the pipeline full while bounding how many finished
+        results wait on a slow one ahead of them.
+        """
+        window = deque()
+        pending = iter(indices)
+        window_size = max(1, self.max_concurrency)  # Enough indices to keep every request slot busy
+        for index in pending:
+            window.append(asyncio.ensure_future(self.inspect_index(index)))
+            if len(window) >= window_size:
+                break
+        try:
+            while window:
+                result = await window.popleft()
+                next_index = next(pending, None)
+                if next_index is not None:
+                    window.append(asyncio.ensure_future(self.inspect_index(next_index)))
+                yield result
+        finally:
+            for task in window:
+                task.cancel()
+
+# ————————————————————————————————————————————————
+# 3) Output
+# ————————————————————————————————————————————————
+def print_index_result(result):
+    print(f"\n=== INDEX: {result['index']} ===")
+    if "error" in result:
+        print("  (unavailable)", json.dumps(result["error"]))
+        return
+    print("\n• Settings:")
+    print(json.dumps(result["settings"], indent=2))
+    print("\n• Mappings:")
+    print(json.dumps(result["mappings"], indent=2))
+    print("\n• Aliases:", result["aliases"])
+    print("\n• ILM Policy:")
+    print(json.dumps(result["ilm_policy"], indent=2) if result["ilm_policy"] else "  (none)")
+    if isinstance(result["samples"], dict):  # The sample search failed (e.g. closed index)
+        print("\n• Sample docs: (unavailable)", json.dumps(result["samples"]["error"]))
+        return
+    print(f"\n• Sample {len(result['samples'])} docs:")
+    for doc in result["samples"]:
+        print(json.dumps(doc, indent=2))
+
+async def run(es, pattern=WILDCARD_PATTERN, regex=REGEX_PATTERN,
+              max_concurrency=MAX_CONCURRENCY, sample_size=SAMPLE_SIZE, emit=print_index_result):
+    indices = await list_indices(es, pattern, regex)
+    log = sys.stderr if emit is not print_index_result else sys.stdout  # Keep NDJSON stdout clean
+    print(f"🔍 Found {len(indices)} indices matching {'regex' if regex else 'wildcard'} "
+          f"'{regex or pattern}'", file=log)
+    inspector = Inspector(es, max_concurrency, sample_size)
+    async for result in inspector.inspect(indices):
+        emit(result)
+    return len(indices)
+
+async def main():
+    # The connection pool must be at least as large as the limit, or it becomes the limit
+    es = AsyncElasticsearch(SOURCE_ES, basic_auth=(USER, PASS), connections_per_node=MAX_CONCURRENCY)
+    try:
+        if OUTPUT_FORMAT == "ndjson":
+            with NDJSONWriter(OUTPUT_PATH) as out:
+                await run(es, emit=out.write)
+        else:
+            await run(es)
+    finally:
+        await es.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
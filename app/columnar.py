@@ -0,0 +1,84 @@
+from operator import itemgetter
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from enrichment import ENRICHMENT_COLUMNS
+from records import BASE_COLUMNS, MISSING, InstanceTable
+from s3_stream import S3MultipartWriter
+
+ROW_GROUP_SIZE = 50000  # Rows converted and written per Parquet row group
+# Every column describing the instance itself, in any inventory mode; the rest are tags
+INSTANCE_COLUMNS = BASE_COLUMNS + ENRICHMENT_COLUMNS + ('Region', 'Account ID')
+
+
+def inventory_schema(columns, base_columns=INSTANCE_COLUMNS):
+    """Plain strings for the instance columns, dictionary-encoded strings for the sparse tag columns."""
+    dict_string = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        pa.field(col, pa.string() if col in base_columns else dict_string)
+        for col in columns
+    ])
+
+def _column_chunks(instances, row_group_size):
+    """Yield (schema, per-column value lists) one row group at a time."""
+    if isinstance(instances, InstanceTable):
+        schema = inventory_schema(instances.columns, instances.base_columns)
+        for start in range(0, len(instances), row_group_size):
+            yield schema, instances.column_chunk(start, start + row_group_size)
+    else:
+        # Every key any row has; a key a row lacks becomes a null, not a placeholder string
+        schema = inventory_schema(list(dict.fromkeys(key for row in instances for key in row)))
+        getter = itemgetter(*schema.names)
+        for start in range(0, len(instances), row_group_size):
+            rows = instances[start:start + row_group_size]
+            if all(len(row) == len(schema) for row in rows):
+                # Transpose the rows column-wise in C (itemgetter + zip) instead of a Python loop per cell
+                yield schema, zip(*map(getter, rows))
+            else:
+                yield schema, [[row.get(name) for row in rows] for name in schema.names]
+
+def _record_batch(columns, schema):
+    null = pa.scalar(None, pa.string())
+    arrays = []
+    for field, values in zip(schema, columns):
+        arr = pa.array(values, type=pa.string())
+        if pa.types.is_dictionary(field.type):
+            # Absent tags already arrive as None; a tag really set to 'N/A' is kept as it is
+            arr = arr.dictionary_encode()
+        else:
+            # In the instance columns 'N/A' is the inventory's own placeholder (no public IP, say)
+            arr = pc.if_else(pc.equal(arr, MISSING), null, arr)
+        arrays.append(arr)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def write_parquet(instances, sink, row_group_size=ROW_GROUP_SIZE):
+    """Write an InstanceTable or padded instance rows to `sink` (path or writable file object)
+    as Parquet, one row group at a time."""
+    if not len(instances):
+        return
+    if not isinstance(sink, str):
+        sink = pa.PythonFile(sink, mode='w')
+
+    writer = None
+    try:
+        for schema, columns in _column_chunks(instances, row_group_size):
+            if writer is None:
+                writer = pq.ParquetWriter(sink, schema, compression='snappy')
+            batch = _record_batch(columns, schema)
+            writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_group_size)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_to_parquet_local(instances, path="ec2_instances.parquet"):
+    """Export EC2 data to a Parquet file locally."""
+    write_parquet(instances, path)
+    print(f"Parquet file saved: {path}")
+
+def export_parquet_to_s3(instances, s3, bucket, key):
+    """Stream EC2 data as Parquet straight to S3 via multipart upload."""
+    with S3MultipartWriter(s3, bucket, key, content_type="application/vnd.apache.parquet") as out:
+        write_parquet(instances, out)
+    return f"s3://{bucket}/{key}"
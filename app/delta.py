@@ -0,0 +1,100 @@
+import csv
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from records import MISSING, iter_instance_dicts
+from s3_stream import S3MultipartWriter
+
+SNAPSHOT_VERSION = 1
+
+
+def instance_hash(instance_data):
+    """Content hash of one inventory row: every present value (name, IPs, flattened tags)."""
+    # Padding is skipped so a tag key appearing elsewhere in the fleet doesn't change this row's hash
+    items = sorted((k, str(v)) for k, v in instance_data.items() if v != MISSING)
+    return hashlib.blake2b(json.dumps(items, separators=(',', ':')).encode(), digest_size=8).hexdigest()
+
+def load_snapshot(s3, bucket, key):
+    """Return the previous run's snapshot, or None if there isn't one yet."""
+    try:
+        resp = s3.get_object(Bucket=bucket, Key=key)
+    except s3.exceptions.NoSuchKey:
+        return None
+    snapshot = json.loads(gzip.decompress(resp['Body'].read()))
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        return None  # Unknown layout: fall back to a full run
+    return snapshot
+
+def save_snapshot(s3, bucket, key, snapshot):
+    body = gzip.compress(json.dumps(snapshot, separators=(',', ':')).encode())
+    s3.put_object(Bucket=bucket, Key=key, Body=body, ContentType='application/gzip')
+
+def diff_instances(instances, previous_hashes):
+    """
+    Compare current rows against the previous {InstanceId: hash} map.
+    Returns (changes, hashes): rows tagged with a 'Change' of added/changed/removed,
+    and the new hash map to store.
+    """
+    hashes = {}
+    changes = []
+    for instance_data in iter_instance_dicts(instances):
+        instance_id = instance_data['Instance ID']
+        digest = instance_hash(instance_data)
+        hashes[instance_id] = digest
+        previous = previous_hashes.get(instance_id)
+        if previous is None:
+            changes.append({'Change': 'added', **instance_data})
+        elif previous != digest:
+            changes.append({'Change': 'changed', **instance_data})
+    for instance_id in previous_hashes.keys() - hashes.keys():
+        changes.append({'Change': 'removed', 'Instance ID': instance_id})
+    return changes, hashes
+
+def write_delta_csv(changes, out):
+    """Write change rows as CSV, keeping only columns that carry a value in at least one change."""
+    columns = {'Change': None, 'Instance ID': None}
+    for row in changes:
+        columns.update((k, None) for k, v in row.items() if v != MISSING)
+    writer = csv.DictWriter(out, fieldnames=list(columns), restval=MISSING,
+                            extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(changes)
+
+def export_delta_to_s3(instances, s3, bucket, snapshot_key, delta_prefix, full_every,
+                       full_export, gzip_output=False):
+    """
+    Upload only what changed since the previous run.
+
+    Every `full_every` runs, or when no usable snapshot exists, `full_export(instances)` is
+    called instead to rewrite the full inventory (compaction). The snapshot is updated either way.
+    """
+    snapshot = load_snapshot(s3, bucket, snapshot_key)
+    runs_since_full = snapshot['runs_since_full'] + 1 if snapshot else 0
+    result = {'mode': 'delta'}
+
+    if snapshot is None or runs_since_full >= full_every:
+        result['full_s3_path'] = full_export(instances)
+        changes, hashes = diff_instances(instances, snapshot['hashes'] if snapshot else {})
+        runs_since_full = 0
+    else:
+        changes, hashes = diff_instances(instances, snapshot['hashes'])
+        if changes:
+            stamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H-%M-%SZ')
+            key = f"{delta_prefix}{stamp}.csv{'.gz' if gzip_output else ''}"
+            with S3MultipartWriter(s3, bucket, key, gzip=gzip_output) as out:
+                write_delta_csv(changes, out)
+            result['delta_s3_path'] = f"s3://{bucket}/{key}"
+
+    save_snapshot(s3, bucket, snapshot_key, {
+        'version': SNAPSHOT_VERSION,
+        'runs_since_full': runs_since_full,
+        'hashes': hashes,
+    })
+
+    counts = {'added': 0, 'changed': 0, 'removed': 0}
+    for row in changes:
+        counts[row['Change']] += 1
+    result['changes'] = counts
+    return result
@@ -0,0 +1,88 @@
+from records import MISSING
+
+# Extra columns added to every row when enrichment is on
+ENRICHMENT_COLUMNS = ('Volumes', 'Total Volume (GiB)', 'Network Interfaces', 'Security Groups')
+FILTER_BATCH_SIZE = 200  # EC2 accepts at most 200 values per filter
+
+
+class EC2Enricher:
+    """
+    Resolves the volumes, ENIs and security groups referenced by a page of instances
+    with batched, paginated describe_* calls and an in-run lookup cache.
+
+    IDs are looked up through Filters rather than VolumeIds/NetworkInterfaceIds/GroupIds,
+    so one that disappears mid-run is simply missing instead of failing the whole batch.
+    The API cost is a fixed handful of calls per page of instances, not per instance.
+    """
+
+    def __init__(self, ec2, batch_size=FILTER_BATCH_SIZE):
+        self.ec2 = ec2
+        self.batch_size = batch_size
+        self.volumes = {}          # volume id -> (size GiB, type) or None
+        self.interfaces = {}       # ENI id -> (private IP, interface type) or None
+        self.security_groups = {}  # group id -> group name or None
+        self.api_calls = 0
+
+    def _resolve(self, ids, cache, operation, filter_name, result_key, id_key, value):
+        missing = [i for i in dict.fromkeys(ids) if i not in cache]
+        paginator = self.ec2.get_paginator(operation)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            for page in paginator.paginate(Filters=[{'Name': filter_name, 'Values': batch}]):
+                self.api_calls += 1
+                for item in page[result_key]:
+                    cache[item[id_key]] = value(item)
+        for i in missing:
+            cache.setdefault(i, None)  # Gone since describe_instances ran
+
+    def enrich_page(self, instances):
+        """Return one dict of ENRICHMENT_COLUMNS values per instance in `instances`."""
+        volume_ids, eni_ids, group_ids = [], [], []
+        for instance in instances:
+            volume_ids += [m['Ebs']['VolumeId'] for m in instance.get('BlockDeviceMappings', []) if 'Ebs' in m]
+            enis = instance.get('NetworkInterfaces', [])
+            eni_ids += [eni['NetworkInterfaceId'] for eni in enis]
+            for group in instance.get('SecurityGroups', []) + [g for eni in enis for g in eni.get('Groups', [])]:
+                group_ids.append(group['GroupId'])
+                if group.get('GroupName'):
+                    # Names already in the describe_instances payload prime the cache for free
+                    self.security_groups.setdefault(group['GroupId'], group['GroupName'])
+
+        self._resolve(volume_ids, self.volumes, 'describe_volumes', 'volume-id', 'Volumes', 'VolumeId',
+                      lambda v: (v['Size'], v.get('VolumeType', '')))
+        self._resolve(eni_ids, self.interfaces, 'describe_network_interfaces', 'network-interface-id',
+                      'NetworkInterfaces', 'NetworkInterfaceId',
+                      lambda n: (n.get('PrivateIpAddress', ''), n.get('InterfaceType', '')))
+        self._resolve(group_ids, self.security_groups, 'describe_security_groups', 'group-id',
+                      'SecurityGroups', 'GroupId', lambda g: g['GroupName'])
+
+        return [self._columns(instance) for instance in instances]
+
+    def _columns(self, instance):
+        volumes, total = [], 0
+        for mapping in instance.get('BlockDeviceMappings', []):
+            if 'Ebs' not in mapping:
+                continue
+            volume_id = mapping['Ebs']['VolumeId']
+            info = self.volumes.get(volume_id)
+            if info is None:
+                volumes.append(volume_id)
+                continue
+            size, volume_type = info
+            volumes.append(f"{volume_id}:{size}GiB:{volume_type}")
+            total += size
+
+        interfaces = []
+        group_ids = [g['GroupId'] for g in instance.get('SecurityGroups', [])]
+        for eni in instance.get('NetworkInterfaces', []):
+            info = self.interfaces.get(eni['NetworkInterfaceId'])
+            interfaces.append(f"{eni['NetworkInterfaceId']}:{info[0]}:{info[1]}" if info else eni['NetworkInterfaceId'])
+            group_ids += [g['GroupId'] for g in eni.get('Groups', [])]
+        groups = [self.security_groups.get(g) or g for g in dict.fromkeys(group_ids)]
+
+        return {
+            'Volumes': ';'.join(volumes) or MISSING,
+            'Total Volume (GiB)': str(total) if volumes else MISSING,
+            'Network Interfaces': ';'.join(interfaces) or MISSING,
+            'Security Groups': ';'.join(groups) or MISSING,
+        }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+import logging
+
+from elasticsearch import Elasticsearch, helpers
+
+from delta import instance_hash
+from records import MISSING, iter_instance_dicts
+
+# === Configuration ===
+ES_URL = "http://source-es-url:9200"
+AUTH = {"user": "user", "pass": "pass"}
+INDEX_NAME = "ec2-inventory"
+CHUNK_SIZE = 1000                       # Docs per bulk request
+MAX_CHUNK_BYTES = 10 * 1024 * 1024      # ...or fewer if the request would get bigger than this
+PRUNE_MISSING = True                    # Delete docs for instances no longer in the inventory
+
+# === Logging Setup ===
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger("es_inventory")
+
+# Inventory column -> document field; every other column is a flattened tag key
+FIELDS = {
+    "Name": "name",
+    "Instance ID": "instance_id",
+    "Private IP": "private_ip",
+    "Public IP": "public_ip",
+    "Region": "region",
+    "Account ID": "account_id",
+    "Volumes": "volumes",
+    "Total Volume (GiB)": "total_volume_gib",
+    "Network Interfaces": "network_interfaces",
+    "Security Groups": "security_groups",
+}
+LIST_FIELDS = {"volumes", "network_interfaces", "security_groups"}  # ';'-joined in the CSV
+
+INVENTORY_MAPPING = {
+    "dynamic": "strict",
+    "properties": {
+        "name": {"type": "keyword"},
+        "instance_id": {"type": "keyword"},
+        "private_ip": {"type": "ip"},
+        "public_ip": {"type": "ip"},
+        "region": {"type": "keyword"},
+        "account_id": {"type": "keyword"},
+        "volumes": {"type": "keyword"},
+        "total_volume_gib": {"type": "long"},
+        "network_interfaces": {"type": "keyword"},
+        "security_groups": {"type": "keyword"},
+        # One field for every tag key: 'a.b.c' keys stay searchable as tags.a.b.c without
+        # each new key growing the mapping (and no clash between tags 'a' and 'a.b')
+        "tags": {"type": "flattened"},
+        "content_hash": {"type": "keyword"},
+    },
+}
+
+# Rewrite the doc only when its content hash differs; otherwise report a noop (no write I/O)
+UPSERT_SCRIPT = (
+    "if (ctx._source.content_hash == params.doc.content_hash) { ctx.op = 'noop' } "
+    "else { ctx._source = params.doc }"
+)
+
+
+def ensure_inventory_index(es, index=INDEX_NAME):
+    """Create the inventory index with its explicit mapping if it doesn't exist yet."""
+    if not es.indices.exists(index=index):
+        es.indices.create(index=index, mappings=INVENTORY_MAPPING)
+        logger.info("🧩 Created index '%s'", index)
+
+def instance_document(instance_data):
+    """Turn one padded inventory row into an Elasticsearch document."""
+    doc = {"tags": {}, "content_hash": instance_hash(instance_data)}
+    for column, value in instance_data.items():
+        if value == MISSING:
+            continue
+        field = FIELDS.get(column)
+        if field is None:
+            doc["tags"][column] = value
+        elif field in LIST_FIELDS:
+            doc[field] = value.split(";")
+        else:
+            doc[field] = value
+    return doc
+
+def bulk_actions(instances, index=INDEX_NAME):
+    """One scripted upsert per instance, keyed by InstanceId so re-runs are idempotent."""
+    for instance_data in iter_instance_dicts(instances):
+        doc = instance_document(instance_data)
+        yield {
+            "_op_type": "update",
+            "_index": index,
+            "_id": doc["instance_id"],
+            "script": {"source": UPSERT_SCRIPT, "lang": "painless", "params": {"doc": doc}},
+            "upsert": doc,
+        }
+
+def prune_missing(es, keep_ids, index=INDEX_NAME):
+    """Delete docs whose _id isn't in `keep_ids` (instances gone since the last run)."""
+    stale = (
+        {"_op_type": "delete", "_index": index, "_id": hit["_id"]}
+        for hit in helpers.scan(es, index=index, query={"_source": False})
+        if hit["_id"] not in keep_ids
+    )
+    deleted, _ = helpers.bulk(es, stale, chunk_size=CHUNK_SIZE, raise_on_error=False)
+    return deleted
+
+def index_inventory(es, instances, index=INDEX_NAME, prune=PRUNE_MISSING):
+    """Stream the inventory into `index` through chunked bulk requests; returns per-result counts."""
+    ensure_inventory_index(es, index)
+    counts = {"created": 0, "updated": 0, "noop": 0, "failed": 0, "deleted": 0}
+    seen = set()
+    for ok, item in helpers.streaming_bulk(
+        es, bulk_actions(instances, index),
+        chunk_size=CHUNK_SIZE, max_chunk_bytes=MAX_CHUNK_BYTES,
+        raise_on_error=False, max_retries=3,
+    ):
+        result = item["update"]
+        seen.add(result["_id"])
+        if ok:
+            counts[result.get("result", "updated")] += 1
+        else:
+            counts["failed"] += 1
+            logger.error("Failed to index %s: %s", result["_id"], result.get("error"))
+    if prune and not counts["failed"]:
+        if seen:
+            counts["deleted"] = prune_missing(es, seen, index)
+        else:
+            # An empty inventory is far likelier a failed or throttled listing than a fleet
+            # that vanished; pruning against it would delete every document in the index
+            logger.warning("⚠️  Empty inventory; not pruning '%s'", index)
+    logger.info("✅ Indexed inventory into '%s': %s", index, counts)
+    return counts
+
+
+if __name__ == "__main__":
+    import main
+
+    es = Elasticsearch(ES_URL, basic_auth=(AUTH["user"], AUTH["pass"]))
+    if main.INVENTORY_ACCOUNTS:
+        inventory, _ = main.get_ec2_inventory_multi_account(main.INVENTORY_ACCOUNTS, main.EC2_REGIONS)
+    elif main.EC2_REGIONS:
+        inventory, _ = main.get_ec2_inventory_multi_region(main.EC2_REGIONS)
+    else:
+        inventory = main.get_ec2_inventory()
+    index_inventory(es, inventory)
@@ -1,100 +1,345 @@
+# boto3 is needed on every path, so it loads during Lambda init. The exporters are imported
+# by the path that uses them (s3_stream by the S3 uploads, delta and resumable by their
+# modes, pyarrow by the Parquet export) and pandas not at all
 import boto3
-import pandas as pd
+import csv
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from accounts import AssumedRoleSessions
+from enrichment import ENRICHMENT_COLUMNS, EC2Enricher
+from records import BASE_COLUMNS, InstanceTable
 
 # AWS S3 Config (Only needed if running in Lambda)
 S3_BUCKET = "your-s3-bucket-name"  # Replace with your S3 bucket
 S3_KEY = "ec2_instances.csv"  # File name in S3
+S3_GZIP = os.environ.get("S3_GZIP", "false").lower() == "true"  # Upload as ec2_instances.csv.gz
+S3_PARQUET_KEY = "ec2_instances.parquet"  # File name in S3 for the columnar export
+
+# Inventory mode: "full" rewrites the whole CSV every run, "delta" uploads only added/changed/removed
+# instances against a keyed snapshot and rewrites the full CSV every FULL_SNAPSHOT_EVERY runs
+INVENTORY_MODE = os.environ.get("INVENTORY_MODE", "full").lower()
+S3_SNAPSHOT_KEY = "ec2_instances.snapshot.json.gz"  # InstanceId -> content hash from the previous run
+S3_DELTA_PREFIX = "ec2_instances/deltas/"
+FULL_SNAPSHOT_EVERY = int(os.environ.get("FULL_SNAPSHOT_EVERY", "24"))
+
+# Resumable mode ("resumable"): checkpoint pagination and upload state to S3 before the Lambda
+# deadline and pick up from there on the next invocation
+S3_CHECKPOINT_KEY = "ec2_instances.checkpoint.json"
+CHECKPOINT_MARGIN_MS = int(os.environ.get("CHECKPOINT_MARGIN_MS", "3000"))  # Time kept back to write the checkpoint
+RESUME_SELF_INVOKE = os.environ.get("RESUME_SELF_INVOKE", "true").lower() == "true"  # Re-invoke asynchronously after a checkpoint
+
+# Output format: "csv" (wide, 'N/A'-padded) or "parquet" (columnar, dictionary-encoded tags, real nulls)
+EXPORT_FORMAT = os.environ.get("EXPORT_FORMAT", "csv").lower()
+
+# Multi-region config: comma-separated region names, or "all" for every enabled region.
+# Empty means only the default region of boto3.client('ec2').
+EC2_REGIONS = os.environ.get("EC2_REGIONS", "")
+MAX_REGION_WORKERS = 8  # Upper bound on concurrent describe_instances fan-out
+
+# Enrichment: add attached volume sizes, ENIs and security group names via batched describe_* calls
+INVENTORY_ENRICH = os.environ.get("INVENTORY_ENRICH", "false").lower() == "true"
+
+# Multi-account config: comma-separated account IDs to inventory through an assumed role
+INVENTORY_ACCOUNTS = os.environ.get("INVENTORY_ACCOUNTS", "")
+INVENTORY_ROLE_NAME = os.environ.get("INVENTORY_ROLE_NAME", "EC2InventoryReadOnly")
+MAX_ACCOUNT_WORKERS = 16  # Upper bound on concurrent (account, region) inventories
+
+# Assumed-role credentials and clients per account, kept across warm invocations
+_account_sessions = AssumedRoleSessions(INVENTORY_ROLE_NAME)
+
+# One client per (service, region), shared across threads and reused by warm invocations
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Dotted key -> "key." prefix of its nested values, shared by every instance using that tag
+_tag_prefixes = {}
+TAG_PREFIX_CACHE_SIZE = 10000
+
+def _nested_prefix(key):
+    prefix = _tag_prefixes.get(key)
+    if prefix is None:
+        if len(_tag_prefixes) >= TAG_PREFIX_CACHE_SIZE:
+            _tag_prefixes.clear()
+        prefix = _tag_prefixes[key] = key + "."
+    return prefix
 
 def flatten_tags(tags, prefix=""):
-    """Recursively flattens nested tags into a dictionary with dot notation keys."""
+    """Flattens nested tags into a dictionary with dot notation keys, without recursion."""
     flattened = {}
     for tag in tags:
-        key = f"{prefix}{tag['Key']}"
+        key = prefix + tag['Key'] if prefix else tag['Key']
         value = tag['Value']
-        
-        if isinstance(value, dict):  # If value is nested, recursively flatten
-            nested_flattened = flatten_tags([{"Key": k, "Value": v} for k, v in value.items()], prefix=f"{key}.")
-            flattened.update(nested_flattened)
-        else:
+        if not isinstance(value, dict):
             flattened[key] = value
+            continue
+
+        # Depth-first walk over (prefix, items iterator) pairs; descending into a nested
+        # dict parks the parent's iterator on the stack so key order matches the input
+        stack = [(_nested_prefix(key), iter(value.items()))]
+        while stack:
+            nested_prefix, items = stack[-1]
+            for k, v in items:
+                if isinstance(v, dict):
+                    stack.append((_nested_prefix(nested_prefix + k), iter(v.items())))
+                    break
+                flattened[nested_prefix + k] = v
+            else:
+                stack.pop()
     return flattened
 
-def get_ec2_instances():
+def instance_row(instance):
+    """Build the (row, flattened tags) pair for one describe_instances instance."""
+    # Flatten each instance's tags exactly once
+    tag_dict = flatten_tags(instance.get('Tags', []))
+    row = {
+        'Name': tag_dict.get('Name', 'N/A'),  # Default to 'N/A' if no Name tag
+        'Instance ID': instance.get('InstanceId', ''),
+        'Private IP': instance.get('PrivateIpAddress', 'N/A'),
+        'Public IP': instance.get('PublicIpAddress', 'N/A'),
+    }
+    return row, tag_dict
+
+def iter_ec2_instances(ec2=None, enrich=False):
+    """Stream (row, flattened tags) for every EC2 instance, one describe_instances page at a time."""
+    if ec2 is None:
+        ec2 = get_ec2_client()
+    paginator = ec2.get_paginator('describe_instances')
+    enricher = EC2Enricher(ec2) if enrich else None  # Lookup cache lives for this run only
+
+    for page in paginator.paginate():
+        instances = [instance for reservation in page['Reservations'] for instance in reservation['Instances']]
+        # Volumes/ENIs/security groups for the whole page are resolved in a few batched calls
+        extra_columns = enricher.enrich_page(instances) if enricher else None
+        for n, instance in enumerate(instances):
+            row, tag_dict = instance_row(instance)
+            if extra_columns:
+                row.update(extra_columns[n])
+            yield row, tag_dict
+
+def get_client(service, region=None):
+    """Return the cached boto3 client for `service` in `region` (None = default region)."""
+    # boto3 clients are thread-safe once built, but building them off the shared session is not
+    with _clients_lock:
+        client = _clients.get((service, region))
+        if client is None:
+            client = boto3.client(service, region_name=region)
+            _clients[(service, region)] = client
+        return client
+
+def get_ec2_client(region=None):
+    """Return the cached EC2 client for `region` (None = default region)."""
+    return get_client('ec2', region)
+
+def inventory_columns(enrich=False):
+    """Base columns of an inventory, with the enrichment columns when `enrich` is set."""
+    return BASE_COLUMNS + (ENRICHMENT_COLUMNS if enrich else ())
+
+def get_ec2_inventory(ec2=None, enrich=False):
+    """Fetch all EC2 instances into a compact InstanceTable in one streaming pass."""
+    inventory = InstanceTable(inventory_columns(enrich))
+    for row, tag_dict in iter_ec2_instances(ec2, enrich):
+        inventory.append(row, tag_dict)
+    return inventory
+
+def get_ec2_instances(ec2=None):
     """Fetch all EC2 instances and their details."""
-    ec2 = boto3.client('ec2')
-    response = ec2.describe_instances()
-    
-    instance_list = []
-    all_tags = set()
-    
-    # First pass to collect all possible tag keys
-    for reservation in response['Reservations']:
-        for instance in reservation['Instances']:
-            tags = instance.get('Tags', [])
-            print(tags)
-            tag_dict = flatten_tags(tags)
-            all_tags.update(tag_dict.keys())
-    
-    # Second pass to collect instance details
-    for reservation in response['Reservations']:
-        for instance in reservation['Instances']:
-            instance_id = instance.get('InstanceId', '')
-            private_ip = instance.get('PrivateIpAddress', 'N/A')
-            public_ip = instance.get('PublicIpAddress', 'N/A')
-            
-            # Extract tags into a dictionary
-            tags = instance.get('Tags', [])
-            tag_dict = flatten_tags(tags)
-            name = tag_dict.get('Name', 'N/A')  # Default to 'N/A' if no Name tag
-            
-            # Create a row with instance details
-            instance_data = {
-                'Name': name,
-                'Instance ID': instance_id,
-                'Private IP': private_ip,
-                'Public IP': public_ip,
-            }
-            
-            # Add all known tag keys to ensure consistent columns
-            for tag in all_tags:
-                instance_data[tag] = tag_dict.get(tag, 'N/A')
-            
-            instance_list.append(instance_data)
-    
-    return instance_list
+    return get_ec2_inventory(ec2).to_dicts()
+
+def resolve_regions(regions):
+    """Turn a region list or comma-separated string (or "all") into a list of region names."""
+    if isinstance(regions, str):
+        regions = [r.strip() for r in regions.split(",") if r.strip()]
+    if regions == ["all"]:
+        response = get_ec2_client().describe_regions()
+        regions = sorted(r['RegionName'] for r in response['Regions'])
+    return list(regions)
 
-def export_to_csv_local(instances):
+def get_ec2_inventory_multi_region(regions, max_workers=MAX_REGION_WORKERS, enrich=False):
+    """
+    Fetch EC2 instances from several regions concurrently and merge them into one InstanceTable.
+    Returns (inventory, timings) where timings maps region -> seconds spent in that region.
+    """
+    regions = resolve_regions(regions)
+
+    def inventory_region(region):
+        start = time.perf_counter()
+        region_inventory = get_ec2_inventory(get_ec2_client(region), enrich)
+        elapsed = time.perf_counter() - start
+        print(f"Region {region}: {len(region_inventory)} instances in {elapsed:.2f}s")
+        return region_inventory, elapsed
+
+    inventory = InstanceTable(inventory_columns(enrich) + ('Region',))
+    timings = {}
+    workers = max(1, min(max_workers, len(regions)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map() keeps region order, so the merged output is deterministic
+        for region, (region_inventory, elapsed) in zip(regions, pool.map(inventory_region, regions)):
+            inventory.extend(region_inventory, Region=region)
+            timings[region] = round(elapsed, 3)
+
+    return inventory, timings
+
+def get_ec2_instances_multi_region(regions, max_workers=MAX_REGION_WORKERS):
+    """
+    Fetch EC2 instances from several regions concurrently and merge them into one CSV schema.
+    Returns (instance_list, timings) where timings maps region -> seconds spent in that region.
+    """
+    inventory, timings = get_ec2_inventory_multi_region(regions, max_workers)
+    return inventory.to_dicts(), timings
+
+def get_ec2_inventory_multi_account(accounts, regions=None, max_workers=MAX_ACCOUNT_WORKERS,
+                                    sessions=None, enrich=False):
+    """
+    Fetch EC2 instances from several accounts (and optionally regions) concurrently through
+    assumed roles and merge them into one InstanceTable with an Account ID column.
+    Returns (inventory, timings) where timings maps "account/region" -> seconds.
+    """
+    if sessions is None:
+        sessions = _account_sessions
+    if isinstance(accounts, str):
+        accounts = [a.strip() for a in accounts.split(",") if a.strip()]
+    regions = resolve_regions(regions) if regions else [None]
+    targets = [(account_id, region) for account_id in accounts for region in regions]
+
+    def inventory_target(target):
+        account_id, region = target
+        start = time.perf_counter()
+        target_inventory = get_ec2_inventory(sessions.client(account_id, 'ec2', region), enrich)
+        elapsed = time.perf_counter() - start
+        print(f"Account {account_id} {region or 'default region'}: "
+              f"{len(target_inventory)} instances in {elapsed:.2f}s")
+        return target_inventory, elapsed
+
+    base_columns = inventory_columns(enrich) + ('Account ID',) + (('Region',) if regions != [None] else ())
+    inventory = InstanceTable(base_columns)
+    timings = {}
+    workers = max(1, min(max_workers, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (account_id, region), (target_inventory, elapsed) in zip(targets, pool.map(inventory_target, targets)):
+            inventory.extend(target_inventory, **{'Account ID': account_id, 'Region': region})
+            timings[f"{account_id}/{region}" if region else account_id] = round(elapsed, 3)
+
+    return inventory, timings
+
+def export_to_csv_local(instances, path="ec2_instances.csv"):
     """Export EC2 data to a CSV file locally."""
-    df = pd.DataFrame(instances)
-    df.to_csv("ec2_instances.csv", index=False)
-    print("CSV file saved: ec2_instances.csv")
-
-def export_to_s3(instances):
-    """Export EC2 data to a CSV and upload it to S3 (for Lambda)."""
-    df = pd.DataFrame(instances)
-    csv_filename = "/tmp/ec2_instances.csv"  # Temp storage in Lambda
-    
-    # Save CSV locally in /tmp (Lambda's writable directory)
-    df.to_csv(csv_filename, index=False)
-    
-    # Upload to S3
-    s3 = boto3.client('s3')
-    s3.upload_file(csv_filename, S3_BUCKET, S3_KEY)
+    with open(path, "w", newline="") as f:
+        write_csv(instances, f)
+    print(f"CSV file saved: {path}")
+
+def write_csv(instances, out):
+    """Encode instance rows (InstanceTable or list of dicts) as CSV onto any writable `out`, one row at a time."""
+    if not len(instances):
+        return
+    if isinstance(instances, InstanceTable):
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(instances.columns)
+        writer.writerows(instances.iter_rows())
+        return
+    columns = list(instances[0].keys())
+    writer = csv.DictWriter(out, fieldnames=columns, restval='N/A', lineterminator='\n')
+    writer.writeheader()
+    for instance_data in instances:
+        writer.writerow(instance_data)
+
+def export_to_s3(instances, gzip=S3_GZIP, s3=None):
+    """Stream EC2 data as CSV straight to S3 via multipart upload (for Lambda)."""
+    from s3_stream import S3MultipartWriter
 
-    return f"s3://{S3_BUCKET}/{S3_KEY}"
+    key = f"{S3_KEY}.gz" if gzip else S3_KEY
+    if s3 is None:
+        s3 = get_client('s3')
+
+    # Rows are encoded incrementally and shipped part by part; nothing touches /tmp
+    with S3MultipartWriter(s3, S3_BUCKET, key, gzip=gzip) as out:
+        write_csv(instances, out)
+
+    return f"s3://{S3_BUCKET}/{key}"
+
+def resumable_lambda_handler(event, context):
+    """Lambda entry point for fleets too large for one invocation's timeout."""
+    from resumable import run_resumable_inventory
+
+    result = run_resumable_inventory(
+        get_ec2_client(), get_client('s3'), S3_BUCKET, S3_KEY, S3_CHECKPOINT_KEY, context,
+        instance_row, CHECKPOINT_MARGIN_MS, gzip_output=S3_GZIP
+    )
+    # Every invocation handles at least one page or row batch before it checkpoints, so
+    # re-invoking always moves the run forward
+    if result["status"] == "checkpointed" and context is not None and RESUME_SELF_INVOKE:
+        get_client('lambda').invoke(
+            FunctionName=context.invoked_function_arn, InvocationType='Event',
+            Payload=json.dumps(event or {}).encode()
+        )
+        result["message"] = "Checkpointed; resuming in a new invocation"
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps(result)
+    }
 
 def lambda_handler(event, context):
     """AWS Lambda entry point."""
-    instances = get_ec2_instances()
-    s3_path = export_to_s3(instances)
+    accounts = (event or {}).get("accounts") or INVENTORY_ACCOUNTS
+    regions = (event or {}).get("regions") or EC2_REGIONS
+    export_format = (event or {}).get("format") or EXPORT_FORMAT
+    mode = (event or {}).get("mode") or INVENTORY_MODE
+    enrich = (event or {}).get("enrich", INVENTORY_ENRICH)
+    if isinstance(enrich, str):  # Same rule as INVENTORY_ENRICH: "false", "0" or "" must not turn it on
+        enrich = enrich.lower() == "true"
+    body = {"message": f"{export_format.upper()} uploaded"}
+
+    if mode == "resumable":
+        # One account and region to CSV; refuse options it would otherwise silently ignore
+        unsupported = [name for name, value in (("accounts", accounts), ("regions", regions), ("enrich", enrich),
+                                                ("format", export_format != "csv")) if value]
+        if unsupported:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"message": f"Resumable mode doesn't support: {', '.join(unsupported)}"})
+            }
+        return resumable_lambda_handler(event, context)
+
+    if accounts:
+        instances, body["account_timings"] = get_ec2_inventory_multi_account(accounts, regions, enrich=enrich)
+    elif regions:
+        instances, body["region_timings"] = get_ec2_inventory_multi_region(regions, enrich=enrich)
+    else:
+        instances = get_ec2_inventory(enrich=enrich)
+
+    if mode == "delta":
+        from delta import export_delta_to_s3
+        body["message"] = "Delta uploaded"
+        body.update(export_delta_to_s3(
+            instances, get_client('s3'), S3_BUCKET, S3_SNAPSHOT_KEY, S3_DELTA_PREFIX,
+            FULL_SNAPSHOT_EVERY, full_export=export_to_s3, gzip_output=S3_GZIP
+        ))
+    elif export_format == "parquet":
+        # pyarrow is only needed (and only imported) for the columnar export
+        from columnar import export_parquet_to_s3
+        body["s3_path"] = export_parquet_to_s3(instances, get_client('s3'), S3_BUCKET, S3_PARQUET_KEY)
+    else:
+        body["s3_path"] = export_to_s3(instances)
     
     return {
         "statusCode": 200,
-        "body": json.dumps({"message": "CSV uploaded", "s3_path": s3_path})
+        "body": json.dumps(body)
     }
 
 if __name__ == "__main__":
     # Running locally
-    instances = get_ec2_instances()
-    export_to_csv_local(instances)
+    if INVENTORY_ACCOUNTS:
+        instances, _ = get_ec2_inventory_multi_account(INVENTORY_ACCOUNTS, EC2_REGIONS, enrich=INVENTORY_ENRICH)
+    elif EC2_REGIONS:
+        instances, _ = get_ec2_inventory_multi_region(EC2_REGIONS, enrich=INVENTORY_ENRICH)
+    else:
+        instances = get_ec2_inventory(enrich=INVENTORY_ENRICH)
+    if EXPORT_FORMAT == "parquet":
+        from columnar import export_to_parquet_local
+        export_to_parquet_local(instances)
+    else:
+        export_to_csv_local(instances)
@@ -1,5 +1,14 @@
 from elasticsearch import Elasticsearch
 import json
+from collections import defaultdict
+
+from ndjson_output import OUTPUT_FORMAT, OUTPUT_PATH, NDJSONWriter
+
+# Elasticsearch defaults, used when an index doesn't override them
+DEFAULT_TOTAL_FIELDS_LIMIT = 1000
+DEFAULT_DEPTH_LIMIT = 20
+WARN_AT = 0.8                 # Flag indices past this fraction of either limit
+MAX_CONFLICT_INDICES = 10     # Index names listed per conflicting type in the report
 
 # === configure your client ===
 es = Elasticsearch(
@@ -21,5 +30,120 @@ def print_index_mapping(es_client, index_name):
     print(f"Mappings for index '{index_name}':\n")
     print(json.dumps(mappings, indent=2))
 
+def write_index_mappings(es_client, pattern, out):
+    """
+    Stream one compact {"index", "mappings"} record per index matching `pattern` to an
+    NDJSONWriter; a single wildcard request instead of one per index.
+    """
+    resp = es_client.indices.get_mapping(index=pattern, expand_wildcards="all")
+    for index_name, body in resp.items():
+        out.write({"index": index_name, "mappings": body.get("mappings", {})})
+
+def mapping_fields(mappings):
+    """
+    Walk a mapping without recursion and yield (path, type, depth) for every mapped field:
+    object and nested fields, leaves, multi-fields ("title.raw") and runtime fields. These
+    are what index.mapping.total_fields.limit counts; depth is the object nesting level.
+    """
+    stack = [("", mappings.get("properties", {}), 1)]
+    while stack:
+        prefix, properties, depth = stack.pop()
+        for name, spec in properties.items():
+            path = prefix + name
+            children = spec.get("properties")
+            yield path, spec.get("type", "object"), depth
+            if children:
+                stack.append((path + ".", children, depth + 1))
+            for sub, sub_spec in spec.get("fields", {}).items():
+                yield f"{path}.{sub}", sub_spec.get("type", "object"), depth
+    for name, spec in mappings.get("runtime", {}).items():
+        yield name, f"runtime:{spec.get('type', 'keyword')}", 1
+
+def analyze_mappings(mappings_by_index, settings_by_index=None):
+    """
+    Field-explosion and type-conflict report over {index: mappings}.
+
+    Returns {"indices": {index: {"fields", "depth", "dynamic", "dynamic_templates",
+    "total_fields_limit", "depth_limit", "warnings"}}, "conflicts": {path: {type: [indices]}}}.
+    `settings_by_index` ({index: index settings}) supplies per-index limits when given.
+    """
+    settings_by_index = settings_by_index or {}
+    types_by_path = defaultdict(lambda: defaultdict(list))  # path -> type -> indices
+    indices = {}
+    for index, mappings in mappings_by_index.items():
+        fields = depth = 0
+        for path, field_type, field_depth in mapping_fields(mappings):
+            fields += 1
+            if field_depth > depth:
+                depth = field_depth
+            types_by_path[path][field_type].append(index)
+
+        mapping_settings = settings_by_index.get(index, {}).get("mapping", {})
+        fields_limit = int(mapping_settings.get("total_fields", {}).get("limit", DEFAULT_TOTAL_FIELDS_LIMIT))
+        depth_limit = int(mapping_settings.get("depth", {}).get("limit", DEFAULT_DEPTH_LIMIT))
+        warnings = []
+        if fields >= fields_limit * WARN_AT:
+            warnings.append(f"{fields}/{fields_limit} fields")
+        if depth >= depth_limit * WARN_AT:
+            warnings.append(f"depth {depth}/{depth_limit}")
+        dynamic = str(mappings.get("dynamic", "true")).lower()
+        if dynamic == "true" and fields >= fields_limit * WARN_AT:
+            warnings.append("dynamic mapping on: new fields keep adding up")
+        indices[index] = {
+            "fields": fields,
+            "depth": depth,
+            "dynamic": dynamic,
+            "dynamic_templates": [name for t in mappings.get("dynamic_templates", []) for name in t],
+            "total_fields_limit": fields_limit,
+            "depth_limit": depth_limit,
+            "warnings": warnings,
+        }
+
+    conflicts = {
+        path: {t: idx[:MAX_CONFLICT_INDICES] for t, idx in types.items()}
+        for path, types in types_by_path.items()
+        if len(types) > 1
+    }
+    return {"indices": indices, "conflicts": conflicts}
+
+def mapping_report(es_client, pattern):
+    """Analyze every index matching `pattern` with one mapping and one settings request."""
+    mappings = es_client.indices.get_mapping(index=pattern, expand_wildcards="all")
+    settings = es_client.indices.get_settings(
+        index=pattern, expand_wildcards="all",
+        filter_path="*.settings.index.mapping",  # Only the limits, not every setting of every index
+    )
+    return analyze_mappings(
+        {i: body.get("mappings", {}) for i, body in mappings.items() if not i.startswith(".")},
+        {i: body["settings"]["index"] for i, body in settings.items()},
+    )
+
+def print_mapping_report(report):
+    print(f"{'index':<40}{'fields':>8}{'limit':>7}{'depth':>6}  dynamic  templates")
+    for index, info in sorted(report["indices"].items(), key=lambda kv: -kv[1]["fields"]):
+        print(f"{index:<40}{info['fields']:>8}{info['total_fields_limit']:>7}{info['depth']:>6}  "
+              f"{info['dynamic']:<7}  {len(info['dynamic_templates'])}"
+              + (f"  ⚠️  {'; '.join(info['warnings'])}" if info["warnings"] else ""))
+    print(f"\nType conflicts across indices: {len(report['conflicts'])} field paths")
+    for path, types in sorted(report["conflicts"].items()):
+        print(f"  {path}: " + ", ".join(f"{t} ({len(idx)}: {', '.join(idx[:3])}...)" if len(idx) > 3
+                                        else f"{t} ({', '.join(idx)})" for t, idx in types.items()))
+
 if __name__ == "__main__":
-    print_index_mapping(es, "your-index-name")
\ No newline at end of file
+    import sys
+    if sys.argv[1:2] == ["--report"]:
+        # python mapping.py --report "logs-*": field explosion / type conflict report
+        report = mapping_report(es, sys.argv[2] if len(sys.argv) > 2 else "*")
+        if OUTPUT_FORMAT == "ndjson":
+            with NDJSONWriter(OUTPUT_PATH) as out:
+                for index, info in report["indices"].items():
+                    out.write(dict(info, type="index", index=index))
+                for path, types in report["conflicts"].items():
+                    out.write({"type": "conflict", "path": path, "types": types})
+        else:
+            print_mapping_report(report)
+    elif OUTPUT_FORMAT == "ndjson":
+        with NDJSONWriter(OUTPUT_PATH) as out:
+            write_index_mappings(es, "your-index-name", out)
+    else:
+        print_index_mapping(es, "your-index-name")
\ No newline at end of file
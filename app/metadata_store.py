@@ -0,0 +1,191 @@
+import fnmatch
+import json
+import os
+import sqlite3
+import sys
+import time
+from urllib.parse import quote
+
+from elasticsearch import ApiError
+
+# Local cache of index metadata between inspection runs; "" disables it
+METADATA_DB = os.environ.get("METADATA_DB", "es_metadata.sqlite")
+# Bytes of comma-joined index names per settings/mapping/alias request when refetching;
+# the names go in the URL path and Elasticsearch caps the request line at 4 KB by default
+FETCH_BATCH_BYTES = 3000
+
+VERSIONS_FILTER = ",".join(
+    f"metadata.indices.*.{field}" for field in ("settings_version", "mapping_version", "aliases_version")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indices (
+    uuid         TEXT PRIMARY KEY,
+    name         TEXT NOT NULL,
+    version_key  TEXT NOT NULL,   -- settings:mapping:aliases versions from the cluster state
+    settings     TEXT NOT NULL,   -- JSON
+    mappings     TEXT NOT NULL,
+    aliases      TEXT NOT NULL,
+    fetched_at   REAL NOT NULL
+)
+"""
+
+
+def _batches(names, max_bytes=FETCH_BATCH_BYTES):
+    """Split `names` into comma-joined expressions of at most `max_bytes` once URL-encoded."""
+    batch, size = [], 0
+    for name in names:
+        length = len(quote(name, safe="")) + 1  # With its comma
+        if batch and size + length > max_bytes:
+            yield ",".join(batch)
+            batch, size = [], 0
+        batch.append(name)
+        size += length
+    if batch:
+        yield ",".join(batch)
+
+def _matches(pattern, name):
+    """Whether `name` falls under an Elasticsearch index expression like "logs-*,-logs-old*"."""
+    included = False
+    for part in pattern.split(","):
+        if part.startswith("-"):
+            if fnmatch.fnmatchcase(name, part[1:]):
+                included = False
+        elif part in ("_all", "*") or fnmatch.fnmatchcase(name, part):
+            included = True
+    return included
+
+
+class MetadataStore:
+    """
+    On-disk snapshot of index settings, mappings and aliases, keyed by index UUID.
+
+    refresh() lists the indices (`_cat/indices`, name + uuid) and their settings / mapping /
+    aliases versions (one filtered cluster-state request), then refetches only the indices
+    that are new or whose versions moved, in batches. A repeat audit of an unchanged cluster
+    costs two small requests (plus one for ILM policies) however many indices it has.
+
+    Reading the cluster state needs the `monitor` cluster privilege. Without it every
+    index is refetched on every refresh, which costs what Helpers.load_index_metadata does.
+    """
+
+    def __init__(self, path=METADATA_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(indices)")]
+        if "mapping_hash" in columns:
+            self.db.execute("DROP TABLE indices")  # Older layout; it's only a cache, so start over
+        self.db.execute(SCHEMA)
+        self.last_refresh = {}  # Counts from the most recent refresh()
+
+    def close(self):
+        self.db.close()
+
+    def _current(self, es, pattern):
+        """{uuid: (name, version key)} for the non-system indices matching `pattern` right now."""
+        cat = es.cat.indices(index=pattern, format="json", h="index,uuid", expand_wildcards="all")
+        try:
+            state = es.cluster.state(metric="metadata", index=pattern, expand_wildcards="all",
+                                     filter_path=VERSIONS_FILTER)
+            versions = state.get("metadata", {}).get("indices", {})
+        except ApiError as e:
+            # Typically a 403 for users without `monitor`: no versions, so everything is refetched
+            print(f"Cluster state unavailable ({e.meta.status}); refetching all index metadata",
+                  file=sys.stderr)
+            versions = {}
+        current = {}
+        for row in cat:
+            name = row["index"]
+            if name.startswith("."):
+                continue
+            v = versions.get(name, {})
+            parts = (v.get("settings_version"), v.get("mapping_version"), v.get("aliases_version"))
+            # No versions (cluster state not readable / too old): always refetch that index
+            current[row["uuid"]] = (name, ":".join(map(str, parts)) if None not in parts else None)
+        return current
+
+    def _fetch(self, es, names):
+        """Full metadata for `names`, a batch of index names per request."""
+        fetched = {}
+        # An index deleted since the listing must not 404 the whole batch; it is just left out
+        options = {"expand_wildcards": "all", "ignore_unavailable": True, "allow_no_indices": True}
+        for expression in _batches(names):
+            settings = es.indices.get_settings(index=expression, **options)
+            mappings = es.indices.get_mapping(index=expression, **options)
+            aliases = es.indices.get_alias(index=expression, **options)
+            for name, body in settings.items():
+                fetched[name] = {
+                    "settings": body["settings"]["index"],
+                    "mappings": mappings.get(name, {}).get("mappings", {}),
+                    "aliases": list(aliases.get(name, {}).get("aliases", {})),
+                }
+        return fetched
+
+    def refresh(self, es, pattern="*"):
+        """
+        Bring the snapshot up to date for `pattern` and return it in the same shape as
+        Helpers.load_index_metadata: {index: {"settings", "mappings", "aliases", "ilm_policy"}}.
+        """
+        return self._with_policies(es, self._refresh(es, pattern))
+
+    def refresh_indices(self, es, names):
+        """
+        refresh() for exactly `names` (say, the indices a regex selected), listed in
+        comma-joined batches that keep each URL under the request-line limit, rather than a
+        wildcard that would list and refetch the whole cluster.
+        """
+        snapshot, totals = {}, {"indices": 0, "refetched": 0, "removed": 0}
+        for expression in _batches(names):
+            snapshot.update(self._refresh(es, expression))
+            for key, count in self.last_refresh.items():
+                totals[key] += count
+        self.last_refresh = totals
+        return self._with_policies(es, snapshot)
+
+    def _refresh(self, es, pattern):
+        """Sync the stored rows for `pattern` with the cluster; the snapshot without ILM policies."""
+        current = self._current(es, pattern)
+        known = {uuid: version_key for uuid, name, version_key
+                 in self.db.execute("SELECT uuid, name, version_key FROM indices")
+                 if _matches(pattern, name)}
+
+        stale = [uuid for uuid, (name, version_key) in current.items()
+                 if version_key is None or known.get(uuid) != version_key]
+        gone = [uuid for uuid in known if uuid not in current]
+
+        fetched = self._fetch(es, [current[uuid][0] for uuid in stale]) if stale else {}
+        now = time.time()
+        rows = []
+        for uuid in stale:
+            name, version_key = current[uuid]
+            m = fetched.get(name)
+            if m is None:
+                continue  # Deleted between the listing and the fetch
+            rows.append((uuid, name, version_key or "", json.dumps(m["settings"]), json.dumps(m["mappings"]),
+                         json.dumps(m["aliases"]), now))
+        with self.db:
+            self.db.executemany("DELETE FROM indices WHERE uuid = ?", [(uuid,) for uuid in gone])
+            self.db.executemany("INSERT OR REPLACE INTO indices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.last_refresh = {"indices": len(current), "refetched": len(fetched), "removed": len(gone)}
+        return self.snapshot(uuids=list(current))
+
+    def _with_policies(self, es, snapshot):
+        """Add each index's "ilm_policy" to `snapshot`."""
+        # Policy edits don't bump index versions, so policies are never cached: one call per refresh
+        policy_names = {m["settings"].get("lifecycle", {}).get("name") for m in snapshot.values()} - {None}
+        policies = es.ilm.get_lifecycle() if policy_names else {}
+        for entry in snapshot.values():
+            name = entry["settings"].get("lifecycle", {}).get("name")
+            entry["ilm_policy"] = policies.get(name, {}) if name else {}
+        return snapshot
+
+    def snapshot(self, uuids=None):
+        """Stored settings/mappings/aliases, optionally limited to `uuids`, keyed by index name."""
+        rows = self.db.execute("SELECT uuid, name, settings, mappings, aliases FROM indices")
+        wanted = set(uuids) if uuids is not None else None
+        return {
+            name: {"settings": json.loads(settings), "mappings": json.loads(mappings),
+                   "aliases": json.loads(aliases)}
+            for uuid, name, settings, mappings, aliases in rows
+            if wanted is None or uuid in wanted
+        }
@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+
+# Inspector output: "text" (indented, for humans) or "ndjson" (one compact JSON record per line)
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "text").lower()
+OUTPUT_PATH = os.environ.get("OUTPUT_PATH", "-")  # "-" = stdout
+
+
+def _jsonable(value):
+    # Client responses (ObjectApiResponse/ListApiResponse) wrap the parsed body
+    body = getattr(value, "body", None)
+    if body is not None:
+        return body
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class NDJSONWriter:
+    """
+    Streams one compact JSON document per line to a file or stdout, flushing after each so
+    the output can be piped into jq (or read with pandas.read_json(lines=True)) while the
+    inspection is still running. Nothing is kept once a record has been written.
+    """
+
+    def __init__(self, path=OUTPUT_PATH):
+        self.path = path
+        self._out = sys.stdout if path in (None, "-") else open(path, "w", encoding="utf-8")
+        self.records = 0
+
+    def write(self, record):
+        self._out.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=_jsonable))
+        self._out.write("\n")
+        self._out.flush()
+        self.records += 1
+
+    def close(self):
+        if self._out is not sys.stdout:
+            self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Read-only EC2 inventory query service.
+
+Loads the inventory CSV written by main.py (local path or s3://bucket/key, optionally
+.gz) into in-memory hash indexes and answers lookups such as "instances with tag
+Team=X" or "who owns 10.1.2.3" without re-parsing the CSV per question. The snapshot
+is reloaded in the background when the source changes; requests keep using the
+previous index until the new one is fully built.
+
+    INVENTORY_SOURCE=s3://my-bucket/ec2_instances.csv python query_service.py
+
+    GET /instances?tag=Team=payments&tag=Environment   (tag key=value or key only; ANDed)
+    GET /instances?tag=Name=web-1&limit=10             (limit: 0..MAX_RESULTS, else 400)
+    GET /instances?name_prefix=web-
+    GET /ip/10.1.2.3                                   (private or public IP)
+    GET /health
+    POST /reload
+"""
+import bisect
+import csv
+import gzip
+import io
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import Flask, jsonify, request
+
+from enrichment import ENRICHMENT_COLUMNS
+from records import BASE_COLUMNS, MISSING, TAG_COLUMN_PREFIX
+
+# === Configuration ===
+INVENTORY_SOURCE = os.environ.get("INVENTORY_SOURCE", "ec2_instances.csv")
+RELOAD_INTERVAL = int(os.environ.get("RELOAD_INTERVAL", "60"))  # Seconds between change checks
+MAX_RESULTS = 1000
+
+# Columns that describe the instance itself rather than a tag. Name is left out: it holds
+# the instance's Name tag, so tag=Name=web-1 matches like any other tag
+NON_TAG_COLUMNS = (set(BASE_COLUMNS) - {'Name'}) | set(ENRICHMENT_COLUMNS) | {'Region', 'Account ID'}
+
+
+class InventoryIndex:
+    """Hash indexes over one immutable inventory snapshot."""
+
+    def __init__(self, columns, rows):
+        self.records = []                   # Row id -> dict of the row's present values
+        self.by_tag = defaultdict(list)     # (tag key, value) -> row ids
+        self.by_tag_key = defaultdict(list)  # tag key -> row ids
+        self.by_ip = defaultdict(list)      # private or public IP -> row ids
+        names = []
+        for row in rows:
+            row_id = len(self.records)
+            record = {c: v for c, v in zip(columns, row) if v not in (None, '', MISSING)}
+            self.records.append(record)
+            for column, value in record.items():
+                if column not in NON_TAG_COLUMNS:
+                    # A tag that collided with a base column was exported as "tag:<key>"
+                    key = column[len(TAG_COLUMN_PREFIX):] if column.startswith(TAG_COLUMN_PREFIX) else column
+                    self.by_tag[(key, value)].append(row_id)
+                    self.by_tag_key[key].append(row_id)
+            for column in ('Private IP', 'Public IP'):
+                if column in record:
+                    self.by_ip[record[column]].append(row_id)
+            if 'Name' in record:
+                names.append((record['Name'].casefold(), row_id))
+        # Tag postings become sets so multi-filter queries intersect in C
+        self.by_tag = {k: frozenset(ids) for k, ids in self.by_tag.items()}
+        self.by_tag_key = {k: frozenset(ids) for k, ids in self.by_tag_key.items()}
+        names.sort()
+        self._names = [n for n, _ in names]
+        self._name_ids = [row_id for _, row_id in names]
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.records)
+
+    def tag_ids(self, key, value=None):
+        """Row ids with tag `key` (set to `value` when given)."""
+        if value is None:
+            return self.by_tag_key.get(key, frozenset())
+        return self.by_tag.get((key, value), frozenset())
+
+    def ip_ids(self, ip):
+        return self.by_ip.get(ip, [])
+
+    def name_prefix_ids(self, prefix):
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self._names, prefix)
+        stop = bisect.bisect_left(self._names, prefix + "\U0010ffff", start)
+        return self._name_ids[start:stop]
+
+    def query(self, tags=(), name_prefix=None, limit=MAX_RESULTS):
+        """Row dicts matching every (key, value-or-None) tag filter and the name prefix."""
+        candidates = [self.tag_ids(key, value) for key, value in tags]
+        if name_prefix:
+            candidates.append(frozenset(self.name_prefix_ids(name_prefix)))
+        if not candidates:
+            return []
+        candidates.sort(key=len)  # Set intersection walks the smallest posting set first
+        matches = sorted(candidates[0].intersection(*candidates[1:]))
+        return [self.records[row_id] for row_id in matches[:limit]]
+
+    @classmethod
+    def from_table(cls, inventory):
+        """Index an InstanceTable (e.g. straight from main.get_ec2_inventory)."""
+        return cls(inventory.columns, inventory.iter_rows(missing=None))
+
+    @classmethod
+    def from_csv(cls, stream):
+        reader = csv.reader(stream)
+        columns = next(reader, [])
+        return cls(columns, reader)
+
+
+def read_source(source):
+    """Return (text stream, version) for a local path or s3:// URL; version changes when the data does."""
+    if source.startswith("s3://"):
+        import boto3
+        bucket, key = source[len("s3://"):].split("/", 1)
+        resp = boto3.client("s3").get_object(Bucket=bucket, Key=key)
+        raw = resp["Body"].read()
+        version = resp["ETag"]
+    else:
+        with open(source, "rb") as f:
+            raw = f.read()
+        version = os.stat(source).st_mtime_ns
+    if source.endswith(".gz"):
+        raw = gzip.decompress(raw)
+    return io.StringIO(raw.decode("utf-8"), newline=""), version
+
+def source_version(source):
+    """Cheap change check: S3 ETag via HEAD, or local mtime."""
+    if source.startswith("s3://"):
+        import boto3
+        bucket, key = source[len("s3://"):].split("/", 1)
+        return boto3.client("s3").head_object(Bucket=bucket, Key=key)["ETag"]
+    return os.stat(source).st_mtime_ns
+
+
+class InventoryService:
+    """Owns the current index and swaps in a rebuilt one when the source changes."""
+
+    def __init__(self, source=INVENTORY_SOURCE, index=None):
+        self.source = source
+        self.index = index if index is not None else InventoryIndex([], [])
+        self.version = None
+        self._reload_lock = threading.Lock()
+
+    def reload(self, force=False):
+        """Rebuild the index if the source changed; returns True when a new snapshot was swapped in."""
+        with self._reload_lock:
+            if not force and self.version is not None and source_version(self.source) == self.version:
+                return False
+            stream, version = read_source(self.source)
+            index = InventoryIndex.from_csv(stream)
+            # Single reference assignment: in-flight requests finish on the old index
+            self.index, self.version = index, version
+            return True
+
+    def watch(self, interval=RELOAD_INTERVAL):
+        """Start a daemon thread that reloads the snapshot whenever the source changes."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Inventory reload failed, keeping previous snapshot: {e}")
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+def create_app(service):
+    app = Flask(__name__)
+
+    @app.get("/instances")
+    def instances():
+        tags = []
+        for tag in request.args.getlist("tag"):
+            key, _, value = tag.partition("=")
+            tags.append((key, value if "=" in tag else None))
+        limit = request.args.get("limit", str(MAX_RESULTS))
+        if not limit.isdigit():  # Also rejects negatives, which would slice from the end
+            return jsonify(error=f"limit must be a non-negative integer, got {limit!r}"), 400
+        limit = min(int(limit), MAX_RESULTS)
+        results = service.index.query(tags, request.args.get("name_prefix"), limit)
+        return jsonify(count=len(results), instances=results)
+
+    @app.get("/ip/<ip>")
+    def by_ip(ip):
+        index = service.index
+        return jsonify(instances=[index.records[row_id] for row_id in index.ip_ids(ip)])
+
+    @app.get("/health")
+    def health():
+        index = service.index
+        return jsonify(instances=len(index), loaded_at=index.loaded_at, version=str(service.version))
+
+    @app.post("/reload")
+    def reload():
+        return jsonify(reloaded=service.reload(force=True), instances=len(service.index))
+
+    return app
+
+
+if __name__ == "__main__":
+    service = InventoryService(INVENTORY_SOURCE)
+    service.reload(force=True)
+    print(f"Loaded {len(service.index)} instances from {INVENTORY_SOURCE}")
+    service.watch()
+    create_app(service).run(host="0.0.0.0", port=int(os.environ.get("PORT", "8080")), threaded=True)
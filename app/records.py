@@ -0,0 +1,147 @@
+import sys
+from array import array
+
+# Columns every inventory row carries ahead of the flattened tag columns
+BASE_COLUMNS = ('Name', 'Instance ID', 'Private IP', 'Public IP')
+MISSING = 'N/A'  # Placeholder for absent values in padded output
+# Base columns filled from the tag of the same name, so that tag adds nothing of its own
+TAG_SOURCED_COLUMNS = ('Name',)
+# A tag whose key collides with another base column (e.g. a "Region" tag next to the
+# multi-region Region column) goes in a column with this prefix instead of being dropped
+TAG_COLUMN_PREFIX = 'tag:'
+
+
+def tag_column(key, base_columns=BASE_COLUMNS):
+    """Column name for tag `key` next to `base_columns`, or None when a base column holds it already."""
+    if key not in base_columns:
+        return key
+    if key in TAG_SOURCED_COLUMNS:
+        return None
+    return TAG_COLUMN_PREFIX + key
+
+
+class InstanceTable:
+    """
+    Compact, column-indexed store for inventory rows.
+
+    Instead of one dict per instance padded with every tag key in the fleet, the table
+    keeps one list per base column plus a single sparse (CSR-style) tag store: for each
+    row a slice of column positions and values in two flat arrays. Column names live
+    once in a shared index (tag keys interned), and repeated values such as
+    "Environment=prod" are stored once. Exporters read rows or column chunks straight
+    from it; `to_dicts()` rebuilds the padded list-of-dicts form when needed.
+    """
+
+    __slots__ = ('base_columns', 'columns', '_index', '_base',
+                 '_tag_offsets', '_tag_columns', '_tag_values', '_strings')
+
+    def __init__(self, base_columns=BASE_COLUMNS):
+        self.base_columns = tuple(base_columns)
+        self.columns = list(self.base_columns)  # Shared column order: base columns, then tag keys
+        self._index = {name: pos for pos, name in enumerate(self.columns)}
+        self._base = tuple([] for _ in self.base_columns)  # One value list per base column
+        self._tag_offsets = array('I', [0])  # Row r's tags live at [offsets[r], offsets[r + 1])
+        self._tag_columns = array('I')       # Column position of each stored tag
+        self._tag_values = []                # Value of each stored tag
+        self._strings = {}                   # Dedupe table for repeated values
+
+    def __len__(self):
+        return len(self._tag_offsets) - 1
+
+    def _intern(self, value):
+        if isinstance(value, str):
+            return self._strings.setdefault(value, value)
+        return value
+
+    def _column_position(self, key):
+        pos = self._index.get(key)
+        if pos is None:
+            key = sys.intern(key)
+            pos = len(self.columns)
+            self.columns.append(key)
+            self._index[key] = pos
+        return pos
+
+    def _tag_position(self, key):
+        """Column position for tag `key`; None for a tag a base column already holds (see tag_column)."""
+        pos = self._column_position(key)
+        if pos >= len(self.base_columns):
+            return pos
+        column = tag_column(key, self.base_columns)
+        return None if column is None else self._column_position(column)
+
+    def append(self, row, tag_dict):
+        """Add one instance: `row` holds the base columns, `tag_dict` its flattened tags."""
+        for name, values in zip(self.base_columns, self._base):
+            values.append(self._intern(row.get(name, MISSING)))
+        for key, value in tag_dict.items():
+            pos = self._tag_position(key)
+            if pos is None:
+                continue  # e.g. the Name tag, already held by the Name column
+            self._tag_columns.append(pos)
+            self._tag_values.append(self._intern(value))
+        self._tag_offsets.append(len(self._tag_columns))
+
+    def extend(self, other, **base_values):
+        """Append every row of `other`, remapping its tag columns onto this table's index.
+        Base columns `other` lacks (e.g. Region) are filled from `base_values`."""
+        count = len(other)
+        for name, values in zip(self.base_columns, self._base):
+            if name in other.base_columns:  # Not other._index: that has its tag columns too
+                values.extend(other._base[other._index[name]])
+            else:
+                values.extend([self._intern(base_values.get(name, MISSING))] * count)
+
+        # A tag column of `other` may collide with a base column only this table has (Region)
+        remap = [None] * len(other.base_columns)
+        remap += [self._tag_position(name) for name in other.columns[len(other.base_columns):]]
+        offsets, columns, tag_values = other._tag_offsets, other._tag_columns, other._tag_values
+        for r in range(count):
+            for j in range(offsets[r], offsets[r + 1]):
+                pos = remap[columns[j]]
+                if pos is None:
+                    continue
+                self._tag_columns.append(pos)
+                self._tag_values.append(self._intern(tag_values[j]))
+            self._tag_offsets.append(len(self._tag_columns))
+
+    def iter_rows(self, missing=MISSING):
+        """Yield each row as a list aligned with `columns`, absent tags set to `missing`."""
+        width = len(self.columns)
+        n_base = len(self.base_columns)
+        offsets, columns, tag_values = self._tag_offsets, self._tag_columns, self._tag_values
+        for r, base in enumerate(zip(*self._base)):
+            row = [missing] * width
+            row[:n_base] = base
+            for j in range(offsets[r], offsets[r + 1]):
+                row[columns[j]] = tag_values[j]
+            yield row
+
+    def iter_dicts(self, missing=MISSING):
+        """Yield padded per-instance dicts one at a time."""
+        columns = self.columns
+        for row in self.iter_rows(missing):
+            yield dict(zip(columns, row))
+
+    def to_dicts(self, missing=MISSING):
+        """The padded list-of-dicts form returned by get_ec2_instances."""
+        return list(self.iter_dicts(missing))
+
+    def column_chunk(self, start, stop, missing=None):
+        """Return values for rows [start, stop) as one list per column, absent tags set to `missing`."""
+        stop = min(stop, len(self))
+        size = stop - start
+        chunk = [values[start:stop] for values in self._base]
+        chunk += [[missing] * size for _ in range(len(self.columns) - len(self.base_columns))]
+        offsets, columns, tag_values = self._tag_offsets, self._tag_columns, self._tag_values
+        for r in range(start, stop):
+            for j in range(offsets[r], offsets[r + 1]):
+                chunk[columns[j]][r - start] = tag_values[j]
+        return chunk
+
+
+def iter_instance_dicts(instances):
+    """Iterate padded row dicts from either an InstanceTable or a list of dicts."""
+    if isinstance(instances, InstanceTable):
+        return instances.iter_dicts()
+    return iter(instances)
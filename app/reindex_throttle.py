@@ -0,0 +1,116 @@
+import logging
+
+from elasticsearch import ApiError
+
+# === Throttle controller defaults ===
+TARGET_WRITE_LOAD = 0.8             # (active + queued) / threads of the write pool, busiest data node
+LOAD_DEADBAND = 0.1                 # No change while the load is within ±10% of the target
+MAX_INDEX_LATENCY_MS = 5.0          # Per-doc indexing time above which the rate comes down anyway
+INITIAL_TOTAL_DOCS_PER_SEC = 10000  # Shared by the running tasks before the first measurement
+MIN_TASK_DOCS_PER_SEC = 100
+MAX_TOTAL_DOCS_PER_SEC = 500000
+MAX_STEP_UP = 1.5                   # Largest increase per adjustment
+MAX_STEP_DOWN = 0.5                 # Largest proportional decrease; a full queue reads as a huge load
+REJECTION_BACKOFF = 0.5             # Rate multiplier whenever write rejections grew
+RETHROTTLE_MIN_CHANGE = 0.1         # Skip rethrottle calls for changes under 10%
+
+STATS_FILTER = ",".join((
+    "nodes.*.thread_pool.write",
+    "nodes.*.indices.indexing.index_total",
+    "nodes.*.indices.indexing.index_time_in_millis",
+))
+
+logger = logging.getLogger("es_migration")
+
+
+class ThrottleController:
+    """
+    Feedback control of reindex throttling. Every adjust() samples the target's write
+    thread pools and indexing counters (one filtered _nodes/stats request), scales the
+    total docs/s budget of the running reindex tasks toward `target_load`, and
+    rethrottles each task to its share with _reindex/<task>/_rethrottle.
+
+    Scaling is proportional (target / measured load, kept between MAX_STEP_DOWN and
+    MAX_STEP_UP per step) with a deadband around the target; new write rejections halve
+    the budget and a per-doc indexing time over `max_latency_ms` cuts it in proportion.
+    """
+
+    def __init__(self, target_load=TARGET_WRITE_LOAD, initial_rate=INITIAL_TOTAL_DOCS_PER_SEC,
+                 max_latency_ms=MAX_INDEX_LATENCY_MS):
+        self.target_load = target_load
+        self.max_latency_ms = max_latency_ms
+        self.rate = float(initial_rate)  # Total docs/s across all running tasks
+        self._applied = {}               # Task id -> requests_per_second last set on it
+        self.history = []                # One dict per adjust(): load, latency_ms, rejected, rate
+        self._counters = None            # (rejected, index_total, index_time_in_millis) last sample
+
+    def task_rate(self, tasks):
+        """requests_per_second for each of `tasks` running tasks under the current budget."""
+        return max(MIN_TASK_DOCS_PER_SEC, self.rate / max(tasks, 1))
+
+    def admit(self, es, task_ids):
+        """
+        Make room in the budget for one more task next to `task_ids` (the running tasks):
+        they are rethrottled to their share of n + 1 tasks right away, before the new task
+        starts, and the new task's requests_per_second is returned.
+        """
+        self._rebalance(es, task_ids, len(task_ids) + 1)
+        return self.task_rate(len(task_ids) + 1)
+
+    def register(self, task_id, rate):
+        """Record a task started at `rate` (from admit()) so later adjustments include it."""
+        self._applied[task_id] = rate
+
+    def _rebalance(self, es, task_ids, tasks):
+        """Rethrottle `task_ids` to the budget's share for `tasks` tasks, skipping small changes."""
+        per_task = self.task_rate(tasks)
+        for task_id in task_ids:
+            old = self._applied.get(task_id)
+            if old is None or abs(per_task - old) > old * RETHROTTLE_MIN_CHANGE:
+                try:
+                    es.reindex_rethrottle(task_id=task_id, requests_per_second=per_task)
+                except ApiError as e:  # Usually a task that finished since the last poll
+                    logger.warning("Could not rethrottle reindex task %s: %s", task_id, e)
+                    continue
+                self._applied[task_id] = per_task
+
+    def sample(self, es):
+        """(load of the busiest write pool, cumulative rejections, index_total, index_time_in_millis)."""
+        stats = es.nodes.stats(metric="thread_pool,indices", index_metric="indexing", filter_path=STATS_FILTER)
+        load, rejected, index_total, index_ms = 0.0, 0, 0, 0
+        for node in stats.get("nodes", {}).values():
+            write = node.get("thread_pool", {}).get("write")
+            if not write:
+                continue  # Not a data node
+            load = max(load, (write.get("active", 0) + write.get("queue", 0)) / max(write.get("threads", 1), 1))
+            rejected += write.get("rejected", 0)
+            indexing = node.get("indices", {}).get("indexing", {})
+            index_total += indexing.get("index_total", 0)
+            index_ms += indexing.get("index_time_in_millis", 0)
+        return load, rejected, index_total, index_ms
+
+    def adjust(self, es, task_ids):
+        """Measure the target, update the budget and rethrottle `task_ids` (the running tasks)."""
+        load, rejected, index_total, index_ms = self.sample(es)
+        previous, self._counters = self._counters, (rejected, index_total, index_ms)
+        # Counters only mean something as deltas; a node restart can make them go backwards
+        new_rejections = max(0, rejected - previous[0]) if previous else 0
+        docs = index_total - previous[1] if previous else 0
+        latency_ms = (index_ms - previous[2]) / docs if docs > 0 else 0.0
+
+        if abs(load - self.target_load) <= self.target_load * LOAD_DEADBAND:
+            scale = 1.0
+        else:
+            scale = min(max(self.target_load / load, MAX_STEP_DOWN), MAX_STEP_UP) if load > 0 else MAX_STEP_UP
+        if new_rejections:
+            scale = min(scale, REJECTION_BACKOFF)
+        if latency_ms > self.max_latency_ms:
+            scale = min(scale, self.max_latency_ms / latency_ms)
+        self.rate = min(max(self.rate * scale, MIN_TASK_DOCS_PER_SEC * len(task_ids)), MAX_TOTAL_DOCS_PER_SEC)
+        self.history.append({"load": load, "latency_ms": latency_ms, "rejected": new_rejections,
+                             "rate": self.rate})
+
+        self._rebalance(es, task_ids, len(task_ids))
+        self._applied = {task_id: rps for task_id, rps in self._applied.items() if task_id in task_ids}
+        logger.info("🎚️  Write load %.2f, %.2f ms/doc, %d rejections → %.0f docs/s over %d tasks",
+                    load, latency_ms, new_rejections, self.rate, len(task_ids))
@@ -0,0 +1,221 @@
+import csv
+import json
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+from records import BASE_COLUMNS, MISSING, tag_column
+from s3_stream import S3MultipartWriter
+
+CHECKPOINT_VERSION = 2
+PAGE_SIZE = 1000                 # MaxResults per describe_instances call
+ROWS_PER_DEADLINE_CHECK = 1000   # How often the export phase looks at the clock
+CHECKPOINT_MAX_AGE = 6 * 3600    # Older checkpoints are abandoned and the run starts over
+LEASE_SECONDS = 900              # Lease length outside Lambda (in Lambda: the time the invocation has left)
+LEASE_SLACK = 60                 # Added to every lease so a holder's last writes land before it lapses
+
+
+def time_left_ms(context):
+    """Milliseconds left in this Lambda invocation (unbounded when run outside Lambda)."""
+    return context.get_remaining_time_in_millis() if context is not None else float("inf")
+
+def load_checkpoint(s3, bucket, key):
+    """Return (state, pending bytes) from a previous invocation, or (None, b"")."""
+    try:
+        state = json.loads(s3.get_object(Bucket=bucket, Key=key)["Body"].read())
+    except s3.exceptions.NoSuchKey:
+        return None, b""
+    if state.get("version") != CHECKPOINT_VERSION:
+        return None, b""
+    pending = b""
+    if state.get("pending_key"):
+        pending = s3.get_object(Bucket=bucket, Key=state["pending_key"])["Body"].read()
+    return state, pending
+
+def save_checkpoint(s3, bucket, key, state, pending):
+    """
+    Persist `state` and the writer's unfilled part. The part goes to a key numbered for
+    this save, named in the state JSON, so writing the JSON is the single commit point: an
+    invocation that dies in between leaves the previous state and its pending bytes as
+    they were.
+    """
+    previous = state.get("pending_key")
+    state["checkpoint_seq"] = state.get("checkpoint_seq", 0) + 1
+    state["pending_key"] = f"{key}.pending.{state['checkpoint_seq']}" if pending else None
+    if pending:
+        s3.put_object(Bucket=bucket, Key=state["pending_key"], Body=pending)
+    s3.put_object(Bucket=bucket, Key=key, Body=json.dumps(state).encode(),
+                  ContentType="application/json")
+    if previous and previous != state["pending_key"]:
+        s3.delete_object(Bucket=bucket, Key=previous)
+
+def clear_checkpoint(s3, bucket, key, state=None):
+    s3.delete_object(Bucket=bucket, Key=key)
+    if state and state.get("pending_key"):
+        s3.delete_object(Bucket=bucket, Key=state["pending_key"])
+
+def _precondition_failed(error):
+    return error.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict")
+
+def acquire_lease(s3, bucket, key, context):
+    """
+    Take the lease on the checkpoint at `key` for this invocation. Returns the lease (its
+    key and the ETag this invocation wrote, for release_lease), or None while another
+    invocation holds an unexpired lease. The lease object is created
+    with If-None-Match, or taken over with If-Match once expired, so of two overlapping
+    invocations only one can win it.
+    """
+    lease_key = f"{key}.lease"
+    seconds = min(time_left_ms(context) / 1000, LEASE_SECONDS) + LEASE_SLACK
+    body = json.dumps({"owner": uuid.uuid4().hex, "expires_at": time.time() + seconds}).encode()
+    condition = {"IfNoneMatch": "*"}
+    try:
+        held = s3.get_object(Bucket=bucket, Key=lease_key)
+    except s3.exceptions.NoSuchKey:
+        held = None
+    if held is not None:
+        if json.loads(held["Body"].read())["expires_at"] > time.time():
+            return None
+        condition = {"IfMatch": held["ETag"]}
+    try:
+        resp = s3.put_object(Bucket=bucket, Key=lease_key, Body=body, ContentType="application/json", **condition)
+    except ClientError as e:
+        if _precondition_failed(e):
+            return None  # Another invocation got there first
+        raise
+    return {"key": lease_key, "etag": resp["ETag"]}
+
+def release_lease(s3, bucket, lease):
+    """Delete the lease only if it is still the one acquire_lease wrote for this invocation."""
+    try:
+        s3.delete_object(Bucket=bucket, Key=lease["key"], IfMatch=lease["etag"])
+    except ClientError as e:
+        if not _precondition_failed(e):
+            raise
+        # This invocation overran its lease and another one took it over; that lease is theirs
+        print(f"Lease {lease['key']} was taken over by another invocation; leaving it in place")
+
+def abandon_checkpoint(s3, bucket, key, state):
+    """Abort any half-finished multipart uploads a stale checkpoint refers to and forget it."""
+    for name in ("staging", "output"):
+        writer_state = state.get(name)
+        if writer_state and writer_state.get("upload_id"):
+            S3MultipartWriter.resume(s3, writer_state).abort()
+    clear_checkpoint(s3, bucket, key, state)
+
+
+def run_resumable_inventory(ec2, s3, bucket, key, checkpoint_key, context, instance_row,
+                            margin_ms, gzip_output=False):
+    """
+    Inventory EC2 into s3://bucket/key across as many invocations as it takes.
+
+    Phase "collect" pages describe_instances and appends one compact NDJSON line per
+    instance to a staging object through multipart upload, growing the tag-column union.
+    Phase "export" streams the staging object back and writes the final CSV, now that
+    the full header is known. Whenever fewer than `margin_ms` remain, the pagination
+    token or staging byte offset and the open multipart upload are checkpointed to S3,
+    and the next invocation picks up from there.
+
+    One invocation at a time works on a checkpoint: an overlapping one (say, a scheduled
+    run firing while a resumed run is still going) finds the lease taken and returns
+    {"status": "busy"} without touching anything.
+    """
+    lease = acquire_lease(s3, bucket, checkpoint_key, context)
+    if lease is None:
+        return {"status": "busy", "message": "Another invocation holds the checkpoint lease"}
+    try:
+        return _run(ec2, s3, bucket, key, checkpoint_key, context, instance_row, margin_ms, gzip_output)
+    finally:
+        release_lease(s3, bucket, lease)
+
+def _run(ec2, s3, bucket, key, checkpoint_key, context, instance_row, margin_ms, gzip_output):
+    state, pending = load_checkpoint(s3, bucket, checkpoint_key)
+    if state and time.time() - state["started_at"] > CHECKPOINT_MAX_AGE:
+        abandon_checkpoint(s3, bucket, checkpoint_key, state)
+        state, pending = None, b""
+
+    staging_key = f"{key}.staging.ndjson"
+    if state is None:
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "started_at": time.time(),
+            "phase": "collect",
+            "next_token": None,
+            "tag_columns": [],
+            "instances": 0,
+            "invocations": 0,
+            "staging": None,
+            "output": None,
+        }
+    state["invocations"] += 1
+    progress = 0  # Pages or rows handled by this invocation
+
+    def suspend(writer_name, writer):
+        state[writer_name], writer_pending = writer.checkpoint()
+        save_checkpoint(s3, bucket, checkpoint_key, state, writer_pending)
+        return {"status": "checkpointed", "phase": state["phase"], "progress": progress,
+                "instances": state["instances"], "invocations": state["invocations"]}
+
+    if state["phase"] == "collect":
+        if state["staging"]:
+            staging = S3MultipartWriter.resume(s3, state["staging"], pending)
+        else:
+            staging = S3MultipartWriter(s3, bucket, staging_key, content_type="application/x-ndjson")
+        tag_columns = dict.fromkeys(state["tag_columns"])
+        token = state["next_token"]
+
+        while True:
+            kwargs = {"MaxResults": PAGE_SIZE}
+            if token:
+                kwargs["NextToken"] = token
+            page = ec2.describe_instances(**kwargs)
+            for reservation in page["Reservations"]:
+                for instance in reservation["Instances"]:
+                    row, tag_dict = instance_row(instance)
+                    tag_columns.update(dict.fromkeys(tag_dict))
+                    staging.write(json.dumps([list(row.values()), tag_dict], separators=(",", ":")) + "\n")
+                    state["instances"] += 1
+            progress += 1
+            token = page.get("NextToken")
+            if not token:
+                break
+            if time_left_ms(context) < margin_ms:
+                state["next_token"] = token
+                state["tag_columns"] = list(tag_columns)
+                return suspend("staging", staging)
+
+        staging.close()
+        state.update(phase="export", next_token=None, tag_columns=list(tag_columns),
+                     staging=None, offset=0, staging_size=staging.bytes_out)
+        pending = b""
+
+    # Export phase: staging NDJSON -> final CSV with the complete header
+    tag_keys = [k for k in state["tag_columns"] if tag_column(k) is not None]
+    if state["output"]:
+        output = S3MultipartWriter.resume(s3, state["output"], pending)
+    else:
+        output = S3MultipartWriter(s3, bucket, f"{key}.gz" if gzip_output else key, gzip=gzip_output)
+    writer = csv.writer(output, lineterminator="\n")
+    if not state["output"] and state["instances"]:
+        writer.writerow(list(BASE_COLUMNS) + [tag_column(k) for k in tag_keys])
+
+    offset = state["offset"]
+    if offset < state["staging_size"]:
+        body = s3.get_object(Bucket=bucket, Key=staging_key, Range=f"bytes={offset}-")["Body"]
+        for line in body.iter_lines():
+            offset += len(line) + 1
+            base, tags = json.loads(line)
+            writer.writerow(base + [tags.get(k, MISSING) for k in tag_keys])
+            progress += 1
+            if progress % ROWS_PER_DEADLINE_CHECK == 0 and offset < state["staging_size"] \
+                    and time_left_ms(context) < margin_ms:
+                body.close()
+                state["offset"] = offset
+                return suspend("output", output)
+
+    output.close()
+    s3.delete_object(Bucket=bucket, Key=staging_key)
+    clear_checkpoint(s3, bucket, checkpoint_key, state)
+    return {"status": "complete", "s3_path": f"s3://{bucket}/{output.key}",
+            "instances": state["instances"], "invocations": state["invocations"]}
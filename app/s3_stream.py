@@ -0,0 +1,143 @@
+import zlib
+
+# S3 multipart rules: every part except the last must be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class S3MultipartWriter:
+    """
+    File-like sink that streams bytes to s3://bucket/key as multipart upload parts.
+
+    Data (optionally gzipped) is buffered until a part fills, then uploaded, so peak
+    memory stays around one part regardless of how much is written. Output that
+    never fills a single part is sent with one plain put_object instead.
+    """
+
+    def __init__(self, s3, bucket, key, part_size=DEFAULT_PART_SIZE, gzip=False,
+                 content_type="text/csv"):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.gzip = gzip
+        self.content_type = "application/gzip" if gzip else content_type
+        self.bytes_in = 0   # bytes handed to write()
+        self.bytes_out = 0  # bytes sent to S3
+        self._compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31 -> gzip container
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = None
+        self.closed = False
+
+    def write(self, data):
+        """Buffer `data` (str or bytes) and upload a part whenever the buffer fills."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        size = len(data)
+        self.bytes_in += size
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        self._buffer += data
+        if len(self._buffer) >= self.part_size:
+            self._flush_part()
+        return size
+
+    def _flush_part(self):
+        if self._upload_id is None:
+            resp = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )
+            self._upload_id = resp["UploadId"]
+        part_number = len(self._parts) + 1
+        resp = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=self._buffer
+        )
+        self._parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+        self.bytes_out += len(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self):
+        """Flush the remaining bytes and finish the upload."""
+        if self.closed:
+            return
+        if self._compressor is not None:
+            self._buffer += self._compressor.flush()
+        if self._upload_id is None:
+            # Everything fit inside one part: a single PUT is cheaper than a multipart round trip
+            self.s3.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer),
+                ContentType=self.content_type
+            )
+            self.bytes_out += len(self._buffer)
+            self._buffer = bytearray()
+        else:
+            if self._buffer:
+                self._flush_part()
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+        self.closed = True
+
+    def checkpoint(self):
+        """
+        Suspend the upload so another process can finish it.
+
+        Returns (state, pending): a JSON-serialisable dict for `resume()` and the bytes
+        buffered but not yet uploaded, which the caller must persist alongside it. A gzip
+        stream is ended here and `resume()` starts a new member; concatenated gzip members
+        decode as one stream.
+        """
+        if self._compressor is not None:
+            self._buffer += self._compressor.flush()
+        state = {
+            "bucket": self.bucket,
+            "key": self.key,
+            "part_size": self.part_size,
+            "gzip": self.gzip,
+            "content_type": self.content_type,
+            "upload_id": self._upload_id,
+            "parts": self._parts,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+        pending = bytes(self._buffer)
+        self._buffer = bytearray()
+        self.closed = True
+        return state, pending
+
+    @classmethod
+    def resume(cls, s3, state, pending=b""):
+        """Rebuild a writer from `checkpoint()` output and carry on appending to the same upload."""
+        writer = cls(s3, state["bucket"], state["key"], part_size=state["part_size"],
+                     gzip=state["gzip"], content_type=state["content_type"])
+        writer.content_type = state["content_type"]
+        writer._upload_id = state["upload_id"]
+        writer._parts = list(state["parts"])
+        writer.bytes_in = state["bytes_in"]
+        writer.bytes_out = state["bytes_out"]
+        writer._buffer = bytearray(pending)
+        return writer
+
+    def abort(self):
+        """Drop buffered data and abort the multipart upload so S3 discards uploaded parts."""
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+            )
+        self._buffer = bytearray()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
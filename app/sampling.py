@@ -0,0 +1,98 @@
+import json
+
+# === Sampling defaults ===
+SAMPLE_MODE = "random"         # "random", "shards" (spread over primary shards) or "first" (old match_all)
+MSEARCH_BATCH = 100            # Searches per _msearch round trip
+MAX_CONCURRENT_SEARCHES = 8    # Server-side parallelism inside one _msearch
+MAX_DOC_BYTES = 16 * 1024      # Larger sampled docs are replaced by a stub; None = no cap
+MAX_INDEX_BYTES = 64 * 1024    # Stop adding docs for an index past this many bytes; None = no cap
+
+# Only the sampled sources (and per-search errors) come back over the wire
+FILTER_PATH = "responses.hits.hits._source,responses.error,responses.status"
+
+
+def _query(mode, seed):
+    if mode == "first":
+        return {"match_all": {}}
+    random_score = {"seed": seed, "field": "_seq_no"} if seed is not None else {}
+    return {"function_score": {"query": {"match_all": {}}, "random_score": random_score,
+                               "boost_mode": "replace"}}
+
+def _searches(index, sample_size, mode, fields, seed, shards):
+    """(index, msearch header, body) for one index: one search, or one per primary shard."""
+    body = {"size": sample_size, "query": _query(mode, seed), "track_total_hits": False,
+            "_source": fields if fields else True}
+    if mode != "shards" or shards <= 1:
+        return [(index, {"index": index}, body)]
+    # Spread the sample across shards; shards past the sample size get nothing
+    per_shard = [sample_size // shards + (1 if s < sample_size % shards else 0) for s in range(shards)]
+    return [(index, {"index": index, "preference": f"_shards:{s}"}, dict(body, size=size))
+            for s, size in enumerate(per_shard) if size]
+
+def _capped(docs, max_doc_bytes, max_index_bytes, kept):
+    """Apply the per-doc and per-index byte caps; `kept` is the index's byte count so far."""
+    out = []
+    for doc in docs:
+        size = len(json.dumps(doc, separators=(",", ":")))
+        if max_doc_bytes is not None and size > max_doc_bytes:
+            doc, size = {"_truncated": True, "_bytes": size}, 0
+        if max_index_bytes is not None and kept + size > max_index_bytes:
+            break
+        kept += size
+        out.append(doc)
+    return out, kept
+
+
+def _plan(indices, sample_size, mode, fields, seed, shard_counts, batch_size):
+    """The searches for `indices`, cut into (batch, msearch body) pairs of `batch_size`."""
+    shard_counts = shard_counts or {}
+    searches = [s for index in indices
+                for s in _searches(index, sample_size, mode, fields, seed, int(shard_counts.get(index, 1)))]
+    batches = [searches[start:start + batch_size] for start in range(0, len(searches), batch_size)]
+    return [(batch, [line for _, header, search in batch for line in (header, search)]) for batch in batches]
+
+def _collect(samples, kept, batch, resp, max_doc_bytes, max_index_bytes):
+    """Fold one _msearch response for `batch` into `samples`, tracking bytes in `kept`."""
+    for (index, _, _), result in zip(batch, resp.get("responses", [])):
+        if "error" in result:
+            samples[index] = {"error": result["error"]}
+            continue
+        if isinstance(samples[index], dict):
+            continue  # Another shard of this index already failed
+        docs = [hit.get("_source", {}) for hit in result.get("hits", {}).get("hits", [])]
+        docs, kept[index] = _capped(docs, max_doc_bytes, max_index_bytes, kept[index])
+        samples[index].extend(docs)
+
+
+def sample_indices(es, indices, sample_size=3, mode=SAMPLE_MODE, fields=None, seed=None,
+                   shard_counts=None, max_doc_bytes=MAX_DOC_BYTES, max_index_bytes=MAX_INDEX_BYTES,
+                   batch_size=MSEARCH_BATCH):
+    """
+    Sample up to `sample_size` docs from every index in `indices` through batched _msearch
+    requests. Returns {index: [source, ...]} in the order of `indices`; an index whose
+    search failed maps to {"error": ...} instead.
+
+    mode "random" scores docs with random_score (reproducible with `seed`), "shards" also
+    spreads the sample over each index's primary shards (`shard_counts`: {index: shards},
+    e.g. from number_of_shards) and "first" is the plain match_all. `fields` projects
+    `_source` (wildcards allowed); the byte caps bound what is kept per doc and per index.
+    """
+    samples = {index: [] for index in indices}
+    kept = dict.fromkeys(indices, 0)
+    for batch, body in _plan(indices, sample_size, mode, fields, seed, shard_counts, batch_size):
+        resp = es.msearch(searches=body, max_concurrent_searches=MAX_CONCURRENT_SEARCHES,
+                          filter_path=FILTER_PATH)
+        _collect(samples, kept, batch, resp, max_doc_bytes, max_index_bytes)
+    return samples
+
+async def sample_indices_async(es, indices, sample_size=3, mode=SAMPLE_MODE, fields=None, seed=None,
+                               shard_counts=None, max_doc_bytes=MAX_DOC_BYTES,
+                               max_index_bytes=MAX_INDEX_BYTES, batch_size=MSEARCH_BATCH):
+    """sample_indices() over an AsyncElasticsearch client."""
+    samples = {index: [] for index in indices}
+    kept = dict.fromkeys(indices, 0)
+    for batch, body in _plan(indices, sample_size, mode, fields, seed, shard_counts, batch_size):
+        resp = await es.msearch(searches=body, max_concurrent_searches=MAX_CONCURRENT_SEARCHES,
+                                filter_path=FILTER_PATH)
+        _collect(samples, kept, batch, resp, max_doc_bytes, max_index_bytes)
+    return samples
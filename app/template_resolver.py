@@ -0,0 +1,124 @@
+import re
+from collections import defaultdict
+
+
+def _flatten_settings(settings, prefix=""):
+    """{"index": {"number_of_shards": 1}} / {"index.number_of_shards": 1} -> {"number_of_shards": 1}"""
+    flat = {}
+    for key, value in settings.items():
+        key = prefix + key
+        if isinstance(value, dict):
+            flat.update(_flatten_settings(value, key + "."))
+        else:
+            flat[key[len("index."):] if key.startswith("index.") else key] = value
+    return flat
+
+def _deep_merge(base, override):
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class TemplateResolver:
+    """
+    Resolves which composable index template Elasticsearch would apply to an index name.
+
+    Every `index_patterns` entry is compiled once and bucketed by its literal prefix and
+    suffix (the text before the first and after the last `*`), so a lookup only touches the
+    patterns whose ends the index name actually has, plus exact names, instead of
+    fnmatch-ing every pattern of every template. Like Elasticsearch, `*` is the only wildcard, and when several
+    templates match the one with the highest `priority` wins (ties go to the name, which
+    Elasticsearch itself rejects at template creation time).
+    """
+
+    def __init__(self, index_templates, component_templates=None):
+        self.templates = list(index_templates)
+        if isinstance(component_templates, list):  # Raw get_component_template() entries
+            component_templates = {c["name"]: c["component_template"] for c in component_templates}
+        self.component_templates = component_templates or {}
+
+        # Rank 0 = winner: highest priority first, then name
+        order = sorted(range(len(self.templates)), key=lambda i: (
+            -(self.templates[i]["index_template"].get("priority") or 0), self.templates[i]["name"]))
+        rank = {i: r for r, i in enumerate(order)}
+
+        self._exact = defaultdict(list)  # literal pattern -> [rank]
+        # prefix length -> {prefix: {suffix length: {suffix: [(rank, middle matcher or None)]}}}
+        self._buckets = defaultdict(dict)
+        for i, tpl in enumerate(self.templates):
+            for pattern in tpl["index_template"]["index_patterns"]:
+                if "*" not in pattern:
+                    self._exact[pattern].append(rank[i])
+                    continue
+                parts = pattern.split("*")
+                prefix, middle, suffix = parts[0], [p for p in parts[1:-1] if p], parts[-1]
+                # "logs-*" / "*-archive" need nothing beyond the literal ends; a literal in
+                # between ("app-*-rollover-*") gets a regex over what the ends leave over
+                matcher = re.compile(".*" + ".*".join(map(re.escape, middle)) + ".*", re.DOTALL).fullmatch \
+                    if middle else None
+                by_suffix = self._buckets[len(prefix)].setdefault(prefix, defaultdict(dict))
+                by_suffix[len(suffix)].setdefault(suffix, []).append((rank[i], matcher))
+        self._prefix_lengths = sorted(self._buckets)
+        self._by_rank = [self.templates[i] for i in order]
+
+    def _matching_ranks(self, index):
+        ranks = set(self._exact.get(index, ()))
+        size = len(index)
+        for prefix_len in self._prefix_lengths:
+            if prefix_len > size:
+                break
+            by_suffix = self._buckets[prefix_len].get(index[:prefix_len])
+            if by_suffix is None:
+                continue
+            for suffix_len, suffixes in by_suffix.items():
+                if prefix_len + suffix_len > size:
+                    continue
+                for rank, matcher in suffixes.get(index[size - suffix_len:], ()):
+                    if matcher is None or matcher(index, prefix_len, size - suffix_len):
+                        ranks.add(rank)
+        return sorted(ranks)
+
+    def matching(self, index):
+        """All templates whose patterns match `index`, winner first."""
+        return [self._by_rank[rank] for rank in self._matching_ranks(index)]
+
+    def resolve(self, index):
+        """The template Elasticsearch would apply to a new index named `index`, or None."""
+        ranks = self._matching_ranks(index)
+        return self._by_rank[ranks[0]] if ranks else None
+
+    def components(self, template):
+        """The template's `composed_of` component templates, in order, as {"name", "body"}."""
+        return [{"name": name, "body": self.component_templates[name]}
+                for name in template["index_template"].get("composed_of", [])
+                if name in self.component_templates]
+
+    def effective_template(self, index):
+        """
+        Settings (flat, without the "index." prefix), mappings and aliases a new `index` would
+        get: component templates merged in `composed_of` order, then the template's own block.
+        Returns None when no template matches.
+        """
+        template = self.resolve(index)
+        if template is None:
+            return None
+        blocks = [c["body"].get("template", {}) for c in self.components(template)]
+        blocks.append(template["index_template"].get("template", {}))
+        settings, mappings, aliases = {}, {}, {}
+        for block in blocks:
+            settings.update(_flatten_settings(block.get("settings", {})))
+            mappings = _deep_merge(mappings, block.get("mappings", {}))
+            aliases.update(block.get("aliases", {}))
+        return {"name": template["name"], "settings": settings, "mappings": mappings, "aliases": aliases}
+
+    @classmethod
+    def from_cluster(cls, es):
+        """Build a resolver from the cluster's current index and component templates."""
+        return cls(
+            es.indices.get_index_template().get("index_templates", []),
+            es.cluster.get_component_template().get("component_templates", []),
+        )
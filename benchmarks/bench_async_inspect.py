@@ -0,0 +1,69 @@
+"""
+Sequential vs concurrent index inspection against a fake cluster with injected latency.
+
+    python benchmarks/bench_async_inspect.py [index_count] [latency_ms]
+
+The sequential side is ReadOnly.print_index_info over the synchronous client, one index
+after another; the concurrent side is async_inspect at a few concurrency limits. Both
+talk HTTP to benchmarks/fake_es.py, which sleeps `latency_ms` before every response.
+"""
+import asyncio
+import contextlib
+import io
+import sys
+import time
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+from fake_es import FakeElasticsearch
+
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+import ReadOnly
+from async_inspect import Inspector, list_indices
+
+CONCURRENCY_LEVELS = (4, 16, 64)
+
+
+def sequential(url, indices):
+    es = Elasticsearch(url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index in indices:
+            ReadOnly.print_index_info(es, index, ReadOnly.SAMPLE_SIZE)
+    es.close()
+
+
+async def concurrent(url, concurrency):
+    es = AsyncElasticsearch(url, connections_per_node=concurrency)
+    try:
+        indices = await list_indices(es, "*test*")
+        inspector = Inspector(es, concurrency, ReadOnly.SAMPLE_SIZE)
+        return [result["index"] async for result in inspector.inspect(indices)]
+    finally:
+        await es.close()
+
+
+def run(index_count, latency_ms):
+    server = FakeElasticsearch(index_count, latency=latency_ms / 1000).start()
+    try:
+        indices = Elasticsearch(server.url).cat.indices(index="*test*", format="json")
+        indices = [i["index"] for i in indices]
+        print(f"{len(indices)} indices, {latency_ms} ms per request\n")
+
+        start = time.perf_counter()
+        sequential(server.url, indices)
+        base = time.perf_counter() - start
+        print(f"{'sequential':<16}{base:8.2f} s")
+
+        for concurrency in CONCURRENCY_LEVELS:
+            start = time.perf_counter()
+            order = asyncio.run(concurrent(server.url, concurrency))
+            elapsed = time.perf_counter() - start
+            assert order == indices, "output order must match the listing order"
+            print(f"{f'async x{concurrency}':<16}{elapsed:8.2f} s  {base / elapsed:6.1f}x")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 200, args[1] if len(args) > 1 else 20)
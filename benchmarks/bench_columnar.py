@@ -0,0 +1,65 @@
+"""
+Compare the wide CSV export against the columnar Parquet export on a synthetic fleet.
+
+    python benchmarks/bench_columnar.py [instance_count]
+
+Reports file size, write time, full read time and the time to load a few columns.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from fleet import fleet_table
+
+import pandas as pd
+
+import main
+from columnar import write_parquet
+
+FEW_COLUMNS = ["Instance ID", "Private IP", "Team", "Environment"]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def write_csv_file(instances, path):
+    with open(path, "w", newline="") as f:
+        main.write_csv(instances, f)
+
+
+def run(count):
+    print(f"Generating {count} synthetic instances...")
+    instances = fleet_table(count)
+    print(f"{len(instances.columns)} columns per row\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "ec2_instances.csv")
+        parquet_path = os.path.join(tmp, "ec2_instances.parquet")
+
+        results = {}
+        for fmt, path, write, read in (
+            ("csv", csv_path, write_csv_file,
+             lambda cols=None: pd.read_csv(csv_path, usecols=cols, dtype=str, keep_default_na=False)),
+            ("parquet", parquet_path, write_parquet,
+             lambda cols=None: pd.read_parquet(parquet_path, columns=cols)),
+        ):
+            _, write_s = timed(write, instances, path)
+            _, read_all_s = timed(read)
+            _, read_few_s = timed(read, FEW_COLUMNS)
+            results[fmt] = (os.path.getsize(path), write_s, read_all_s, read_few_s)
+
+    print(f"{'format':<10}{'size MiB':>12}{'write s':>10}{'read all s':>12}{'read 4 cols s':>15}")
+    for fmt, (size, write_s, read_all_s, read_few_s) in results.items():
+        print(f"{fmt:<10}{size / 2**20:>12.1f}{write_s:>10.2f}{read_all_s:>12.2f}{read_few_s:>15.2f}")
+
+    csv_size, parquet_size = results["csv"][0], results["parquet"][0]
+    print(f"\nParquet is {csv_size / parquet_size:.1f}x smaller; "
+          f"loading {len(FEW_COLUMNS)} columns is {results['csv'][3] / results['parquet'][3]:.1f}x faster")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: the iterative flatten_tags against the original recursive version.
+
+    python benchmarks/bench_flatten_tags.py [repeat]
+
+Covers a realistic fleet's tag sets, very wide nested tags and deeply nested ones,
+and checks that both flatteners produce identical dicts first.
+"""
+import sys
+import timeit
+
+from fleet import synthetic_instances
+
+from main import flatten_tags
+
+
+def recursive_flatten_tags(tags, prefix=""):
+    """The flattener main.py used to ship, kept here as the baseline."""
+    flattened = {}
+    for tag in tags:
+        key = f"{prefix}{tag['Key']}"
+        value = tag['Value']
+
+        if isinstance(value, dict):
+            nested_flattened = recursive_flatten_tags([{"Key": k, "Value": v} for k, v in value.items()], prefix=f"{key}.")
+            flattened.update(nested_flattened)
+        else:
+            flattened[key] = value
+    return flattened
+
+
+def nested(depth, width):
+    """A `depth`-level dict with `width` leaves plus one child dict per level."""
+    node = {f"leaf{i}": f"v{i}" for i in range(width)}
+    for level in range(depth):
+        node = {**{f"k{level}_{i}": f"v{i}" for i in range(width)}, f"level{level}": node}
+    return node
+
+
+CASES = {
+    "fleet (1000 instances)": [i["Tags"] for i in synthetic_instances(1000)],
+    "wide (20 x 500 nested keys)": [[{"Key": f"app{n}", "Value": nested(1, 500)} for n in range(20)]],
+    "deep (depth 200, width 3)": [[{"Key": "config", "Value": nested(200, 3)}]],
+}
+
+
+def run(repeat):
+    print(f"{'case':<30}{'recursive ms':>14}{'iterative ms':>14}{'speedup':>9}")
+    for name, tag_sets in CASES.items():
+        for tags in tag_sets:
+            assert list(flatten_tags(tags).items()) == list(recursive_flatten_tags(tags).items()), name
+
+        def old():
+            for tags in tag_sets:
+                recursive_flatten_tags(tags)
+
+        def new():
+            for tags in tag_sets:
+                flatten_tags(tags)
+
+        old_s = min(timeit.repeat(old, number=1, repeat=repeat))
+        new_s = min(timeit.repeat(new, number=1, repeat=repeat))
+        print(f"{name:<30}{old_s * 1000:>14.2f}{new_s * 1000:>14.2f}{old_s / new_s:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
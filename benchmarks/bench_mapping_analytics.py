@@ -0,0 +1,72 @@
+"""
+Throughput of the mapping analytics on exploded mappings.
+
+    python benchmarks/bench_mapping_analytics.py [index_count] [fields_per_index]
+
+Builds `index_count` mappings of roughly `fields_per_index` fields each (objects nested a
+few levels deep, multi-fields, a dynamic template) where a slice of the field paths
+changes type from one index to the next, then times mapping.analyze_mappings over all
+of them.
+"""
+import random
+import sys
+import time
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+
+from mapping import analyze_mappings
+
+TYPES = ("keyword", "long", "date", "text", "double", "ip")
+
+
+def synthetic_mapping(field_count, seed, fanout=12, conflict_rate=0.01):
+    """A mapping with ~field_count fields: fanout-wide objects nested until the budget runs out."""
+    rng = random.Random(seed)
+    stable = random.Random(0)  # Same base types across indices, so conflicts are deliberate
+    budget = [field_count]
+
+    def level(depth):
+        properties = {}
+        for n in range(fanout):
+            if budget[0] <= 0:
+                break
+            budget[0] -= 1
+            if depth < 6 and stable.random() < 0.25:
+                properties[f"obj{n}"] = {"properties": level(depth + 1)}
+                continue
+            field_type = stable.choice(TYPES)
+            if rng.random() < conflict_rate:
+                field_type = rng.choice(TYPES)
+            spec = {"type": field_type}
+            if field_type == "text":
+                budget[0] -= 1
+                spec["fields"] = {"raw": {"type": "keyword"}}
+            properties[f"f{n}"] = spec
+        return properties
+
+    properties = {}
+    block = 0
+    while budget[0] > 0:
+        properties[f"group{block}"] = {"properties": level(2)}
+        block += 1
+    return {"dynamic": "true", "dynamic_templates": [{"strings_as_keyword": {
+        "match_mapping_type": "string", "mapping": {"type": "keyword"}}}], "properties": properties}
+
+
+def run(index_count, fields_per_index):
+    mappings = {f"exploded-{n:03d}": synthetic_mapping(fields_per_index, seed=n) for n in range(index_count)}
+    start = time.perf_counter()
+    report = analyze_mappings(mappings)
+    elapsed = time.perf_counter() - start
+
+    total = sum(info["fields"] for info in report["indices"].values())
+    deepest = max(info["depth"] for info in report["indices"].values())
+    warned = sum(1 for info in report["indices"].values() if info["warnings"])
+    print(f"{index_count} indices, {total} fields in total (max depth {deepest})")
+    print(f"analyzed in {elapsed * 1000:.0f} ms ({total / elapsed / 1e6:.2f} M fields/s)")
+    print(f"{warned} indices near a limit, {len(report['conflicts'])} field paths with type conflicts")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 50, args[1] if len(args) > 1 else 10000)
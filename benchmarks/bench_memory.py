@@ -0,0 +1,53 @@
+"""
+Memory footprint of the inventory: padded list of dicts vs the compact InstanceTable.
+
+    python benchmarks/bench_memory.py [instance_count]
+
+The synthetic describe_instances pages are generated up front so only the memory
+retained by each representation (measured with tracemalloc) is compared.
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from fleet import FleetEC2Client, synthetic_instances
+
+import main
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak, elapsed
+
+
+def run(count):
+    print(f"Generating {count} synthetic instances...")
+    instances = synthetic_instances(count)
+
+    dicts, dict_retained, dict_peak, dict_s = measure(
+        lambda: main.get_ec2_instances(FleetEC2Client(instances)))
+    columns = len(dicts[0])
+    del dicts
+    table, table_retained, table_peak, table_s = measure(
+        lambda: main.get_ec2_inventory(FleetEC2Client(instances)))
+
+    print(f"{len(table)} instances, {columns} columns\n")
+    print(f"{'representation':<16}{'retained MiB':>14}{'peak MiB':>10}{'build s':>9}")
+    for name, retained, peak, elapsed in (
+        ("list of dicts", dict_retained, dict_peak, dict_s),
+        ("InstanceTable", table_retained, table_peak, table_s),
+    ):
+        print(f"{name:<16}{retained / 2**20:>14.1f}{peak / 2**20:>10.1f}{elapsed:>9.2f}")
+    print(f"\nInstanceTable retains {dict_retained / table_retained:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
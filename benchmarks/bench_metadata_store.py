@@ -0,0 +1,73 @@
+"""
+Repeat-audit cost with and without the on-disk metadata snapshot.
+
+    python benchmarks/bench_metadata_store.py [index_count] [latency_ms]
+
+Against benchmarks/fake_es.py with `latency_ms` per request, times:
+  per-index fetch   settings + mapping + aliases one index at a time (the old inspectors;
+                    extrapolated from a sample)
+  cold refresh      MetadataStore.refresh on an empty database
+  warm refresh      the same again with nothing changed
+  1% changed        after bumping the mapping version of 1% of the indices
+"""
+import os
+import sys
+import tempfile
+import time
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+from fake_es import FakeElasticsearch
+
+from elasticsearch import Elasticsearch
+
+from metadata_store import MetadataStore
+
+PATTERN = "*test*"
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def per_index(es, indices):
+    for index in indices:
+        es.indices.get_settings(index=index, expand_wildcards="all")
+        es.indices.get_mapping(index=index, expand_wildcards="all")
+        es.indices.get_alias(index=index, expand_wildcards="all")
+
+
+def run(index_count, latency_ms):
+    server = FakeElasticsearch(index_count, latency=latency_ms / 1000, docs_per_index=1).start()
+    es = Elasticsearch(server.url)
+    store = MetadataStore(os.path.join(tempfile.mkdtemp(), "es_metadata.sqlite"))
+    try:
+        indices = list(server.indices)
+        print(f"{index_count} indices, {latency_ms} ms per request\n")
+
+        sample = indices[:max(1, index_count // 50)]
+        _, elapsed = timed(per_index, es, sample)
+        print(f"{'per-index fetch':<18}{elapsed * index_count / len(sample):9.2f} s  "
+              f"(extrapolated from {len(sample)})")
+
+        for label, prepare in (
+            ("cold refresh", None),
+            ("warm refresh", None),
+            ("1% changed", lambda: [server.touch(i) for i in indices[::100]]),
+        ):
+            if prepare:
+                prepare()
+            before = sum(server.requests.values())
+            snapshot, elapsed = timed(store.refresh, es, PATTERN)
+            requests = sum(server.requests.values()) - before
+            assert len(snapshot) == index_count
+            print(f"{label:<18}{elapsed:9.2f} s  {requests:5d} requests  {store.last_refresh}")
+    finally:
+        store.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 5000, args[1] if len(args) > 1 else 10)
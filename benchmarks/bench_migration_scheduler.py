@@ -0,0 +1,67 @@
+"""
+Sequential vs scheduled index migration against a simulated target.
+
+    python benchmarks/bench_migration_scheduler.py [index_count] [parallel]
+
+benchmarks/fake_es.py plays both source and target: a few big indices among many small
+ones, reindex tasks progressing in wall-clock time with a per-task rate limit and a
+shared cluster write capacity. Times UpdatedMigration's old one-index-at-a-time loop
+(slots=1, _cat/indices order) against run_migration_scheduler with `parallel` slots, in
+_cat/indices order and largest-first.
+"""
+import logging
+import random
+import sys
+import time
+import warnings
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+from fake_es import FakeElasticsearch
+
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import GeneralAvailabilityWarning
+
+import UpdatedMigration
+from template_resolver import TemplateResolver
+
+UpdatedMigration.POLL_INTERVAL = 0.02
+UpdatedMigration.SLICE_COUNT = 1
+UpdatedMigration.logger.setLevel(logging.WARNING)
+logging.getLogger("elastic_transport").setLevel(logging.WARNING)
+warnings.simplefilter("ignore", GeneralAvailabilityWarning)  # tasks.get is "technical preview"
+
+
+def skewed_sizes(index_count, seed=0):
+    """Doc counts: most indices small, a handful two orders of magnitude bigger."""
+    rng = random.Random(seed)
+    return [rng.choice((20000, 30000, 40000)) if n % 12 == 5 else rng.randrange(200, 2000)
+            for n in range(index_count)]
+
+
+def run(index_count, parallel):
+    print(f"{index_count} indices, up to {parallel} reindex tasks at once\n")
+    print(f"{'strategy':<28}{'slots':>6}{'wall s':>9}")
+    cases = (("sequential", False, 1), ("parallel, listing order", False, parallel),
+             ("parallel, largest first", True, parallel))
+    for label, by_size, max_parallel in cases:
+        server = FakeElasticsearch(index_count, docs_per_index=1, write_capacity=40000, slice_rate=10000).start()
+        for name, size in zip(server.indices, skewed_sizes(index_count)):
+            server.indices[name]["doc_count"] = size
+        es = Elasticsearch(server.url)
+        try:
+            indices = UpdatedMigration.list_indices_by_size(es)
+            if not by_size:
+                indices.sort(key=lambda i: i["index"])
+            slots = UpdatedMigration.migration_slots(UpdatedMigration.target_data_nodes(es), max_parallel)
+            start = time.perf_counter()
+            outcome = UpdatedMigration.run_migration_scheduler(es, es, indices, slots, TemplateResolver([]))
+            elapsed = time.perf_counter() - start
+            assert sum(r["status"] == "done" for r in outcome.values()) == index_count, outcome
+            print(f"{label:<28}{slots:>6}{elapsed:9.2f}")
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 60, args[1] if len(args) > 1 else 4)
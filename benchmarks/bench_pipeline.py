@@ -0,0 +1,188 @@
+"""
+Per-stage benchmark of the inventory pipeline on synthetic fleets.
+
+    python benchmarks/bench_pipeline.py                 # 1k/10k/100k, compare against the baseline
+    python benchmarks/bench_pipeline.py 1000 10000      # only these fleet sizes
+    python benchmarks/bench_pipeline.py --update        # record a new baseline
+
+Stages:
+    flatten_tags          flatten every instance's Tags
+    get_ec2_instances     describe_instances pages -> padded dicts
+    get_ec2_inventory     describe_instances pages -> InstanceTable
+    export_to_csv_local   InstanceTable -> CSV file
+    export_to_s3          InstanceTable -> CSV multipart upload (moto)
+    export_to_s3_gzip     the same, gzip-compressed
+
+describe_instances is served by a botocore Stubber on a real client, and S3 by moto, so
+the numbers include the client-side botocore work but no network. Every (size, stage)
+runs in its own interpreter so peak RSS belongs to that stage alone; the reported figure
+is the growth over the process's high-water mark once the fleet was generated (for the
+S3 stages that includes moto's in-memory copy of the uploaded parts). Results
+are compared with benchmarks/baselines/pipeline.json; baselines are machine-specific.
+"""
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "pipeline.json")
+
+SIZES = (1000, 10000, 100000)
+STAGES = ("flatten_tags", "get_ec2_instances", "get_ec2_inventory",
+          "export_to_csv_local", "export_to_s3", "export_to_s3_gzip")
+TOLERANCE = 0.25        # Allowed wall time / peak RSS growth over the baseline
+BYTES_TOLERANCE = 0.01  # Output size is deterministic; any real growth is a format change
+MIN_WALL_S = 0.05       # Stages faster than this are too noisy to gate on time
+MIN_RSS_MIB = 8         # ...or on RSS below this
+
+
+def max_rss_bytes():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def prepare(stage, count):
+    """Build the stage's input outside the timed region; returns a zero-arg callable -> bytes written."""
+    from fleet import FleetEC2Client, stubbed_ec2_client, synthetic_instances
+
+    import main
+
+    instances = synthetic_instances(count)
+    if stage == "flatten_tags":
+        tag_sets = [instance["Tags"] for instance in instances]
+
+        def flatten():
+            for tags in tag_sets:
+                main.flatten_tags(tags)
+            return 0
+        return flatten
+
+    if stage in ("get_ec2_instances", "get_ec2_inventory"):
+        ec2, _ = stubbed_ec2_client(instances)
+        fetch = getattr(main, stage)
+
+        def fetch_all():
+            fetch(ec2)
+            return 0
+        return fetch_all
+
+    inventory = main.get_ec2_inventory(FleetEC2Client(instances))
+    del instances
+    if stage == "export_to_csv_local":
+        path = os.path.join(tempfile.mkdtemp(), "ec2_instances.csv")
+
+        def export_local():
+            main.export_to_csv_local(inventory, path)
+            return os.path.getsize(path)
+        return export_local
+
+    import boto3
+    from moto import mock_aws
+
+    mock = mock_aws()
+    mock.start()
+    s3 = boto3.client("s3", region_name="us-east-1")
+    main.S3_BUCKET = "bench-inventory"
+    s3.create_bucket(Bucket=main.S3_BUCKET)
+    gzip = stage == "export_to_s3_gzip"
+
+    def export_s3():
+        path = main.export_to_s3(inventory, gzip=gzip, s3=s3)
+        return s3.head_object(Bucket=main.S3_BUCKET, Key=path.rsplit("/", 1)[1])["ContentLength"]
+    return export_s3
+
+
+def measure_child(stage, count):
+    """Run one stage in this process and print its measurements as JSON."""
+    import contextlib
+    with contextlib.redirect_stdout(sys.stderr):  # Keep the stages' own prints off the result line
+        run_stage = prepare(stage, count)
+        gc.collect()
+        rss_before = max_rss_bytes()
+        start = time.perf_counter()
+        bytes_written = run_stage()
+        wall = time.perf_counter() - start
+        rss_after = max_rss_bytes()
+    print(json.dumps({
+        "wall_s": round(wall, 4),
+        "peak_rss_mib": round((rss_after - rss_before) / 2**20, 1),
+        "bytes": bytes_written,
+    }))
+
+
+def measure(stage, count):
+    env = dict(os.environ, AWS_DEFAULT_REGION="us-east-1",
+               AWS_ACCESS_KEY_ID="bench", AWS_SECRET_ACCESS_KEY="bench")
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", stage, str(count)],
+        cwd=BENCH_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"{stage} at {count} instances failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def regressions(results, baseline):
+    """Yield a message for every stage that got slower, hungrier or bigger than its baseline."""
+    for size, stages in results.items():
+        for stage, now in stages.items():
+            before = baseline.get(size, {}).get(stage)
+            if before is None:
+                continue
+            checks = (
+                ("wall_s", TOLERANCE, MIN_WALL_S, "s"),
+                ("peak_rss_mib", TOLERANCE, MIN_RSS_MIB, " MiB"),
+                ("bytes", BYTES_TOLERANCE, 1, " bytes"),
+            )
+            for metric, tolerance, floor, unit in checks:
+                limit = max(before[metric] * (1 + tolerance), floor)
+                if now[metric] > limit:
+                    yield (f"{stage} @ {size}: {metric} {now[metric]}{unit} > "
+                           f"{limit:.4g}{unit} allowed (baseline {before[metric]}{unit})")
+
+
+def run(sizes, update=False):
+    results = {}
+    print(f"{'instances':>10}  {'stage':<22}{'wall s':>9}{'peak RSS MiB':>14}{'bytes':>14}")
+    for count in sizes:
+        results[str(count)] = {}
+        for stage in STAGES:
+            m = measure(stage, count)
+            results[str(count)][stage] = m
+            print(f"{count:>10}  {stage:<22}{m['wall_s']:>9.3f}{m['peak_rss_mib']:>14.1f}{m['bytes'] or '':>14}")
+
+    if update or not os.path.exists(BASELINE_PATH):
+        baseline = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH) as f:
+                baseline = json.load(f)
+        baseline.update(results)  # Sizes not run this time keep their previous numbers
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    failures = list(regressions(results, baseline))
+    for message in failures:
+        print(f"FAIL: {message}")
+    if not failures:
+        print("OK: within baseline")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--child"]:
+        measure_child(args[1], int(args[2]))
+        sys.exit(0)
+    sizes = [int(a) for a in args if a.isdigit()] or SIZES
+    sys.exit(run(sizes, update="--update" in args))
@@ -0,0 +1,93 @@
+"""
+Load benchmark for the inventory query service.
+
+    python benchmarks/bench_query_service.py [instance_count]
+
+Indexes a synthetic fleet, then measures lookups/sec straight against the index and
+requests/sec through the Flask app (test client, no network), including while the
+snapshot is being hot-reloaded in another thread.
+"""
+import io
+import random
+import sys
+import threading
+import time
+
+from fleet import FleetEC2Client, synthetic_instances
+
+import main
+from query_service import InventoryIndex, InventoryService, create_app
+
+DURATION = 2.0  # Seconds per measurement
+
+
+def rate(fn, queries, duration=DURATION):
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for q in queries:
+            fn(q)
+        done += len(queries)
+    return done / (time.perf_counter() - start)
+
+
+def run(count):
+    print(f"Generating {count} synthetic instances...")
+    inventory = main.get_ec2_inventory(FleetEC2Client(synthetic_instances(count)))
+    csv_text = io.StringIO()
+    main.write_csv(inventory, csv_text)
+
+    start = time.perf_counter()
+    index = InventoryIndex.from_csv(io.StringIO(csv_text.getvalue()))
+    print(f"Indexed {len(index)} instances from CSV in {time.perf_counter() - start:.2f}s\n")
+
+    rng = random.Random(1)
+    records = [index.records[rng.randrange(len(index))] for _ in range(1000)]
+    ips = [r["Private IP"] for r in records]
+    teams = [("Team", r["Team"]) for r in records]
+    prefixes = [r["Name"][:9] for r in records]
+
+    print(f"{'lookup':<28}{'per sec':>14}{'us each':>10}")
+    for name, fn, queries in (
+        ("ip", index.ip_ids, ips),
+        ("tag Team=X (ids)", lambda t: index.tag_ids(*t), teams),
+        ("name prefix (ids)", index.name_prefix_ids, prefixes),
+        ("tag Team=X + Environment", lambda t: index.query([t, ("Environment", "environment-1")], limit=50), teams),
+    ):
+        per_sec = rate(fn, queries)
+        print(f"{name:<28}{per_sec:>14,.0f}{1e6 / per_sec:>10.2f}")
+
+    service = InventoryService(source=None, index=index)
+    client = create_app(service).test_client()
+    http_queries = [f"/ip/{ip}" for ip in ips[:200]]
+    http_rate = rate(lambda url: client.get(url), http_queries)
+
+    # Hot reload: keep swapping in freshly built indexes while requests run
+    stop = threading.Event()
+    swaps = 0
+
+    def reloader():
+        nonlocal swaps
+        while not stop.is_set():
+            service.index = InventoryIndex.from_csv(io.StringIO(csv_text.getvalue()))
+            swaps += 1
+
+    thread = threading.Thread(target=reloader)
+    thread.start()
+    errors = 0
+
+    def checked_get(url):
+        nonlocal errors
+        if client.get(url).status_code != 200:
+            errors += 1
+
+    reload_rate = rate(checked_get, http_queries)
+    stop.set()
+    thread.join()
+
+    print(f"\n{'HTTP /ip (test client)':<28}{http_rate:>14,.0f}")
+    print(f"{'HTTP /ip during reloads':<28}{reload_rate:>14,.0f}   ({swaps} snapshot swaps, {errors} errors)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,82 @@
+"""
+Fixed vs automatic reindex slice counts against a simulated target.
+
+    python benchmarks/bench_reindex_slices.py [small_indices] [big_indices]
+
+benchmarks/fake_es.py plays source and target (a same-cluster reindex, so slicing is
+allowed). Small single-shard indices sit next to big six-shard ones; each slice costs a
+startup delay and copies at a fixed rate. Migrates them through
+UpdatedMigration.run_migration_scheduler with SLICE_COUNT 1, 4 (the old default) and
+"auto", reporting wall time, the slices chosen and the median docs/s per index. The
+last row is "auto" with a remote source, where every index gets one slice; the old
+remote reindex with 4 slices is shown being rejected, as Elasticsearch does.
+"""
+import logging
+import statistics
+import sys
+import time
+import warnings
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+from fake_es import FakeElasticsearch
+
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import GeneralAvailabilityWarning
+
+import UpdatedMigration
+from template_resolver import TemplateResolver
+
+UpdatedMigration.POLL_INTERVAL = 0.05
+UpdatedMigration.logger.setLevel(logging.ERROR)
+logging.getLogger("elastic_transport").setLevel(logging.WARNING)
+warnings.simplefilter("ignore", GeneralAvailabilityWarning)  # tasks.get is "technical preview"
+
+SMALL_DOCS, BIG_DOCS = 2000, 600000
+
+
+def run(small, big):
+    print(f"{small} indices x {SMALL_DOCS} docs (1 shard), {big} x {BIG_DOCS} docs (6 shards), "
+          f"3 data nodes, 3 tasks at once\n")
+    print(f"{'slices':<18}{'wall s':>8}{'done':>6}{'small: slices':>15}{'docs/s':>9}{'big: slices':>13}{'docs/s':>9}")
+    for label, slice_count, remote in (("1", 1, False), ("4", 4, False), ("auto", "auto", False),
+                                       ("auto, from remote", "auto", True)):
+        server = FakeElasticsearch(small + big, docs_per_index=1, write_capacity=400000, slice_rate=20000,
+                                   slice_startup=0.25).start()
+        names = list(server.indices)
+        for n, name in enumerate(names):
+            meta = server.indices[name]
+            meta["doc_count"] = BIG_DOCS if n < big else SMALL_DOCS
+            meta["settings"]["number_of_shards"] = "6" if n < big else "1"
+        UpdatedMigration.SOURCE_ES = "http://elsewhere:9200" if remote else server.url
+        UpdatedMigration.TARGET_ES = server.url
+        UpdatedMigration.SLICE_COUNT = slice_count
+        es = Elasticsearch(server.url)
+        try:
+            indices = UpdatedMigration.list_indices_by_size(es)
+            data_nodes = UpdatedMigration.target_data_nodes(es)
+            start = time.perf_counter()
+            outcome = UpdatedMigration.run_migration_scheduler(es, es, indices, 3, TemplateResolver([]),
+                                                               data_nodes=data_nodes)
+            elapsed = time.perf_counter() - start
+
+            def column(names_, key):
+                values = [outcome[i].get(key, 0) for i in names_ if outcome[i]["status"] == "done"]
+                return f"{statistics.median(values):.0f}" if values else "-"
+
+            done = sum(r["status"] == "done" for r in outcome.values())
+            print(f"{label:<18}{elapsed:8.2f}{done:>6}{column(names[big:], 'slices'):>15}"
+                  f"{column(names[big:], 'docs_per_sec'):>9}{column(names[:big], 'slices'):>13}"
+                  f"{column(names[:big], 'docs_per_sec'):>9}")
+            if remote:
+                try:
+                    es.reindex(source={"index": names[0], "remote": {"host": UpdatedMigration.SOURCE_ES}},
+                               dest={"index": "slices-check"}, slices=4, wait_for_completion=False)
+                except Exception as e:
+                    print(f"\nold remote reindex with 4 slices: {e}")
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 40, args[1] if len(args) > 1 else 3)
@@ -0,0 +1,64 @@
+"""
+Static vs adaptive reindex throttling against a simulated target.
+
+    python benchmarks/bench_reindex_throttle.py [index_count] [docs_per_index]
+
+benchmarks/fake_es.py plays source and target. Its reindex tasks can each demand more
+than the target's write capacity, and past capacity the target loses throughput to
+rejections. Migrates the same indices through UpdatedMigration.run_migration_scheduler:
+  unthrottled   requests_per_second -1 (the old default)
+  static        a fixed requests_per_second per task, set conservatively
+  adaptive      reindex_throttle.ThrottleController holding the write load near its target
+and reports wall time, write rejections and the median write load the controller measured.
+"""
+import logging
+import sys
+import time
+import warnings
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+from fake_es import FakeElasticsearch
+
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import GeneralAvailabilityWarning
+
+import UpdatedMigration
+from reindex_throttle import ThrottleController
+from template_resolver import TemplateResolver
+
+UpdatedMigration.POLL_INTERVAL = 0.2
+UpdatedMigration.SLICE_COUNT = 1
+UpdatedMigration.logger.setLevel(logging.WARNING)
+logging.getLogger("elastic_transport").setLevel(logging.WARNING)
+warnings.simplefilter("ignore", GeneralAvailabilityWarning)  # tasks.get is "technical preview"
+
+STATIC_DOCS_PER_SEC = 4000
+
+
+def run(index_count, docs_per_index):
+    print(f"{index_count} indices x {docs_per_index} docs, 3 data nodes, 30k docs/s write capacity\n")
+    print(f"{'throttle':<14}{'wall s':>8}{'docs/s':>9}{'rejected':>10}{'median load':>13}")
+    for label in ("unthrottled", "static", "adaptive"):
+        server = FakeElasticsearch(index_count, docs_per_index=1, write_capacity=30000, slice_rate=20000).start()
+        for meta in server.indices.values():
+            meta["doc_count"] = docs_per_index
+        es = Elasticsearch(server.url)
+        UpdatedMigration.THROTTLE_DOCS_PER_SEC = STATIC_DOCS_PER_SEC if label == "static" else -1
+        throttle = ThrottleController() if label == "adaptive" else None
+        try:
+            indices = UpdatedMigration.list_indices_by_size(es)
+            start = time.perf_counter()
+            outcome = UpdatedMigration.run_migration_scheduler(es, es, indices, 3, TemplateResolver([]), throttle)
+            elapsed = time.perf_counter() - start
+            assert sum(r["status"] == "done" for r in outcome.values()) == index_count, outcome
+            loads = sorted(h["load"] for h in throttle.history) if throttle else []
+            median = f"{loads[len(loads) // 2]:.2f}" if loads else "-"
+            print(f"{label:<14}{elapsed:8.2f}{index_count * docs_per_index / elapsed:9.0f}"
+                  f"{int(server.node_stats['rejected']):>10}{median:>13}")
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 6, args[1] if len(args) > 1 else 40000)
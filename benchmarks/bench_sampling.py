@@ -0,0 +1,58 @@
+"""
+Per-index sample searches vs batched _msearch sampling.
+
+    python benchmarks/bench_sampling.py [index_count] [latency_ms]
+
+Against benchmarks/fake_es.py, compares the old ReadOnly sampling (one match_all search
+per index with the full _source) with sampling.sample_indices, with and without _source
+projection. Reports wall time, requests and response bytes.
+"""
+import sys
+import time
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+from fake_es import FakeElasticsearch
+
+from elasticsearch import Elasticsearch
+
+from sampling import sample_indices
+
+SAMPLE_SIZE = 3
+
+
+def per_index(es, indices):
+    return {index: [h["_source"] for h in es.search(index=index, size=SAMPLE_SIZE, query={"match_all": {}},
+                                                    _source_includes=["*"])["hits"]["hits"]]
+            for index in indices}
+
+
+def run(index_count, latency_ms):
+    server = FakeElasticsearch(index_count, latency=latency_ms / 1000).start()
+    es = Elasticsearch(server.url)
+    indices = list(server.indices)
+    shard_counts = {i: meta["settings"]["number_of_shards"] for i, meta in server.indices.items()}
+    print(f"{index_count} indices, {latency_ms} ms per request, {SAMPLE_SIZE} docs each\n")
+    print(f"{'strategy':<28}{'wall s':>8}{'requests':>10}{'KiB':>10}")
+    cases = (
+        ("search per index", lambda: per_index(es, indices)),
+        ("msearch random", lambda: sample_indices(es, indices, SAMPLE_SIZE)),
+        ("msearch per-shard", lambda: sample_indices(es, indices, SAMPLE_SIZE, mode="shards",
+                                                     shard_counts=shard_counts)),
+        ("msearch random, 1 field", lambda: sample_indices(es, indices, SAMPLE_SIZE, fields=["message"])),
+    )
+    try:
+        for label, fn in cases:
+            requests, sent = sum(server.requests.values()), server.bytes_sent
+            start = time.perf_counter()
+            samples = fn()
+            elapsed = time.perf_counter() - start
+            assert len(samples) == index_count and all(len(s) == SAMPLE_SIZE for s in samples.values())
+            print(f"{label:<28}{elapsed:8.2f}{sum(server.requests.values()) - requests:>10}"
+                  f"{(server.bytes_sent - sent) / 1024:>10.0f}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 500, args[1] if len(args) > 1 else 10)
@@ -0,0 +1,132 @@
+"""
+Cold-start benchmark for the Lambda handler module.
+
+    python benchmarks/bench_startup.py            # compare against the baseline, exit 1 on regression
+    python benchmarks/bench_startup.py --update   # record a new baseline
+
+Each run starts a fresh interpreter with `-X importtime`, imports `main` the way the
+Lambda runtime does, then times building the first S3 client. Each export path then gets
+its own fresh interpreter timing the imports that path defers past `import main` (the CSV
+upload, delta and resumable modes, Parquet). The median of several runs is compared with
+benchmarks/baselines/startup.json. Baselines are machine-specific: re-record them on the
+machine (or CI runner) that enforces them.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.abspath(os.path.join(BENCH_DIR, os.pardir, "app"))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "startup.json")
+
+RUNS = 7
+TOLERANCE = 0.25  # Allowed slowdown over the baseline before failing
+SLACK_US = 5000   # ...plus this much, so sub-millisecond timings don't fail on noise
+HEAVY_MODULES = ("pandas", "pyarrow", "flask", "numpy")  # Must never load at handler import
+# Export path -> the app modules it imports on first use; none may load at handler import
+PATH_MODULES = {
+    "csv": ("s3_stream",),
+    "delta": ("delta",),
+    "resumable": ("resumable",),
+    "parquet": ("columnar",),
+}
+
+STARTUP_SNIPPET = """
+import time
+import main
+start = time.perf_counter()
+main.get_client('s3')
+print((time.perf_counter() - start) * 1e6)
+"""
+
+PATH_SNIPPET = """
+import importlib
+import sys
+import time
+import main
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print((time.perf_counter() - start) * 1e6)
+"""
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us)} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def _python(snippet, *args):
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", snippet, *args],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+def measure_once():
+    proc = _python(STARTUP_SNIPPET)
+    modules = parse_importtime(proc.stderr)
+    sample = {
+        "main_import_us": modules["main"][1],
+        "first_client_us": float(proc.stdout),
+        "modules": modules,
+    }
+    for path, names in PATH_MODULES.items():
+        sample[f"{path}_path_us"] = float(_python(PATH_SNIPPET, *names).stdout)
+    return sample
+
+
+def run(update=False):
+    samples = [measure_once() for _ in range(RUNS)]
+    keys = ["main_import_us", "first_client_us"] + [f"{path}_path_us" for path in PATH_MODULES]
+    result = {key: round(statistics.median(s[key] for s in samples)) for key in keys}
+
+    slowest = sorted(samples[-1]["modules"].items(), key=lambda kv: kv[1][0], reverse=True)[:10]
+    print("Slowest imports (self us):")
+    for name, (self_us, _) in slowest:
+        print(f"  {self_us:>8}  {name}")
+    for key, value in result.items():
+        print(f"{key:<18}{value / 1000:>10.1f} ms")
+
+    heavy = sorted(m for m in samples[-1]["modules"] if m.split(".")[0] in HEAVY_MODULES)
+    if heavy:
+        print(f"FAIL: handler import pulls in heavy modules: {heavy[:5]}")
+        return 1
+    eager = sorted(m for names in PATH_MODULES.values() for m in names if m in samples[-1]["modules"])
+    if eager:
+        print(f"FAIL: handler import loads modules only some paths need: {eager}")
+        return 1
+
+    if update or not os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    status = 0
+    for key, value in result.items():
+        if key not in baseline:
+            print(f"note: no baseline for {key}; re-record with --update")
+            continue
+        limit = baseline[key] * (1 + TOLERANCE) + SLACK_US
+        if value > limit:
+            print(f"FAIL: {key} regressed: {value / 1000:.1f} ms > {limit / 1000:.1f} ms allowed")
+            status = 1
+    if status == 0:
+        print("OK: within baseline")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(run(update="--update" in sys.argv[1:]))
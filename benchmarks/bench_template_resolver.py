@@ -0,0 +1,81 @@
+"""
+Template lookup cost: linear fnmatch over every pattern vs the precompiled TemplateResolver.
+
+    python benchmarks/bench_template_resolver.py [template_count] [index_count]
+
+Templates mix per-application prefixes ("app-042-*"), suffix patterns ("*-archive"),
+exact names and a catch-all, with overlapping priorities; every index name is resolved
+once by each approach and the winners are checked against each other.
+"""
+import fnmatch
+import random
+import sys
+import time
+
+import fleet  # noqa: F401  (puts app/ on sys.path)
+
+from template_resolver import TemplateResolver
+
+
+def synthetic_templates(count, seed=0):
+    rng = random.Random(seed)
+    templates = [{"name": "catch-all", "index_template": {"index_patterns": ["*"], "priority": 0}}]
+    for n in range(count - 1):
+        kind = rng.random()
+        if kind < 0.7:
+            patterns = [f"app-{n:04d}-*", f"app-{n:04d}-*-rollover-*"]
+        elif kind < 0.85:
+            patterns = [f"*-{n:04d}-archive"]
+        else:
+            patterns = [f"static-{n:04d}"]
+        templates.append({"name": f"tpl-{n:04d}",
+                          "index_template": {"index_patterns": patterns, "priority": 1 + n}})
+    return templates
+
+
+def synthetic_indices(count, template_count, seed=1):
+    rng = random.Random(seed)
+    names = []
+    for n in range(count):
+        t = rng.randrange(template_count)
+        names.append(rng.choice((f"app-{t:04d}-2024.{n % 12:02d}", f"logs-{t:04d}-archive",
+                                 f"static-{t:04d}", f"unmatched-{n}")))
+    return names
+
+
+def linear_resolve(templates, index):
+    """What Helpers/UpdatedMigration used to do, plus the priority rule they were missing."""
+    matches = [t for t in templates
+               if any(fnmatch.fnmatch(index, p) for p in t["index_template"]["index_patterns"])]
+    return min(matches, key=lambda t: (-t["index_template"]["priority"], t["name"]), default=None)
+
+
+def run(template_count, index_count):
+    templates = synthetic_templates(template_count)
+    indices = synthetic_indices(index_count, template_count)
+
+    start = time.perf_counter()
+    resolver = TemplateResolver(templates)
+    compile_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [resolver.resolve(i) for i in indices]
+    compiled_s = time.perf_counter() - start
+
+    sample = indices[:max(1, index_count // 20)]  # Linear scan is too slow to run on all of them
+    start = time.perf_counter()
+    linear = [linear_resolve(templates, i) for i in sample]
+    linear_s = (time.perf_counter() - start) * len(indices) / len(sample)
+
+    assert [t and t["name"] for t in linear] == [t and t["name"] for t in compiled[:len(sample)]]
+    print(f"{template_count} templates, {index_count} indices")
+    print(f"  compile            {compile_s * 1000:10.1f} ms")
+    print(f"  resolver lookups   {compiled_s * 1000:10.1f} ms  ({compiled_s / index_count * 1e6:.1f} us/index)")
+    print(f"  linear fnmatch     {linear_s * 1000:10.1f} ms  ({linear_s / index_count * 1e6:.1f} us/index, "
+          f"extrapolated from {len(sample)})")
+    print(f"  speedup            {linear_s / compiled_s:10.0f}x")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0] if args else 2000, args[1] if len(args) > 1 else 20000)
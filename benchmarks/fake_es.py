@@ -0,0 +1,479 @@
+"""
+A tiny fake Elasticsearch HTTP server for the inspector/migration benchmarks.
+
+Serves a synthetic cluster of `index_count` indices from memory with a fixed delay
+added to every request, so client-side latency hiding can be measured without a real
+cluster:
+
+    server = FakeElasticsearch(index_count=500, latency=0.02).start()
+    es = Elasticsearch(server.url)
+    ...
+    server.stop()
+
+Only the endpoints the scripts in app/ use are implemented, with just enough of each
+response body for them to work. Requests are counted per endpoint in `server.requests`.
+"""
+import fnmatch
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+MAX_INITIAL_LINE_LENGTH = 4096  # Elasticsearch's default http.max_initial_line_length
+FIELD_TYPES = ("keyword", "text", "long", "date", "ip", "boolean", "double")
+
+
+def synthetic_cluster(index_count, docs_per_index=20, seed=0):
+    """Return {index: {"settings", "mappings", "aliases", "docs"}} for a fake cluster."""
+    rng = random.Random(seed)
+    cluster = {}
+    for n in range(index_count):
+        name = f"app-{n % 50:02d}-test-{n:05d}"
+        properties = {f"field_{f}": {"type": rng.choice(FIELD_TYPES)} for f in range(rng.randrange(5, 40))}
+        properties["meta"] = {"properties": {f"m{f}": {"type": "keyword"} for f in range(rng.randrange(1, 10))}}
+        settings = {"number_of_shards": str(rng.choice((1, 1, 2, 3, 5))), "number_of_replicas": "1",
+                    "uuid": f"uuid-{n:05d}", "provided_name": name,
+                    "creation_date": str(1700000000000 + n), "version": {"created": "8110099"}}
+        if n % 3 == 0:
+            settings["lifecycle"] = {"name": "rollover-30d"}
+        docs = [{"_index": name, "_id": str(d), "_source": {
+                    "message": f"doc {d} of {name}", "value": rng.randrange(10**6),
+                    "tags": [rng.choice("abcdef") for _ in range(rng.randrange(4))]}}
+                for d in range(docs_per_index)]
+        cluster[name] = {
+            "settings": settings,
+            "mappings": {"properties": properties},
+            "aliases": {f"app-{n % 50:02d}-current": {}} if n % 10 == 0 else {},
+            "docs": docs,
+            "versions": {"settings_version": 1, "mapping_version": 1, "aliases_version": 1},
+        }
+    return cluster
+
+
+class FakeElasticsearch:
+    """
+    Besides serving its own indices, the fake can play the target of a migration: it
+    creates indices, accepts _reindex (the source is read from its own indices, whether
+    "remote" or not) and simulates each task's progress in wall-clock time. A task copies
+    up to `slice_rate` docs/s per slice (or its requests_per_second, which
+    _rethrottle changes) after `slice_startup` seconds per slice; all running tasks share `write_capacity` docs/s across
+    `data_nodes` data nodes. Demand past capacity fills the write queues, raises the
+    per-doc indexing time, causes rejections and lowers throughput, all visible through
+    _nodes/stats. An index's doc count for the simulation is
+    its "doc_count" entry if set (so big indices needn't hold docs), else len(docs).
+    """
+
+    def __init__(self, index_count=100, latency=0.0, docs_per_index=20, host="127.0.0.1", port=0,
+                 data_nodes=3, write_capacity=50000, slice_rate=5000, slice_startup=0.0):
+        self.indices = synthetic_cluster(index_count, docs_per_index)
+        self.latency = latency
+        self.data_nodes = data_nodes
+        self.write_capacity = write_capacity
+        self.slice_rate = slice_rate
+        self.slice_startup = slice_startup  # Seconds before a task copies anything, per slice
+        self.created = {}  # Indices created through the API
+        self.documents = {}  # Index -> {_id: _source} written through _bulk
+        self._scrolls = {}   # Scroll id -> hits not yet returned
+        self.tasks = {}    # Reindex tasks by id
+        self._clock = time.monotonic()
+        self.node_stats = {"index_total": 0.0, "index_time_in_millis": 0.0, "rejected": 0.0}  # Cluster-wide
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"fake": self})
+        self._server = _Server((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, endpoint, sent=0):
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.bytes_sent += sent
+
+    def touch(self, index, field="mapping"):
+        """Simulate a settings/mapping/aliases change on `index` (bumps that version)."""
+        meta = self.indices[index]
+        meta["versions"][f"{field}_version"] += 1
+        if field == "mapping":
+            meta["mappings"]["properties"][f"added_{meta['versions']['mapping_version']}"] = {"type": "keyword"}
+
+    def doc_count(self, index):
+        meta = self.indices[index]
+        return meta.get("doc_count", len(meta["docs"]))
+
+    def _utilisation(self, running):
+        """Demanded write rate over capacity; a task demands its slice rate, capped by its throttle."""
+        demand = {}
+        for task in running:
+            rate = self.slice_rate * task["slices"]
+            if task["requests_per_second"] > 0:
+                rate = min(rate, task["requests_per_second"])
+            demand[id(task)] = rate
+        return sum(demand.values()) / self.write_capacity, demand
+
+    def _advance(self):
+        """Move every running reindex task and the node counters forward to now (call with the lock held)."""
+        now = time.monotonic()
+        elapsed, self._clock = now - self._clock, now
+        running = [t for t in self.tasks.values() if not t["completed"]]
+        load, demand = self._utilisation(running)
+        # Past capacity, rejections/retries and GC make the cluster get less done, not just queue
+        efficiency = 1.0 if load <= 1 else max(0.3, 1 - 0.5 * (load - 1))
+        indexed = 0.0
+        for task in running:
+            rate = demand[id(task)] / max(load, 1) * efficiency
+            task["rate"] = rate
+            copying = min(elapsed, max(0.0, now - task["started"] - self.slice_startup * task["slices"]))
+            done = min(task["total"] - task["created"], rate * copying)
+            task["created"] += done
+            indexed += done
+            if task["created"] >= task["total"]:
+                task["completed"] = True
+                task["took"] = now - task["started"]
+        self.node_stats["index_total"] += indexed
+        self.node_stats["index_time_in_millis"] += indexed * 0.2 * (1 + 10 * max(0.0, load - 0.8))
+        self.node_stats["rejected"] += elapsed * self.write_capacity * 0.05 * max(0.0, load - 1)
+
+    def resolve(self, expression):
+        """Index names matching a comma-separated list of names/wildcards."""
+        if not expression or expression in ("_all", "*"):
+            return list(self.indices)
+        names = []
+        for part in expression.split(","):
+            names += [i for i in self.indices if fnmatch.fnmatchcase(i, part)] if "*" in part \
+                else [part] if part in self.indices else []
+        return list(dict.fromkeys(names))
+
+    # === Endpoints: each takes (index expression, query params, body) and returns (status, body) ===
+
+    def cat_indices(self, expr, params, body):
+        return 200, [{"index": i, "health": "green", "status": "open",
+                      "docs.count": str(self.doc_count(i)), "pri": self.indices[i]["settings"]["number_of_shards"],
+                      "store.size": str(self.doc_count(i) * 500), "uuid": self.indices[i]["settings"]["uuid"]}
+                     for i in self.resolve(expr)]
+
+    def missing(self, expression, params):
+        """
+        The 404 Elasticsearch sends when a concrete name (no wildcard) in `expression` doesn't
+        exist, unless the request passed ignore_unavailable=true.
+        """
+        if params.get("ignore_unavailable") == "true":
+            return None
+        for part in (expression or "").split(","):
+            if part and "*" not in part and part != "_all" and part not in self.indices:
+                return 404, {"error": {"type": "index_not_found_exception", "reason": f"no such index [{part}]",
+                                       "index": part}, "status": 404}
+        return None
+
+    def settings(self, expr, params, body):
+        return self.missing(expr, params) or \
+            (200, {i: {"settings": {"index": self.indices[i]["settings"]}} for i in self.resolve(expr)})
+
+    def mapping(self, expr, params, body):
+        return self.missing(expr, params) or (200, {i: {"mappings": self.indices[i]["mappings"]} for i in self.resolve(expr)})
+
+    def alias(self, expr, params, body):
+        return self.missing(expr, params) or (200, {i: {"aliases": self.indices[i]["aliases"]} for i in self.resolve(expr)})
+
+    def search(self, expr, params, body):
+        body = body or {}
+        size = int(params.get("size", body.get("size", 10)))
+        if expr in self.documents:
+            hits = [{"_index": expr, "_id": doc_id, "_source": source}
+                    for doc_id, source in self.documents[expr].items()]
+        else:
+            hits = [h for i in self.resolve(expr) for h in self.indices[i]["docs"]]
+        if "random_score" in json.dumps(body.get("query", {})):
+            hits = random.Random(json.dumps(body)).sample(hits, len(hits))
+        source = body.get("_source", True)
+        if isinstance(source, list):  # Top-level field projection is all the callers need
+            hits = [dict(h, _source={k: v for k, v in h["_source"].items()
+                                     if any(fnmatch.fnmatchcase(k, f) for f in source)}) for h in hits]
+        resp = {"took": 1, "timed_out": False, "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                "hits": {"total": {"value": len(hits), "relation": "eq"}, "hits": hits[:size]}}
+        if "scroll" in params:
+            with self._lock:
+                scroll_id = f"scroll-{len(self._scrolls)}"
+                self._scrolls[scroll_id] = (hits[size:], size)
+            resp["_scroll_id"] = scroll_id
+        return 200, resp
+
+    def scroll(self, expr, params, body):
+        scroll_id = (body or {}).get("scroll_id") or params.get("scroll_id")
+        with self._lock:
+            hits, size = self._scrolls.get(scroll_id, ([], 0))
+            self._scrolls[scroll_id] = (hits[size:], size)
+        return 200, {"_scroll_id": scroll_id, "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                     "hits": {"total": {"value": len(hits), "relation": "eq"}, "hits": hits[:size]}}
+
+    def clear_scroll(self, expr, params, body):
+        for scroll_id in (body or {}).get("scroll_id") or []:
+            self._scrolls.pop(scroll_id, None)
+        return 200, {"succeeded": True, "num_freed": 1}
+
+    def bulk(self, expr, params, body):
+        """index/update/delete actions; an update's script is the scripted upsert es_inventory sends."""
+        items, lines = [], iter(body)
+        for action in lines:
+            (op, meta), = action.items()
+            index, doc_id = meta.get("_index", expr), meta["_id"]
+            docs = self.documents.setdefault(index, {})
+            if op == "delete":
+                result = "deleted" if docs.pop(doc_id, None) is not None else "not_found"
+            else:
+                source = next(lines)
+                new = source.get("doc") or source.get("upsert") or source
+                if op == "update" and "script" in source:
+                    new = source["script"]["params"]["doc"]
+                old = docs.get(doc_id)
+                result = "created" if old is None else "noop" if old == new else "updated"
+                docs[doc_id] = new
+            status = 404 if result == "not_found" else 201 if result == "created" else 200
+            items.append({op: {"_index": index, "_id": doc_id, "result": result, "status": status}})
+        return 200, {"took": 1, "errors": False, "items": items}
+
+    def exists(self, expr, params, body):
+        return (200 if expr in self.indices or expr in self.created else 404), {}
+
+    def msearch(self, expr, params, body):
+        responses = []
+        for header, search in zip(body[::2], body[1::2]):
+            if header.get("index", expr) not in self.indices:
+                responses.append({"error": {"type": "index_not_found_exception"}, "status": 404})
+                continue
+            responses.append(dict(self.search(header.get("index", expr), {}, search)[1], status=200))
+        return 200, {"took": 1, "responses": responses}
+
+    def cluster_state(self, expr, params, body):
+        # Only the per-index versions; the filter_path the callers send asks for nothing else
+        return 200, {"metadata": {"indices": {i: dict(self.indices[i]["versions"]) for i in self.resolve(expr)}}}
+
+    def cat_nodes(self, expr, params, body):
+        # A dedicated master besides the data nodes, so callers have to look at the roles
+        return 200, [{"name": "master-0", "node.role": "mr"}] + [
+            {"name": f"data-{n}", "node.role": "cdfhilmrstw"} for n in range(self.data_nodes)]
+
+    def get_index(self, expr, params, body):
+        return 200, {i: {"aliases": self.indices[i]["aliases"], "mappings": self.indices[i]["mappings"],
+                         "settings": {"index": self.indices[i]["settings"]}} for i in self.resolve(expr)}
+
+    def create_index(self, expr, params, body):
+        if expr in self.created or expr in self.indices:
+            return 400, {"error": {"type": "resource_already_exists_exception"}, "status": 400}
+        self.created[expr] = body or {}
+        return 200, {"acknowledged": True, "shards_acknowledged": True, "index": expr}
+
+    def put_alias(self, expr, params, body):
+        return 200, {"acknowledged": True}
+
+    def update_aliases(self, expr, params, body):
+        return 200, {"acknowledged": True}
+
+    def reindex(self, expr, params, body):
+        source = body["source"]["index"]
+        slices = params.get("slices", "1")
+        slices = slices if slices == "auto" else int(slices)
+        if "remote" in body["source"] and slices != 1:
+            return 400, {"error": {"type": "action_request_validation_exception", "reason":
+                f"Validation Failed: 1: reindex from remote sources doesn't support slices > 1 but was [{slices}];"},
+                "status": 400}
+        if source not in self.indices:
+            return 404, {"error": {"type": "index_not_found_exception"}, "status": 404}
+        if slices == "auto":  # One slice per primary shard
+            slices = self.indices[source]["settings"]["number_of_shards"]
+        with self._lock:
+            self._advance()
+            task_id = f"fake-node:{len(self.tasks) + 1}"
+            self.tasks[task_id] = {
+                "source": source, "dest": body["dest"]["index"], "total": self.doc_count(source),
+                "created": 0.0, "slices": int(slices), "rate": 0.0,
+                "requests_per_second": float(params.get("requests_per_second", -1)),
+                "started": time.monotonic(), "completed": False, "took": None,
+            }
+        return 200, {"task": task_id}
+
+    def rethrottle(self, expr, params, body):
+        with self._lock:
+            self._advance()
+            task = self.tasks.get(expr)
+            if task is None:
+                return 404, {"error": {"type": "resource_not_found_exception"}, "status": 404}
+            task["requests_per_second"] = float(params["requests_per_second"])
+        return 200, {"nodes": {}}
+
+    def nodes_stats(self, expr, params, body):
+        with self._lock:
+            self._advance()
+            load, _ = self._utilisation([t for t in self.tasks.values() if not t["completed"]])
+            counters = dict(self.node_stats)
+        threads = 8
+        nodes = {"master-0": {"roles": ["master"], "thread_pool": {}, "indices": {}}}
+        for n in range(self.data_nodes):
+            nodes[f"data-{n}"] = {"roles": ["data"], "thread_pool": {"write": {
+                "threads": threads, "active": min(threads, round(load * threads)),
+                "queue": max(0, round((load - 1) * threads * 10)),
+                "rejected": int(counters["rejected"] / self.data_nodes), "largest": threads}},
+                "indices": {"indexing": {
+                    "index_total": int(counters["index_total"] / self.data_nodes),
+                    "index_time_in_millis": int(counters["index_time_in_millis"] / self.data_nodes)}}}
+        return 200, {"_nodes": {"total": len(nodes)}, "cluster_name": "fake", "nodes": nodes}
+
+    def get_task(self, expr, params, body):
+        with self._lock:
+            self._advance()
+            task = self.tasks.get(expr)
+            if task is None:
+                return 404, {"error": {"type": "resource_not_found_exception"}, "status": 404}
+            status = {"total": task["total"], "created": int(task["created"]), "updated": 0, "deleted": 0,
+                      "batches": int(task["created"]) // 1000 + 1, "requests_per_second": task["requests_per_second"]}
+            result = {"completed": task["completed"], "task": {"id": expr, "action": "indices:data/write/reindex",
+                                                               "status": status}}
+            if task["completed"]:
+                result["response"] = dict(status, took=int(task["took"] * 1000), timed_out=False, failures=[])
+            return 200, result
+
+    def ilm_policy(self, expr, params, body):
+        return 200, {"rollover-30d": {"version": 1, "policy": {"phases": {
+            "hot": {"actions": {"rollover": {"max_age": "30d"}}}}}}}
+
+
+def apply_filter_path(payload, filter_path):
+    """Keep only the parts of `payload` named by a comma-separated filter_path (with * segments)."""
+    def keep(node, parts):
+        if not parts:
+            return node
+        if isinstance(node, list):
+            # Elements keep their position (as {} when nothing matched) so paths merge correctly
+            kept = [keep(item, parts) for item in node]
+            return [{} if k is None else k for k in kept] if any(k is not None for k in kept) else None
+        if not isinstance(node, dict):
+            return None
+        out = {}
+        for key, value in node.items():
+            if fnmatch.fnmatchcase(key, parts[0]):
+                child = keep(value, parts[1:])
+                if child is not None:
+                    out[key] = child
+        return out or None
+
+    result = {}
+    for path in filter_path.split(","):
+        merge(result, keep(payload, path.split(".")) or {})
+    return result
+
+def merge(into, other):
+    for key, value in other.items():
+        if isinstance(value, dict) and isinstance(into.get(key), dict):
+            merge(into[key], value)
+        elif isinstance(value, list) and isinstance(into.get(key), list):
+            # Same list filtered by two paths: merge element-wise
+            into[key] = [merge(a, b) if isinstance(a, dict) and isinstance(b, dict) else a
+                         for a, b in zip(into[key], value)]
+        else:
+            into[key] = value
+    return into
+
+
+# (method or None for any, path regex, endpoint name)
+ROUTES = [
+    ("GET", re.compile(r"^/_cat/indices(?:/(?P<index>[^/]+))?$"), "cat_indices"),
+    ("GET", re.compile(r"^/(?:(?P<index>[^_/][^/]*)/)?_settings$"), "settings"),
+    ("GET", re.compile(r"^/(?:(?P<index>[^_/][^/]*)/)?_mapping$"), "mapping"),
+    ("GET", re.compile(r"^/(?:(?P<index>[^_/][^/]*)/)?_alias$"), "alias"),
+    ("DELETE", re.compile(r"^/_search/scroll$"), "clear_scroll"),
+    (None, re.compile(r"^/_search/scroll$"), "scroll"),
+    (None, re.compile(r"^/(?:(?P<index>[^_/][^/]*)/)?_search$"), "search"),
+    (None, re.compile(r"^/(?:(?P<index>[^_/][^/]*)/)?_bulk$"), "bulk"),
+    ("HEAD", re.compile(r"^/(?P<index>[^_/][^/]*)$"), "exists"),
+    (None, re.compile(r"^/(?:(?P<index>[^_/][^/]*)/)?_msearch$"), "msearch"),
+    ("GET", re.compile(r"^/_cluster/state/metadata(?:/(?P<index>[^/]+))?$"), "cluster_state"),
+    ("GET", re.compile(r"^/_ilm/policy(?:/(?P<index>[^/]+))?$"), "ilm_policy"),
+    ("GET", re.compile(r"^/_cat/nodes$"), "cat_nodes"),
+    ("POST", re.compile(r"^/_reindex$"), "reindex"),
+    ("POST", re.compile(r"^/_reindex/(?P<index>[^/]+)/_rethrottle$"), "rethrottle"),
+    ("GET", re.compile(r"^/_nodes/stats(?:/[^/]+){0,2}$"), "nodes_stats"),
+    ("GET", re.compile(r"^/_tasks/(?P<index>[^/]+)$"), "get_task"),
+    ("POST", re.compile(r"^/_aliases$"), "update_aliases"),
+    ("PUT", re.compile(r"^/(?P<index>[^_/][^/]*)/_alias/[^/]+$"), "put_alias"),
+    ("GET", re.compile(r"^/(?P<index>[^_/][^/]*)$"), "get_index"),
+    ("PUT", re.compile(r"^/(?P<index>[^_/][^/]*)$"), "create_index"),
+]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Concurrent clients open many connections at once
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, Nagle + delayed ACK add ~40 ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        if len(self.requestline) > MAX_INITIAL_LINE_LENGTH:
+            return self._reply(400, {"error": {"type": "too_long_http_line_exception",
+                                               "reason": "An HTTP line is larger than 4096 bytes."}, "status": 400})
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        for method, pattern, endpoint in ROUTES:
+            match = pattern.match(unquote(url.path))
+            if match and method in (None, self.command):
+                break
+        else:
+            return self._reply(404, {"error": f"no fake for {self.command} {url.path}"})
+
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        if endpoint in ("msearch", "bulk"):
+            body = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        else:
+            body = json.loads(raw) if raw else None
+        index = match.groupdict().get("index")
+        status, payload = getattr(self.fake, endpoint)(index, params, body)
+        if "filter_path" in params and status == 200:
+            payload = apply_filter_path(payload, params["filter_path"])
+        self._reply(status, payload, endpoint)
+
+    def _reply(self, status, payload, endpoint=None):
+        data = json.dumps(payload).encode()
+        if endpoint:  # Counted before the client can see the response, so tests can read it right after
+            self.fake.count(endpoint, len(data))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")  # The client refuses to talk without it
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+    do_HEAD = _handle
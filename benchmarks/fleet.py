@@ -0,0 +1,104 @@
+"""
+Synthetic EC2 fleets for the inventory benchmarks.
+
+Instances come back in the describe_instances response shape, with a tag
+distribution that looks like a real account: a handful of tags on every
+instance, a few common ones, and a long tail of rarely used keys.
+"""
+import os
+import random
+import sys
+
+# Make the Lambda modules in app/ importable from the benchmark scripts
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "app")
+sys.path.insert(0, os.path.abspath(APP_DIR))
+
+CORE_TAGS = {  # tag key -> number of distinct values
+    "Environment": 4,
+    "Team": 30,
+    "Owner": 200,
+    "CostCenter": 50,
+    "Application": 120,
+}
+COMMON_TAGS = {
+    "Backup": 3,
+    "PatchGroup": 12,
+    "aws:autoscaling:groupName": 400,
+    "kubernetes.io/cluster": 20,
+    "Compliance": 5,
+}
+COMMON_TAG_RATE = 0.4
+LONG_TAIL_TAGS = 400   # Distinct rarely-used tag keys in the account
+LONG_TAIL_PER_INSTANCE = 4  # Average long-tail tags per instance
+PUBLIC_IP_RATE = 0.3
+
+
+def synthetic_instances(count, long_tail_tags=LONG_TAIL_TAGS, seed=0):
+    """Return `count` instance dicts shaped like describe_instances output."""
+    rng = random.Random(seed)
+    tail_keys = [f"custom:tag-{i:03d}" for i in range(long_tail_tags)]
+    instances = []
+    for n in range(count):
+        tags = [{"Key": "Name", "Value": f"host-{n:06d}"}]
+        tags += [{"Key": k, "Value": f"{k.lower()}-{rng.randrange(card)}"} for k, card in CORE_TAGS.items()]
+        tags += [{"Key": k, "Value": f"{k.lower()}-{rng.randrange(card)}"}
+                 for k, card in COMMON_TAGS.items() if rng.random() < COMMON_TAG_RATE]
+        if tail_keys:
+            # Zipf-like skew: low-numbered tail keys are much more popular than high ones
+            for _ in range(rng.randrange(LONG_TAIL_PER_INSTANCE * 2 + 1)):
+                key = tail_keys[min(int(rng.paretovariate(1.2)) - 1, len(tail_keys) - 1)]
+                tags.append({"Key": key, "Value": f"v{rng.randrange(10)}"})
+        instance = {
+            "InstanceId": f"i-{n:017x}",
+            "PrivateIpAddress": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}",
+            "Tags": tags,
+        }
+        if rng.random() < PUBLIC_IP_RATE:
+            instance["PublicIpAddress"] = f"54.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+        instances.append(instance)
+    return instances
+
+
+class FleetEC2Client:
+    """Minimal stand-in for boto3's EC2 client that pages a synthetic fleet through get_paginator."""
+
+    def __init__(self, instances, page_size=1000):
+        self.instances = instances
+        self.page_size = page_size
+
+    def get_paginator(self, operation_name):
+        return self
+
+    def paginate(self, **kwargs):
+        for start in range(0, len(self.instances), self.page_size):
+            yield {"Reservations": [{"Instances": self.instances[start:start + self.page_size]}]}
+
+
+def fleet_table(count, seed=0):
+    """The same synthetic fleet as an InstanceTable, the form the handler exports from."""
+    import main
+    return main.get_ec2_inventory(FleetEC2Client(synthetic_instances(count, seed=seed)))
+
+
+def stubbed_ec2_client(instances, page_size=1000):
+    """
+    A real botocore EC2 client whose describe_instances pages come from a Stubber, so the
+    paginator, parameter validation and event hooks all run as they would against AWS.
+    Returns (client, stubber); the stubber is already activated.
+    """
+    import boto3
+    from botocore.stub import Stubber
+
+    ec2 = boto3.client("ec2", region_name="us-east-1",
+                       aws_access_key_id="bench", aws_secret_access_key="bench")
+    stubber = Stubber(ec2)
+    pages = range(0, len(instances), page_size)
+    for n, start in enumerate(pages):
+        response = {"Reservations": [{"Instances": instances[start:start + page_size]}]}
+        if n < len(pages) - 1:
+            response["NextToken"] = f"page-{n + 1}"
+        stubber.add_response("describe_instances", response)
+    if not instances:
+        stubber.add_response("describe_instances", {"Reservations": []})
+    stubber.activate()
+    return ec2, stubber
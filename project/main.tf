@@ -13,6 +13,14 @@ resource "aws_lambda_function" "my_lambda" {
   image_uri        = "${aws_ecr_repository.lambda_repo.repository_url}:latest"
   package_type     = "Image"
   timeout          = 10
+
+  environment {
+    variables = {
+      EC2_REGIONS         = var.inventory_regions
+      INVENTORY_ACCOUNTS  = var.inventory_accounts
+      INVENTORY_ROLE_NAME = var.inventory_role_name
+    }
+  }
 }
 
 resource "aws_iam_role" "lambda_role" {
@@ -35,9 +43,42 @@ resource "aws_iam_policy" "lambda_s3_policy" {
     Statement = [
       {
         Effect   = "Allow"
-        Action   = "s3:PutObject"
+        Action   = [
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:DeleteObject",
+          "s3:AbortMultipartUpload"
+        ]
         Resource = "${aws_s3_bucket.my_bucket.arn}/*"
       },
+      {
+        # Lets GetObject report NoSuchKey (not AccessDenied) when no delta snapshot exists yet
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.my_bucket.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = [
+          "ec2:DescribeInstances",
+          "ec2:DescribeRegions",
+          "ec2:DescribeVolumes",
+          "ec2:DescribeNetworkInterfaces",
+          "ec2:DescribeSecurityGroups"
+        ]
+        Resource = "*"
+      },
+      {
+        # Resumable runs re-invoke the function after checkpointing near the timeout
+        Effect   = "Allow"
+        Action   = "lambda:InvokeFunction"
+        Resource = aws_lambda_function.my_lambda.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "sts:AssumeRole"
+        Resource = "arn:aws:iam::*:role/${var.inventory_role_name}"
+      },
       {
         Effect   = "Allow"
         Action   = [
@@ -26,4 +26,21 @@ variable "instance_name" {
   type        = string
   default     = "MyTerraformEC2"
 }
-                    
\ No newline at end of file
+                    
+variable "inventory_regions" {
+  description = "Comma-separated regions for the EC2 inventory Lambda (\"all\" for every enabled region, empty for the default region)"
+  type        = string
+  default     = ""
+}
+
+variable "inventory_accounts" {
+  description = "Comma-separated account IDs the EC2 inventory Lambda assumes a role into (empty for the Lambda's own account)"
+  type        = string
+  default     = ""
+}
+
+variable "inventory_role_name" {
+  description = "Role the EC2 inventory Lambda assumes in each inventoried account"
+  type        = string
+  default     = "EC2InventoryReadOnly"
+}
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The Lambda modules live in app/ and the fake Elasticsearch in benchmarks/
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+for path in ("app", "benchmarks"):
+    sys.path.insert(0, os.path.abspath(os.path.join(ROOT, path)))
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    """Fake credentials so boto3 under moto never looks for real ones."""
+    for name, value in (("AWS_ACCESS_KEY_ID", "testing"), ("AWS_SECRET_ACCESS_KEY", "testing"),
+                        ("AWS_SESSION_TOKEN", "testing"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
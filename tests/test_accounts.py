@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from accounts import AssumedRoleSessions
+
+ACCOUNT_A, ACCOUNT_B = "111111111111", "222222222222"
+
+
+class CountingSTS:
+    """The moto STS client, counting assume_role calls."""
+
+    def __init__(self, sts):
+        self._sts = sts
+        self.assumed = []
+
+    def assume_role(self, **kwargs):
+        self.assumed.append(kwargs["RoleArn"])
+        return self._sts.assume_role(**kwargs)
+
+
+@pytest.fixture
+def sts(aws_credentials):
+    with mock_aws():
+        yield CountingSTS(boto3.client("sts", region_name="us-east-1"))
+
+
+def test_sessions_and_clients_are_reused_while_credentials_are_fresh(sts):
+    sessions = AssumedRoleSessions("InventoryReader", sts=sts)
+
+    ec2 = sessions.client(ACCOUNT_A, "ec2", "us-east-1")
+    assert sessions.client(ACCOUNT_A, "ec2", "us-east-1") is ec2
+    assert sessions.client(ACCOUNT_A, "ec2", "eu-west-1") is not ec2
+
+    assert sts.assumed == [f"arn:aws:iam::{ACCOUNT_A}:role/InventoryReader"]
+
+
+def test_role_is_assumed_again_before_credentials_expire(sts):
+    # Credentials last an hour; with a margin longer than that they always count as expiring
+    sessions = AssumedRoleSessions("InventoryReader", sts=sts, refresh_margin=timedelta(hours=2))
+
+    first = sessions.client(ACCOUNT_A, "ec2", "us-east-1")
+    second = sessions.client(ACCOUNT_A, "ec2", "us-east-1")
+
+    assert len(sts.assumed) == 2
+    assert second is not first  # Clients built on the old credentials are dropped with them
+
+
+def test_invalidate_forgets_one_account_or_all(sts):
+    sessions = AssumedRoleSessions("InventoryReader", sts=sts)
+    sessions.client(ACCOUNT_A, "ec2", "us-east-1")
+    sessions.client(ACCOUNT_B, "ec2", "us-east-1")
+
+    sessions.invalidate(ACCOUNT_A)
+    sessions.client(ACCOUNT_A, "ec2", "us-east-1")
+    sessions.client(ACCOUNT_B, "ec2", "us-east-1")
+    assert [arn.split(":")[4] for arn in sts.assumed] == [ACCOUNT_A, ACCOUNT_B, ACCOUNT_A]
+
+    sessions.invalidate()
+    sessions.client(ACCOUNT_B, "ec2", "us-east-1")
+    assert len(sts.assumed) == 4
+
+
+def test_clients_act_in_their_own_account(sts):
+    sessions = AssumedRoleSessions("InventoryReader", sts=sts)
+    ec2_a = sessions.client(ACCOUNT_A, "ec2", "us-east-1")
+    ec2_b = sessions.client(ACCOUNT_B, "ec2", "us-east-1")
+    image = ec2_a.describe_images(Owners=["amazon"])["Images"][0]["ImageId"]
+    ec2_a.run_instances(ImageId=image, MinCount=2, MaxCount=2)
+
+    def instance_count(ec2):
+        return sum(len(r["Instances"]) for r in ec2.describe_instances()["Reservations"])
+
+    assert instance_count(ec2_a) == 2
+    assert instance_count(ec2_b) == 0
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from elasticsearch import AsyncElasticsearch
+
+from async_inspect import Inspector, list_indices
+from fake_es import FakeElasticsearch
+
+
+@pytest.fixture
+def server():
+    server = FakeElasticsearch(6, docs_per_index=5).start()
+    yield server
+    server.stop()
+
+
+def inspect_all(url, drop=None, **kwargs):
+    """Inspect every test index; `drop` is deleted between the listing and the fetches."""
+    async def go(server_indices):
+        es = AsyncElasticsearch(url)
+        try:
+            indices = await list_indices(es, "*test*")
+            if drop:
+                del server_indices[drop]
+            return [result async for result in Inspector(es, 4, 2, **kwargs).inspect(indices)]
+        finally:
+            await es.close()
+    return go
+
+
+def test_results_come_back_in_listing_order_with_samples(server):
+    results = asyncio.run(inspect_all(server.url)(server.indices))
+
+    assert [r["index"] for r in results] == [i for i in server.indices if "test" in i]
+    assert all(len(r["samples"]) == 2 for r in results)
+
+
+def test_an_index_deleted_after_listing_becomes_an_error_record(server):
+    gone = [i for i in server.indices if "test" in i][1]
+
+    results = asyncio.run(inspect_all(server.url, drop=gone)(server.indices))
+
+    by_index = {r["index"]: r for r in results}
+    assert by_index[gone] == {"index": gone, "error": by_index[gone]["error"]}
+    assert by_index[gone]["error"]["type"] == "index_not_found_exception"
+    assert all("samples" in r for name, r in by_index.items() if name != gone)
+
+
+def test_shards_mode_spreads_the_sample_over_primary_shards(server):
+    results = asyncio.run(inspect_all(server.url, sample_mode="shards")(server.indices))
+
+    assert all(len(r["samples"]) == 2 for r in results)
+    assert server.requests["msearch"] == len(results)
+
+
+def test_unreadable_ilm_policies_are_reported_once_not_per_index(server, monkeypatch, capsys):
+    monkeypatch.setattr(server, "ilm_policy", lambda *args: (403, {
+        "error": {"type": "security_exception", "reason": "action [ilm/get] is unauthorized"}, "status": 403}))
+
+    results = asyncio.run(inspect_all(server.url)(server.indices))
+
+    assert all("error" not in r for r in results)
+    managed = [r for r in results if r["settings"].get("lifecycle")]
+    assert managed and all(r["ilm_policy"] == {"name": "rollover-30d"} for r in managed)
+    assert server.requests["ilm_policy"] == 1
+    assert capsys.readouterr().err.count("ILM policies unavailable") == 1
@@ -0,0 +1,63 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from columnar import write_parquet
+from records import BASE_COLUMNS, InstanceTable
+
+
+def roundtrip(instances):
+    buf = io.BytesIO()
+    write_parquet(instances, buf)
+    return pq.read_table(io.BytesIO(buf.getvalue()))
+
+
+def multi_account_table():
+    table = InstanceTable(BASE_COLUMNS + ("Volumes", "Account ID", "Region"))
+    table.append({"Name": "web-1", "Instance ID": "i-1", "Private IP": "10.0.0.1", "Public IP": "N/A",
+                  "Volumes": "vol-1", "Account ID": "111111111111", "Region": "eu-west-1"},
+                 {"Team": "core", "Owner": "N/A"})
+    table.append({"Name": "web-2", "Instance ID": "i-2", "Private IP": "10.0.0.2", "Public IP": "3.3.3.3",
+                  "Volumes": "vol-2", "Account ID": "222222222222", "Region": "eu-west-1"},
+                 {"Env": "prod"})
+    return table
+
+
+def test_instance_columns_are_plain_strings_and_tags_dictionary_encoded():
+    schema = roundtrip(multi_account_table()).schema
+
+    for name in ("Instance ID", "Volumes", "Account ID", "Region"):
+        assert schema.field(name).type == pa.string()
+    for name in ("Team", "Owner", "Env"):
+        assert pa.types.is_dictionary(schema.field(name).type)
+
+
+def test_only_padding_becomes_null():
+    columns = roundtrip(multi_account_table()).to_pydict()
+
+    assert columns["Owner"] == ["N/A", None]  # A tag really set to "N/A" survives
+    assert columns["Env"] == [None, "prod"]
+    assert columns["Public IP"] == [None, "3.3.3.3"]  # The inventory's own placeholder
+
+
+def test_list_of_dicts_uses_the_same_schema_and_nulls_absent_keys():
+    rows = [
+        {"Name": "web-1", "Instance ID": "i-1", "Account ID": "111111111111", "Total Volume (GiB)": "8",
+         "Team": "N/A"},
+        {"Name": "web-2", "Instance ID": "i-2", "Account ID": "222222222222", "Total Volume (GiB)": "16",
+         "Env": "prod"},
+    ]
+    table = roundtrip(rows)
+
+    assert table.schema.field("Account ID").type == pa.string()
+    assert table.schema.field("Total Volume (GiB)").type == pa.string()
+    assert table.to_pydict()["Team"] == ["N/A", None]
+    assert table.to_pydict()["Env"] == [None, "prod"]
+
+
+def test_padded_rows_keep_the_fast_path():
+    rows = [{"Name": "web-1", "Instance ID": "i-1", "Team": "core"},
+            {"Name": "web-2", "Instance ID": "i-2", "Team": None}]
+
+    assert roundtrip(rows).to_pydict()["Team"] == ["core", None]
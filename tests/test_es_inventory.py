@@ -0,0 +1,79 @@
+import pytest
+from elasticsearch import Elasticsearch
+
+from es_inventory import bulk_actions, index_inventory, instance_document, prune_missing
+from fake_es import FakeElasticsearch
+from records import BASE_COLUMNS, InstanceTable
+
+INDEX = "ec2-inventory"
+
+
+@pytest.fixture
+def cluster():
+    server = FakeElasticsearch(0).start()
+    yield server, Elasticsearch(server.url)
+    server.stop()
+
+
+def inventory(*instance_ids, team="core"):
+    table = InstanceTable(BASE_COLUMNS + ("Volumes",))
+    for instance_id in instance_ids:
+        table.append({"Name": f"web-{instance_id}", "Instance ID": instance_id, "Private IP": "10.0.0.1",
+                      "Public IP": "N/A", "Volumes": "vol-1;vol-2"}, {"Team": team, "app.tier": "web"})
+    return table
+
+
+def test_instance_document_maps_columns_and_skips_missing_values():
+    doc = instance_document({"Name": "web-1", "Instance ID": "i-1", "Public IP": "N/A",
+                             "Security Groups": "sg-a;sg-b", "Team": "core", "Env": "N/A"})
+
+    assert doc["name"] == "web-1" and doc["instance_id"] == "i-1"
+    assert "public_ip" not in doc
+    assert doc["security_groups"] == ["sg-a", "sg-b"]
+    assert doc["tags"] == {"Team": "core"}
+    assert doc["content_hash"]
+
+
+def test_bulk_actions_are_scripted_upserts_keyed_by_instance_id():
+    actions = list(bulk_actions(inventory("i-1", "i-2"), INDEX))
+
+    assert [a["_id"] for a in actions] == ["i-1", "i-2"]
+    assert all(a["_op_type"] == "update" and a["upsert"] == a["script"]["params"]["doc"] for a in actions)
+
+
+def test_rerun_is_noop_and_changes_update(cluster):
+    server, es = cluster
+    assert index_inventory(es, inventory("i-1", "i-2"), INDEX)["created"] == 2
+
+    assert index_inventory(es, inventory("i-1", "i-2"), INDEX)["noop"] == 2
+    counts = index_inventory(es, inventory("i-1", "i-2", team="edge"), INDEX)
+    assert counts["updated"] == 2
+    assert server.documents[INDEX]["i-1"]["tags"] == {"Team": "edge", "app.tier": "web"}
+
+
+def test_instances_gone_since_the_last_run_are_pruned(cluster):
+    server, es = cluster
+    index_inventory(es, inventory("i-1", "i-2", "i-3"), INDEX)
+
+    counts = index_inventory(es, inventory("i-1", "i-3"), INDEX)
+
+    assert counts["deleted"] == 1
+    assert sorted(server.documents[INDEX]) == ["i-1", "i-3"]
+
+
+def test_empty_inventory_does_not_wipe_the_index(cluster):
+    server, es = cluster
+    index_inventory(es, inventory("i-1", "i-2"), INDEX)
+
+    counts = index_inventory(es, inventory(), INDEX)
+
+    assert counts["deleted"] == 0
+    assert sorted(server.documents[INDEX]) == ["i-1", "i-2"]
+
+
+def test_prune_missing_keeps_only_the_given_ids(cluster):
+    server, es = cluster
+    index_inventory(es, inventory(*[f"i-{n}" for n in range(25)]), INDEX)
+
+    assert prune_missing(es, {"i-3"}, INDEX) == 24
+    assert list(server.documents[INDEX]) == ["i-3"]
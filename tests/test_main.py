@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def handler_calls(monkeypatch):
+    """Run lambda_handler with the inventory and upload stubbed out; returns the enrich flags seen."""
+    seen = []
+    monkeypatch.setattr(main, "INVENTORY_ACCOUNTS", "")
+    monkeypatch.setattr(main, "EC2_REGIONS", "")
+    monkeypatch.setattr(main, "get_ec2_inventory", lambda enrich=False: seen.append(enrich) or [])
+    monkeypatch.setattr(main, "export_to_s3", lambda instances: "s3://bucket/key")
+    return seen
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("false", False), ("False", False), ("0", False), ("", False),
+    ("true", True), ("TRUE", True), (True, True), (False, False),
+])
+def test_event_enrich_is_parsed_like_the_environment_flag(handler_calls, value, expected):
+    resp = main.lambda_handler({"enrich": value}, None)
+
+    assert json.loads(resp["body"])["s3_path"] == "s3://bucket/key"
+    assert handler_calls == [expected]
+
+
+def test_enrich_defaults_to_the_environment_flag(handler_calls, monkeypatch):
+    monkeypatch.setattr(main, "INVENTORY_ENRICH", True)
+
+    main.lambda_handler({}, None)
+
+    assert handler_calls == [True]
+
+
+@pytest.mark.parametrize("event", [
+    {"mode": "resumable", "accounts": "111111111111"},
+    {"mode": "resumable", "regions": "eu-west-1"},
+    {"mode": "resumable", "enrich": "true"},
+    {"mode": "resumable", "format": "parquet"},
+])
+def test_resumable_mode_rejects_options_it_cannot_honour(handler_calls, monkeypatch, event):
+    monkeypatch.setattr(main, "resumable_lambda_handler", lambda event, context: pytest.fail("should not run"))
+
+    resp = main.lambda_handler(event, None)
+
+    assert resp["statusCode"] == 400
+    assert list(event)[1] in json.loads(resp["body"])["message"]
@@ -0,0 +1,68 @@
+import pytest
+from elasticsearch import Elasticsearch
+
+from fake_es import FakeElasticsearch
+from metadata_store import MetadataStore, _batches
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    server = FakeElasticsearch(12, docs_per_index=1).start()
+    store = MetadataStore(str(tmp_path / "metadata.sqlite"))
+    yield server, Elasticsearch(server.url), store
+    store.close()
+    server.stop()
+
+
+def test_warm_refresh_refetches_only_changed_indices(cluster):
+    server, es, store = cluster
+    store.refresh(es)
+    changed = next(iter(server.indices))
+    server.touch(changed)
+
+    snapshot = store.refresh(es)
+
+    assert store.last_refresh == {"indices": 12, "refetched": 1, "removed": 0}
+    assert "added_2" in snapshot[changed]["mappings"]["properties"]
+
+
+def test_index_deleted_during_a_refresh_is_skipped(cluster, monkeypatch):
+    server, es, store = cluster
+    gone = next(iter(server.indices))
+    listing = store._current
+
+    def list_then_delete(es_, pattern):
+        current = listing(es_, pattern)
+        del server.indices[gone]  # Deleted after _cat/indices, before the batched fetches
+        return current
+
+    monkeypatch.setattr(store, "_current", list_then_delete)
+    snapshot = store.refresh(es)
+
+    assert gone not in snapshot
+    assert len(snapshot) == 11
+    assert store.last_refresh["refetched"] == 11
+
+
+def test_refresh_indices_touches_only_the_named_indices(cluster):
+    server, es, store = cluster
+    names = list(server.indices)[::3]
+
+    snapshot = store.refresh_indices(es, names)
+
+    assert sorted(snapshot) == sorted(names)
+    assert store.last_refresh == {"indices": 4, "refetched": 4, "removed": 0}
+    assert server.requests["ilm_policy"] == 1
+    assert sorted(store.snapshot()) == sorted(names)  # Nothing else was listed or stored
+
+    store.refresh_indices(es, names)
+    assert store.last_refresh["refetched"] == 0
+
+
+def test_batches_keep_each_expression_under_the_byte_limit():
+    names = [f"logs-{n:04d}" for n in range(100)]
+
+    batches = list(_batches(names, max_bytes=100))
+
+    assert all(len(b) < 100 for b in batches) and len(batches) > 1
+    assert ",".join(batches).split(",") == names
@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+from query_service import InventoryIndex, InventoryService, create_app
+
+CSV = """Name,Instance ID,Private IP,Public IP,Team
+web-1,i-1,10.0.0.1,N/A,payments
+web-2,i-2,10.0.0.2,3.3.3.3,payments
+db-1,i-3,10.0.0.3,N/A,storage
+"""
+
+
+@pytest.fixture
+def client():
+    service = InventoryService(index=InventoryIndex.from_csv(io.StringIO(CSV, newline="")))
+    return create_app(service).test_client()
+
+
+def ids(resp):
+    return [r["Instance ID"] for r in resp.get_json()["instances"]]
+
+
+def test_tag_filters_are_anded(client):
+    assert ids(client.get("/instances?tag=Team=payments&name_prefix=WEB-")) == ["i-1", "i-2"]
+    assert ids(client.get("/instances?tag=Team=payments&tag=Team=storage")) == []
+
+
+def test_name_tag_is_queryable(client):
+    assert ids(client.get("/instances?tag=Name=db-1")) == ["i-3"]
+    assert ids(client.get("/instances?tag=Name")) == ["i-1", "i-2", "i-3"]
+
+
+def test_limit_caps_the_results(client):
+    resp = client.get("/instances?tag=Team&limit=2")
+    assert resp.get_json()["count"] == 2
+
+
+@pytest.mark.parametrize("limit", ["abc", "-1", "1.5", ""])
+def test_bad_limit_is_a_400(client, limit):
+    resp = client.get(f"/instances?tag=Team&limit={limit}")
+    assert resp.status_code == 400
+    assert "limit" in resp.get_json()["error"]
+
+
+def test_ip_lookup_covers_private_and_public(client):
+    assert ids(client.get("/ip/10.0.0.3")) == ["i-3"]
+    assert ids(client.get("/ip/3.3.3.3")) == ["i-2"]
+
+
+def test_a_prefixed_tag_column_is_queried_by_its_tag_key():
+    csv_text = "Name,Instance ID,Private IP,Public IP,Region,tag:Region\nweb-1,i-1,10.0.0.1,N/A,eu-west-1,emea\n"
+    index = InventoryIndex.from_csv(io.StringIO(csv_text, newline=""))
+
+    assert [r["Instance ID"] for r in index.query([("Region", "emea")])] == ["i-1"]
+    assert index.query([("Region", "eu-west-1")]) == []
@@ -0,0 +1,44 @@
+from records import BASE_COLUMNS, InstanceTable, tag_column
+
+
+def row(instance_id, name="web"):
+    return {"Name": name, "Instance ID": instance_id, "Private IP": "10.0.0.1", "Public IP": "N/A"}
+
+
+def test_tags_become_sparse_columns():
+    table = InstanceTable()
+    table.append(row("i-1"), {"Team": "core"})
+    table.append(row("i-2"), {"Env": "prod"})
+
+    assert table.columns == list(BASE_COLUMNS) + ["Team", "Env"]
+    assert [r[4:] for r in table.iter_rows()] == [["core", "N/A"], ["N/A", "prod"]]
+
+
+def test_name_tag_is_held_by_the_name_column():
+    table = InstanceTable()
+    table.append(row("i-1", name="web-1"), {"Name": "web-1", "Team": "core"})
+
+    assert table.columns == list(BASE_COLUMNS) + ["Team"]
+    assert tag_column("Name") is None
+
+
+def test_a_tag_colliding_with_a_base_column_gets_a_prefixed_column():
+    table = InstanceTable()
+    table.append(row("i-1"), {"Instance ID": "legacy-42"})
+
+    assert table.to_dicts()[0]["Instance ID"] == "i-1"
+    assert table.to_dicts()[0]["tag:Instance ID"] == "legacy-42"
+
+
+def test_region_tag_survives_the_multi_region_merge():
+    regional = InstanceTable()
+    regional.append(row("i-1"), {"Region": "emea", "Team": "core"})
+    regional.append(row("i-2"), {"Team": "edge"})
+    merged = InstanceTable(BASE_COLUMNS + ("Region",))
+
+    merged.extend(regional, Region="eu-west-1")
+
+    assert merged.columns == list(BASE_COLUMNS) + ["Region", "tag:Region", "Team"]
+    assert [d["Region"] for d in merged.iter_dicts()] == ["eu-west-1", "eu-west-1"]
+    assert [d["tag:Region"] for d in merged.iter_dicts()] == ["emea", "N/A"]
+    assert merged.column_chunk(0, 2)[5] == ["emea", None]
@@ -0,0 +1,133 @@
+import pytest
+from elasticsearch import Elasticsearch
+
+from fake_es import FakeElasticsearch
+from reindex_throttle import MAX_STEP_UP, REJECTION_BACKOFF, ThrottleController
+
+
+@pytest.fixture
+def cluster():
+    """A fake target with 30k docs/s of write capacity and indices too big to finish during a test."""
+    server = FakeElasticsearch(4, docs_per_index=1, write_capacity=30000, slice_rate=20000).start()
+    for meta in server.indices.values():
+        meta["doc_count"] = 10**9
+    yield server, Elasticsearch(server.url)
+    server.stop()
+
+
+def start_tasks(es, server, controller, count):
+    """Start `count` reindex tasks the way the scheduler does; returns their ids."""
+    task_ids = []
+    for index in list(server.indices)[:count]:
+        rate = controller.admit(es, task_ids)
+        task_id = es.reindex(source={"index": index}, dest={"index": f"migrated-{index}"},
+                             requests_per_second=rate, wait_for_completion=False)["task"]
+        controller.register(task_id, rate)
+        task_ids.append(task_id)
+    return task_ids
+
+
+def task_rates(server, task_ids):
+    return [server.tasks[task_id]["requests_per_second"] for task_id in task_ids]
+
+
+def test_admit_rebalances_running_tasks_before_the_next_starts(cluster):
+    server, es = cluster
+    controller = ThrottleController(initial_rate=12000)
+
+    task_ids = start_tasks(es, server, controller, 3)
+
+    assert task_rates(server, task_ids) == [4000, 4000, 4000]
+    assert server.requests["rethrottle"] == 2 + 1  # Two tasks down to 6k, then three to 4k
+
+
+def test_budget_grows_while_the_target_is_underused(cluster):
+    server, es = cluster
+    controller = ThrottleController(initial_rate=6000)
+    task_ids = start_tasks(es, server, controller, 2)  # 6k of 30k docs/s: load 0.25
+
+    controller.adjust(es, task_ids)
+
+    assert controller.rate == pytest.approx(6000 * MAX_STEP_UP)
+    assert task_rates(server, task_ids) == [4500, 4500]
+
+
+def test_budget_holds_near_the_target_load(cluster):
+    server, es = cluster
+    controller = ThrottleController(target_load=0.8, initial_rate=24000)
+    task_ids = start_tasks(es, server, controller, 3)  # 24k of 30k docs/s: load 0.75
+    rethrottles = server.requests["rethrottle"]
+
+    controller.adjust(es, task_ids)
+
+    assert controller.rate == 24000
+    assert server.requests["rethrottle"] == rethrottles
+
+
+def test_rejections_back_the_budget_off_and_rethrottle_every_task(cluster):
+    server, es = cluster
+    controller = ThrottleController(target_load=0.8, initial_rate=24000)
+    task_ids = start_tasks(es, server, controller, 3)
+    controller.adjust(es, task_ids)  # First sample only sets the counter baseline
+    rethrottles = server.requests["rethrottle"]
+
+    server.node_stats["rejected"] += 300
+    controller.adjust(es, task_ids)
+
+    assert controller.rate == pytest.approx(24000 * REJECTION_BACKOFF)
+    assert controller.history[-1]["rejected"] == 300
+    assert server.requests["rethrottle"] == rethrottles + 3
+    assert task_rates(server, task_ids) == [4000, 4000, 4000]
+
+
+def test_overload_is_brought_back_toward_the_target(cluster):
+    server, es = cluster
+    controller = ThrottleController(target_load=0.8, initial_rate=60000)
+    task_ids = start_tasks(es, server, controller, 3)  # 60k of 30k docs/s: queues full
+
+    for _ in range(6):
+        controller.adjust(es, task_ids)
+
+    assert 0.7 <= controller.history[-1]["load"] <= 0.9
+    assert sum(task_rates(server, task_ids)) == pytest.approx(controller.rate)
+
+
+def test_finished_tasks_are_dropped_and_a_failed_rethrottle_is_skipped(cluster):
+    server, es = cluster
+    controller = ThrottleController(initial_rate=6000)
+    task_ids = start_tasks(es, server, controller, 2)
+
+    controller.adjust(es, task_ids + ["fake-node:999"])  # Unknown to the cluster: 404 on rethrottle
+
+    assert "fake-node:999" not in controller._applied
+
+
+def test_scheduler_survives_a_failed_rebalance(monkeypatch):
+    import UpdatedMigration
+    from elasticsearch import ConnectionError as TransportConnectionError
+    from template_resolver import TemplateResolver
+
+    server = FakeElasticsearch(4, docs_per_index=1, write_capacity=30000, slice_rate=20000).start()
+    try:
+        for meta in server.indices.values():
+            meta["doc_count"] = 3000
+        es = Elasticsearch(server.url)
+        monkeypatch.setattr(UpdatedMigration, "POLL_INTERVAL", 0.05)
+        monkeypatch.setattr(UpdatedMigration, "SOURCE_ES", server.url)
+        monkeypatch.setattr(UpdatedMigration, "TARGET_ES", server.url)
+        monkeypatch.setattr(UpdatedMigration, "SLICE_COUNT", 1)
+
+        def unreachable(**kwargs):
+            raise TransportConnectionError("connection reset")
+
+        monkeypatch.setattr(es, "reindex_rethrottle", unreachable)
+        controller = ThrottleController(initial_rate=12000)
+        indices = UpdatedMigration.list_indices_by_size(es)
+
+        outcome = UpdatedMigration.run_migration_scheduler(es, es, indices, 2, TemplateResolver([]), controller)
+
+        assert {r["status"] for r in outcome.values()} == {"done"}
+        # The first task had nobody to make room for; the second fell back to the current share
+        assert task_rates(server, list(server.tasks))[:2] == [12000, 12000]
+    finally:
+        server.stop()
@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import resumable
+from records import BASE_COLUMNS
+from resumable import acquire_lease, load_checkpoint, release_lease, run_resumable_inventory, save_checkpoint
+
+BUCKET = "inventory-test"
+KEY = "ec2_instances.csv"
+CHECKPOINT = "ec2_instances.checkpoint.json"
+
+
+class Context:
+    """Lambda context whose remaining time drops by `step_ms` on every call."""
+
+    def __init__(self, remaining_ms, step_ms):
+        self.remaining_ms = remaining_ms
+        self.step_ms = step_ms
+
+    def get_remaining_time_in_millis(self):
+        self.remaining_ms -= self.step_ms
+        return self.remaining_ms
+
+
+def instance_row(instance):
+    tags = {t["Key"]: t["Value"] for t in instance.get("Tags", [])}
+    row = dict.fromkeys(BASE_COLUMNS, "N/A")
+    row["Instance ID"] = instance["InstanceId"]
+    return row, tags
+
+
+@pytest.fixture
+def aws(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        ec2 = boto3.client("ec2", region_name="us-east-1")
+        image = ec2.describe_images(Owners=["amazon"])["Images"][0]["ImageId"]
+        for _ in range(12):  # moto pages by reservation
+            ec2.run_instances(ImageId=image, MinCount=1, MaxCount=1,
+                              TagSpecifications=[{"ResourceType": "instance",
+                                                  "Tags": [{"Key": "Team", "Value": "core"}]}])
+        yield ec2, s3
+
+
+def keys(s3):
+    return sorted(o["Key"] for o in s3.list_objects_v2(Bucket=BUCKET).get("Contents", []))
+
+
+def test_run_resumes_across_invocations(aws, monkeypatch):
+    ec2, s3 = aws
+    monkeypatch.setattr(resumable, "PAGE_SIZE", 5)  # 12 instances: three pages
+
+    first = run_resumable_inventory(ec2, s3, BUCKET, KEY, CHECKPOINT, Context(10000, 4000),
+                                    instance_row, margin_ms=3000)
+    assert first["status"] == "checkpointed"
+    assert f"{CHECKPOINT}.lease" not in keys(s3)  # Released for the next invocation
+
+    second = run_resumable_inventory(ec2, s3, BUCKET, KEY, CHECKPOINT, None, instance_row, margin_ms=3000)
+    assert second["status"] == "complete" and second["invocations"] == 2
+
+    rows = list(csv.reader(io.StringIO(s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read().decode())))
+    assert rows[0] == list(BASE_COLUMNS) + ["Team"]
+    assert len(rows) == 13
+    assert keys(s3) == [KEY]  # Checkpoint, pending bytes, staging object and lease all gone
+
+
+def test_state_write_is_the_commit_point(aws, monkeypatch):
+    _, s3 = aws
+    state = {"version": resumable.CHECKPOINT_VERSION, "phase": "collect"}
+    save_checkpoint(s3, BUCKET, CHECKPOINT, state, b"first pending bytes")
+
+    # The next save dies after writing its pending bytes but before the state
+    real_put = s3.put_object
+
+    def put_then_die(**kwargs):
+        if kwargs["Key"] == CHECKPOINT:
+            raise TimeoutError("Lambda timed out")
+        return real_put(**kwargs)
+
+    monkeypatch.setattr(s3, "put_object", put_then_die)
+    newer = dict(json.loads(s3.get_object(Bucket=BUCKET, Key=CHECKPOINT)["Body"].read()), phase="export")
+    with pytest.raises(TimeoutError):
+        save_checkpoint(s3, BUCKET, CHECKPOINT, newer, b"second pending bytes")
+    monkeypatch.undo()
+
+    loaded, pending = load_checkpoint(s3, BUCKET, CHECKPOINT)
+    assert loaded["phase"] == "collect"
+    assert pending == b"first pending bytes"
+
+
+def test_a_later_save_replaces_the_pending_object(aws):
+    _, s3 = aws
+    state = {"version": resumable.CHECKPOINT_VERSION}
+    save_checkpoint(s3, BUCKET, CHECKPOINT, state, b"one")
+    save_checkpoint(s3, BUCKET, CHECKPOINT, state, b"two")
+
+    assert load_checkpoint(s3, BUCKET, CHECKPOINT)[1] == b"two"
+    assert keys(s3) == [CHECKPOINT, f"{CHECKPOINT}.pending.2"]
+
+
+def test_overlapping_invocation_is_turned_away(aws):
+    ec2, s3 = aws
+    assert acquire_lease(s3, BUCKET, CHECKPOINT, Context(60000, 0)) is not None
+
+    result = run_resumable_inventory(ec2, s3, BUCKET, KEY, CHECKPOINT, None, instance_row, margin_ms=3000)
+
+    assert result["status"] == "busy"
+    assert KEY not in keys(s3)
+
+
+def test_expired_lease_is_taken_over(aws, monkeypatch):
+    _, s3 = aws
+    assert acquire_lease(s3, BUCKET, CHECKPOINT, Context(1000, 0)) is not None
+    assert acquire_lease(s3, BUCKET, CHECKPOINT, Context(1000, 0)) is None
+
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + resumable.LEASE_SLACK + 5)
+    assert acquire_lease(s3, BUCKET, CHECKPOINT, Context(1000, 0)) is not None
+
+
+def test_an_overrun_invocation_does_not_release_its_successors_lease(aws, monkeypatch):
+    _, s3 = aws
+    mine = acquire_lease(s3, BUCKET, CHECKPOINT, Context(1000, 0))
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + resumable.LEASE_SLACK + 5)
+    theirs = acquire_lease(s3, BUCKET, CHECKPOINT, Context(1000, 0))
+
+    release_lease(s3, BUCKET, mine)  # The overrun invocation's finally
+
+    assert s3.head_object(Bucket=BUCKET, Key=theirs["key"])["ETag"] == theirs["etag"]
+    release_lease(s3, BUCKET, theirs)
+    assert theirs["key"] not in keys(s3)
@@ -0,0 +1,67 @@
+import gzip
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from s3_stream import MIN_PART_SIZE, S3MultipartWriter
+
+BUCKET = "inventory-test"
+
+
+@pytest.fixture
+def s3(aws_credentials):
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def read(s3, key):
+    return s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+
+
+def test_small_output_is_a_single_put(s3):
+    with S3MultipartWriter(s3, BUCKET, "small.csv", part_size=MIN_PART_SIZE) as out:
+        out.write("InstanceId,State\n")
+        out.write(b"i-123,running\n")
+
+    assert read(s3, "small.csv") == b"InstanceId,State\ni-123,running\n"
+    assert out._upload_id is None
+    assert out.bytes_in == out.bytes_out == 31
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_large_output_is_uploaded_in_parts(s3):
+    data = os.urandom(2 * MIN_PART_SIZE + 1234)
+    with S3MultipartWriter(s3, BUCKET, "large.csv", part_size=MIN_PART_SIZE) as out:
+        for start in range(0, len(data), 1024 * 1024):
+            out.write(data[start:start + 1024 * 1024])
+
+    assert read(s3, "large.csv") == data
+    assert [p["PartNumber"] for p in out._parts] == [1, 2, 3]
+    assert out.bytes_out == len(data)
+
+
+def test_gzip_output_decompresses_to_the_input(s3):
+    lines = [f"i-{n:08d},running,{n % 7}\n" for n in range(50000)]
+    with S3MultipartWriter(s3, BUCKET, "inventory.csv.gz", part_size=MIN_PART_SIZE, gzip=True) as out:
+        for line in lines:
+            out.write(line)
+
+    assert gzip.decompress(read(s3, "inventory.csv.gz")).decode() == "".join(lines)
+    head = s3.head_object(Bucket=BUCKET, Key="inventory.csv.gz")
+    assert head["ContentType"] == "application/gzip"
+
+
+def test_error_aborts_the_multipart_upload(s3):
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(s3, BUCKET, "failed.csv", part_size=MIN_PART_SIZE) as out:
+            out.write(os.urandom(MIN_PART_SIZE + 1))  # Fills a part, so the upload has started
+            assert out._upload_id is not None
+            raise RuntimeError("describe_instances failed")
+
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+